@@ -0,0 +1,17 @@
+-- Move generated image payloads out of table rows into object storage
+-- Rows keep only a content hash, a storage URL and the image dimensions.
+-- Existing image_base64 payloads are moved by image_object_store.migrate_base64_rows().
+
+ALTER TABLE generated_images ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE generated_images ADD COLUMN IF NOT EXISTS width INTEGER;
+ALTER TABLE generated_images ADD COLUMN IF NOT EXISTS height INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_generated_images_content_hash ON generated_images(content_hash);
+
+-- Public bucket holding the image objects, keyed by content hash
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('generated-images', 'generated-images', true)
+ON CONFLICT (id) DO NOTHING;
+
+-- Once migrate_base64_rows() reports no remaining rows, the payload column can be dropped:
+-- ALTER TABLE generated_images DROP COLUMN image_base64;
@@ -0,0 +1,183 @@
+"""
+Process-wide registry for the Chatterbox TTS model.
+
+Loading ChatterboxTTS weights takes longer than synthesising a typical
+voiceover on CPU, so the model is loaded once per process and shared by every
+VoiceGenerationAgent. Set TTS_WARMUP=1 to start loading (and run one short
+synthesis) in a background thread as soon as the voice agent is imported, so
+the first voiceover request doesn't pay for it.
+"""
+
+import os
+import sys
+import time
+import threading
+import subprocess
+from typing import Any, Dict, Optional
+
+TTS_WARMUP = os.getenv("TTS_WARMUP", "false").lower() in ("1", "true", "yes")
+TTS_DEVICE = os.getenv("TTS_DEVICE", "")  # "cuda" / "cpu"; empty picks CUDA when available
+
+
+def _has_cuda() -> bool:
+    """Check if CUDA is available."""
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def _process_memory_mb() -> Optional[float]:
+    """Resident memory of this process in MB, if it can be measured."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+def _install_chatterbox() -> bool:
+    """Install Chatterbox TTS if not already installed."""
+    try:
+        import chatterbox.tts
+        return True
+    except ImportError:
+        print("📦 Installing Chatterbox TTS...")
+        try:
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "chatterbox-tts"])
+            print("✅ Chatterbox TTS installed successfully!")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Failed to install Chatterbox TTS: {e}")
+            return False
+
+
+class TTSModelRegistry:
+    """Loads the Chatterbox model once and hands the same instance to every caller."""
+
+    def __init__(self):
+        self._model = None
+        self._default_conds = None
+        self._lock = threading.Lock()
+        # Chatterbox keeps the speaker conditioning on the model and its torch modules are not thread-safe,
+        # so conditioning and generate() calls on the shared model must never interleave between threads
+        self.synthesis_lock = threading.RLock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self.device: Optional[str] = None
+        self.sample_rate = 22050
+        self.load_seconds: Optional[float] = None
+        self.memory_mb: Optional[float] = None
+        self.gpu_memory_mb: Optional[float] = None
+        self.warmed_up = False
+        self.last_error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get_model(self):
+        """Return the shared model, loading it on first use. Returns None if loading failed."""
+        if self._model is not None:
+            return self._model
+
+        # Concurrent first callers wait here for a single load instead of each loading the weights
+        with self._lock:
+            if self._model is not None:
+                return self._model
+
+            try:
+                if not _install_chatterbox():
+                    self.last_error = "Chatterbox TTS is not installed"
+                    return None
+
+                from chatterbox.tts import ChatterboxTTS
+
+                self.device = TTS_DEVICE or ("cuda" if _has_cuda() else "cpu")
+                print(f"🤖 Loading Chatterbox TTS model on {self.device}...")
+                memory_before = _process_memory_mb()
+                started = time.perf_counter()
+
+                model = ChatterboxTTS.from_pretrained(device=self.device)
+
+                self.load_seconds = time.perf_counter() - started
+                memory_after = _process_memory_mb()
+                if memory_before is not None and memory_after is not None:
+                    self.memory_mb = memory_after - memory_before
+                if self.device == "cuda":
+                    import torch
+                    self.gpu_memory_mb = torch.cuda.memory_allocated() / (1024 * 1024)
+
+                self.sample_rate = model.sr
+                # The built-in voice's conditioning, restored whenever a request doesn't use a cloned voice
+                self._default_conds = getattr(model, "conds", None)
+                self._model = model
+                self.last_error = None
+
+                memory_note = f", +{self.memory_mb:.0f}MB RAM" if self.memory_mb is not None else ""
+                gpu_note = f", {self.gpu_memory_mb:.0f}MB GPU" if self.gpu_memory_mb is not None else ""
+                print(f"✅ Model loaded in {self.load_seconds:.1f}s{memory_note}{gpu_note}")
+                return self._model
+
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Error loading model: {e}")
+                return None
+
+    def use_default_voice(self) -> None:
+        """Point the shared model back at the built-in voice after a cloned voice was used."""
+        if self._model is not None and self._default_conds is not None:
+            self._model.conds = self._default_conds
+
+    def warmup(self, text: str = "Warming up the voice model.") -> bool:
+        """Load the model and run one short synthesis so kernels and caches are initialised."""
+        model = self.get_model()
+        if model is None:
+            return False
+        if self.warmed_up:
+            return True
+
+        try:
+            started = time.perf_counter()
+            with self.synthesis_lock:
+                self.use_default_voice()
+                model.generate(text)
+            self.warmed_up = True
+            print(f"🔥 TTS warmup synthesis took {time.perf_counter() - started:.1f}s")
+            return True
+        except Exception as e:
+            print(f"⚠️ TTS warmup synthesis failed: {e}")
+            return False
+
+    def start_warmup(self) -> None:
+        """Warm up in a daemon thread so service startup isn't blocked."""
+        if self._warmup_thread is not None or self.warmed_up:
+            return
+        self._warmup_thread = threading.Thread(target=self.warmup, name="tts-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        """Load status, timing and memory for monitoring."""
+        return {
+            "loaded": self.loaded,
+            "warmed_up": self.warmed_up,
+            "device": self.device,
+            "sample_rate": self.sample_rate,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "memory_mb": round(self.memory_mb, 1) if self.memory_mb is not None else None,
+            "gpu_memory_mb": round(self.gpu_memory_mb, 1) if self.gpu_memory_mb is not None else None,
+            "last_error": self.last_error
+        }
+
+
+# Process-wide registry shared by every voice generation call
+tts_registry = TTSModelRegistry()
+
+if TTS_WARMUP:
+    tts_registry.start_warmup()
@@ -1,10 +1,104 @@
 # voice_cloning_setup.py
 import os
 import shutil
+import asyncio
 import librosa
+import numpy as np
 import soundfile as sf
-from typing import Dict, Any, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
+from voice_conditioning_cache import voice_conditioning_cache
+
+# Frame settings match librosa's feature defaults, so scores stay comparable with the old full-file analysis
+ANALYSIS_FRAME_LENGTH = 2048
+ANALYSIS_HOP_LENGTH = 512
+ANALYSIS_BLOCK_SAMPLES = int(os.getenv("VOICE_ANALYSIS_BLOCK_SAMPLES", "65536"))
+ANALYSIS_WORKERS = int(os.getenv("VOICE_ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+
+class FrameStatistics:
+    """Running means of per-frame RMS, spectral centroid and zero-crossing rate."""
+    
+    def __init__(self, sample_rate: int, frame_length: int = ANALYSIS_FRAME_LENGTH, hop_length: int = ANALYSIS_HOP_LENGTH):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        # Periodic Hann window, as used by librosa's STFT
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_length) / frame_length)).astype(np.float32)
+        self.freqs = np.fft.rfftfreq(frame_length, 1.0 / sample_rate)
+        self.frames = 0
+        self.rms_sum = 0.0
+        self.centroid_sum = 0.0
+        self.zcr_sum = 0.0
+        self._carry = np.zeros(0, dtype=np.float32)  # Samples not yet covered by a full frame
+    
+    def update(self, samples: np.ndarray) -> None:
+        """Add the next block of mono samples."""
+        buffer = np.concatenate([self._carry, samples.astype(np.float32, copy=False)])
+        if len(buffer) < self.frame_length:
+            self._carry = buffer
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, self.frame_length)[::self.hop_length]
+        self._accumulate(frames)
+        self._carry = buffer[len(frames) * self.hop_length:]
+    
+    def _accumulate(self, frames: np.ndarray) -> None:
+        self.frames += len(frames)
+        self.rms_sum += float(np.sqrt(np.mean(frames ** 2, axis=1)).sum())
+        
+        signs = np.signbit(frames)
+        self.zcr_sum += float((signs[:, 1:] != signs[:, :-1]).sum(axis=1).sum() / self.frame_length)
+        
+        magnitude = np.abs(np.fft.rfft(frames * self.window, axis=1))
+        total = magnitude.sum(axis=1)
+        centroid = np.divide(magnitude @ self.freqs, total, out=np.zeros_like(total), where=total > 0)
+        self.centroid_sum += float(centroid.sum())
+    
+    def finish(self) -> Dict[str, float]:
+        """Flush the trailing partial frame and return the means."""
+        if len(self._carry) and (self.frames == 0 or len(self._carry) > self.frame_length - self.hop_length):
+            padded = np.zeros(self.frame_length, dtype=np.float32)
+            padded[:len(self._carry)] = self._carry[:self.frame_length]
+            self._accumulate(padded[np.newaxis, :])
+        self._carry = np.zeros(0, dtype=np.float32)
+        
+        frames = max(self.frames, 1)
+        return {
+            "rms_energy": self.rms_sum / frames,
+            "spectral_centroid": self.centroid_sum / frames,
+            "zero_crossing_rate": self.zcr_sum / frames
+        }
+
+def stream_voice_statistics(file_path: str, block_samples: int = ANALYSIS_BLOCK_SAMPLES) -> Dict[str, Any]:
+    """Duration, sample rate and mean RMS/centroid/ZCR of a file, read in fixed-size blocks."""
+    try:
+        info = sf.info(file_path)
+    except Exception:
+        info = None
+    
+    if info is not None:
+        stats = FrameStatistics(info.samplerate)
+        total_samples = 0
+        for block in sf.blocks(file_path, blocksize=block_samples, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1)
+            stats.update(mono)
+            total_samples += len(mono)
+        sample_rate = info.samplerate
+    else:
+        # Formats libsndfile can't read (e.g. M4A) still need a full decode
+        audio, sample_rate = librosa.load(file_path, sr=None)
+        stats = FrameStatistics(sample_rate)
+        stats.update(audio)
+        total_samples = len(audio)
+    
+    return {
+        "duration": total_samples / sample_rate,
+        "sample_rate": sample_rate,
+        **stats.finish()
+    }
+
+def _analyze_sample_file(file_path: str) -> Dict[str, Any]:
+    """Process pool entry point for batch analysis."""
+    return VoiceCloningSetup.analyze_voice_sample(file_path)
 
 class VoiceCloningSetup:
     def __init__(self):
@@ -106,6 +200,9 @@ class VoiceCloningSetup:
             # Save processed audio
             sf.write(output_path, audio, target_sr)
             
+            # Conditioning computed from a previous sample of this voice is now stale
+            voice_conditioning_cache.invalidate(voice_name)
+            
             # Get file size
             file_size = os.path.getsize(output_path)
             
@@ -126,20 +223,21 @@ class VoiceCloningSetup:
                 "output_path": None
             }
     
-    def analyze_voice_sample(self, file_path: str) -> Dict[str, Any]:
+    @staticmethod
+    def analyze_voice_sample(file_path: str) -> Dict[str, Any]:
         """Analyze a voice sample for quality assessment."""
         
         if not os.path.exists(file_path):
             return {"error": "File not found"}
         
         try:
-            audio, sr = librosa.load(file_path, sr=None)
-            duration = len(audio) / sr
-            
-            # Basic audio analysis
-            rms_energy = librosa.feature.rms(y=audio)[0].mean()
-            spectral_centroid = librosa.feature.spectral_centroid(y=audio, sr=sr)[0].mean()
-            zero_crossing_rate = librosa.feature.zero_crossing_rate(audio)[0].mean()
+            # Streamed block by block, so long uploads don't have to fit in memory
+            stats = stream_voice_statistics(file_path)
+            duration = stats["duration"]
+            sr = stats["sample_rate"]
+            rms_energy = stats["rms_energy"]
+            spectral_centroid = stats["spectral_centroid"]
+            zero_crossing_rate = stats["zero_crossing_rate"]
             
             # Quality assessment
             quality_score = 0
@@ -191,6 +289,20 @@ class VoiceCloningSetup:
             
         except Exception as e:
             return {"error": f"Analysis failed: {str(e)}"}
+    
+    def analyze_voice_directory(self, directory: Optional[str] = None, max_workers: int = ANALYSIS_WORKERS) -> Dict[str, Dict[str, Any]]:
+        """Analyze every supported audio file in a directory in parallel worker processes."""
+        directory = directory or self.voice_samples_dir
+        files = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if os.path.splitext(name)[1].lower() in self.supported_formats
+        )
+        if not files:
+            return {}
+        
+        with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(files)))) as pool:
+            analyses = pool.map(_analyze_sample_file, files)
+            return {os.path.basename(path): analysis for path, analysis in zip(files, analyses)}
 
 @tool
 async def setup_voice_sample(
@@ -347,5 +459,49 @@ async def analyze_voice_quality(file_path: str) -> str:
     except Exception as e:
         return f"❌ Error analyzing voice quality: {str(e)}"
 
+@tool
+async def analyze_voice_library(directory: str = "") -> str:
+    """Analyze the quality of every voice sample in a directory at once.
+    
+    Args:
+        directory: Folder with audio files (defaults to the voice samples folder)
+    
+    Returns:
+        Quality ranking of all samples
+    """
+    try:
+        setup = VoiceCloningSetup()
+        target = directory or setup.voice_samples_dir
+        if not os.path.isdir(target):
+            return f"❌ Directory not found: {target}"
+        
+        analyses = await asyncio.to_thread(setup.analyze_voice_directory, target)
+        if not analyses:
+            return f"📁 No supported audio files found in {target}"
+        
+        ranked = sorted(analyses.items(), key=lambda item: item[1].get("quality_score", -1), reverse=True)
+        rows = []
+        for name, analysis in ranked:
+            if "error" in analysis:
+                rows.append(f"- ❌ **{name}**: {analysis['error']}")
+            else:
+                rows.append(
+                    f"- **{name}**: {analysis['quality_score']}/100 ({analysis['recommendation']}) | "
+                    f"{analysis['duration']}, {analysis['sample_rate']}Hz, RMS {analysis['rms_energy']}, "
+                    f"centroid {analysis['spectral_centroid']}"
+                )
+        
+        return f"""
+📊 **VOICE LIBRARY ANALYSIS**
+
+**📁 Folder:** {target}
+**📄 Samples:** {len(analyses)}
+
+{chr(10).join(rows)}
+"""
+        
+    except Exception as e:
+        return f"❌ Error analyzing voice library: {str(e)}"
+
 # Voice cloning setup tools
-voice_cloning_tools = [setup_voice_sample, analyze_voice_quality]
\ No newline at end of file
+voice_cloning_tools = [setup_voice_sample, analyze_voice_quality, analyze_voice_library]
\ No newline at end of file
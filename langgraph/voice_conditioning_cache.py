@@ -0,0 +1,113 @@
+"""
+On-disk cache of Chatterbox speaker conditioning for cloned voices.
+
+`prepare_conditionals` runs the voice encoder and speech tokenizer over the
+reference sample every time a cloned voice is used. The resulting
+Conditionals are saved once per sample under the sample's content hash and
+loaded back in later calls and other processes. Replacing a sample changes
+its hash, so stale conditioning is never used; the old files are deleted
+when the new ones are written or when the sample is set up again.
+"""
+
+import os
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+VOICE_CONDITIONING_DIR = os.getenv("VOICE_CONDITIONING_DIR", "langgraph/voice_conditioning")
+
+
+def sample_hash(sample_path: str) -> str:
+    """Content hash of a voice sample file."""
+    digest = hashlib.sha256()
+    with open(sample_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class VoiceConditioningCache:
+    """Speaker conditioning per voice sample, in memory and on disk."""
+
+    def __init__(self, root: str = VOICE_CONDITIONING_DIR):
+        self.root = Path(root)
+        self._memory: Dict[str, Tuple[str, Any]] = {}  # sample hash -> (voice name, Conditionals)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path_for(self, voice_name: str, digest: str) -> Path:
+        return self.root / f"{voice_name}_{digest}.pt"
+
+    def apply(self, model, sample_path: str, exaggeration: float = 0.5) -> bool:
+        """
+        Set model.conds for sample_path, from cache when possible.
+
+        Cached conditioning keeps the exaggeration it was prepared with;
+        model.generate re-applies a different exaggeration itself.
+
+        Returns:
+            True if the conditioning came from the cache
+        """
+        voice_name = Path(sample_path).stem
+        digest = sample_hash(sample_path)
+
+        # Serialized because prepare_conditionals mutates the shared model
+        with self._lock:
+            cached = self._memory.get(digest)
+            conds = cached[1] if cached else None
+
+            cache_path = self._path_for(voice_name, digest)
+            if conds is None and cache_path.exists():
+                try:
+                    from chatterbox.tts import Conditionals
+                    conds = Conditionals.load(cache_path, map_location=model.device).to(model.device)
+                    self._memory[digest] = (voice_name, conds)
+                except Exception as e:
+                    print(f"Could not load cached voice conditioning {cache_path.name}: {e}")
+                    conds = None
+
+            if conds is not None:
+                model.conds = conds
+                self.hits += 1
+                print(f"Reusing cached conditioning for voice '{voice_name}'")
+                return True
+
+            model.prepare_conditionals(sample_path, exaggeration=exaggeration)
+            self._memory[digest] = (voice_name, model.conds)
+            self.misses += 1
+
+            try:
+                self.root.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_suffix(".tmp")
+                model.conds.save(tmp_path)
+                os.replace(tmp_path, cache_path)
+                self._remove_files(voice_name, keep=cache_path)
+            except Exception as e:
+                print(f"Could not save voice conditioning for '{voice_name}': {e}")
+            return False
+
+    def _remove_files(self, voice_name: str, keep: Optional[Path] = None) -> None:
+        for path in self.root.glob(f"{voice_name}_*.pt"):
+            # "audio_*" also matches voice "audio_v2"; only the hash may follow the name
+            if path != keep and path.stem.rsplit("_", 1)[0] == voice_name:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def invalidate(self, voice_name: str) -> None:
+        """Forget all conditioning for a voice, e.g. after its sample was replaced."""
+        with self._lock:
+            for digest in [d for d, (name, _) in self._memory.items() if name == voice_name]:
+                del self._memory[digest]
+            self._remove_files(voice_name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"voices_in_memory": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+
+# Process-wide cache used by every VoiceGenerationAgent
+voice_conditioning_cache = VoiceConditioningCache()
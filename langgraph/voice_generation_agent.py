@@ -7,8 +7,8 @@ import torchaudio as ta
 from typing import Dict, List, Any, Optional
 from langchain_core.tools import tool
 from datetime import datetime
-import subprocess
-import sys
+from tts_registry import tts_registry
+from voice_conditioning_cache import voice_conditioning_cache
 
 class VoiceGenerationAgent:
     def __init__(self):
@@ -23,47 +23,16 @@ class VoiceGenerationAgent:
         os.makedirs(self.voice_samples_dir, exist_ok=True)
         os.makedirs(self.generated_voices_dir, exist_ok=True)
         
-    def _install_chatterbox(self):
-        """Install Chatterbox TTS if not already installed."""
-        try:
-            import chatterbox.tts
-            return True
-        except ImportError:
-            print("📦 Installing Chatterbox TTS...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "chatterbox-tts"])
-                print("✅ Chatterbox TTS installed successfully!")
-                return True
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Failed to install Chatterbox TTS: {e}")
-                return False
-    
     def _load_model(self):
-        """Load the Chatterbox TTS model."""
+        """Attach the process-wide Chatterbox TTS model (loaded once, shared by all agents)."""
         if self.model is not None:
             return True
-            
-        try:
-            if not self._install_chatterbox():
-                return False
-                
-            from chatterbox.tts import ChatterboxTTS
-            print("🤖 Loading Chatterbox TTS model...")
-            self.model = ChatterboxTTS.from_pretrained(device="cuda" if self._has_cuda() else "cpu")
-            self.sample_rate = self.model.sr
-            print("✅ Model loaded successfully!")
-            return True
-        except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            return False
-    
-    def _has_cuda(self):
-        """Check if CUDA is available."""
-        try:
-            import torch
-            return torch.cuda.is_available()
-        except ImportError:
+        
+        self.model = tts_registry.get_model()
+        if self.model is None:
             return False
+        self.sample_rate = tts_registry.sample_rate
+        return True
     
     def _generate_filename(self, text: str, voice_name: str = "default") -> str:
         """Generate a unique filename for the audio."""
@@ -116,21 +85,26 @@ class VoiceGenerationAgent:
             
             # Generate audio with optimized parameters for speed and quality
             print(f"🎙️ Generating voice for: {text[:50]}...")
-            if audio_prompt_path:
-                print(f"👤 Using voice sample: {audio_prompt_path}")
-                wav = self.model.generate(
-                    text, 
-                    audio_prompt_path=audio_prompt_path,
-                    exaggeration=exaggeration,
-                    cfg_weight=cfg_weight
-                )
-            else:
-                print("⚠️ Using default voice - consider using 'my_voice' for personalized results")
-                wav = self.model.generate(
-                    text,
-                    exaggeration=exaggeration,
-                    cfg_weight=cfg_weight
-                )
+            # Conditioning and generate() on the shared model must not interleave with other threads
+            with tts_registry.synthesis_lock:
+                if audio_prompt_path:
+                    print(f"👤 Using voice sample: {audio_prompt_path}")
+                    # Speaker conditioning is computed once per sample and cached on disk
+                    voice_conditioning_cache.apply(self.model, audio_prompt_path, exaggeration)
+                    wav = self.model.generate(
+                        text, 
+                        exaggeration=exaggeration,
+                        cfg_weight=cfg_weight
+                    )
+                else:
+                    print("⚠️ Using default voice - consider using 'my_voice' for personalized results")
+                    # The model is shared, so the last cloned voice's conditioning would otherwise still be set
+                    tts_registry.use_default_voice()
+                    wav = self.model.generate(
+                        text,
+                        exaggeration=exaggeration,
+                        cfg_weight=cfg_weight
+                    )
             
             # Save the generated audio
             filename = self._generate_filename(text, voice_name)
@@ -154,7 +128,8 @@ class VoiceGenerationAgent:
                 "parameters": {
                     "exaggeration": exaggeration,
                     "cfg_weight": cfg_weight
-                }
+                },
+                "model": tts_registry.stats()
             }
             
         except Exception as e:
@@ -236,6 +211,7 @@ async def generate_voiceover(
 **👤 Voice:** {result['voice_name']}
 **🎭 Emotion:** {result['emotion']}
 **📊 Parameters:** Exaggeration: {result['parameters']['exaggeration']}, CFG: {result['parameters']['cfg_weight']}
+**🤖 TTS Model:** {result['model']['device']}, loaded once in {result['model']['load_seconds']}s ({result['model']['memory_mb']}MB)
 
 **📍 Local Path:** {result['file_path']}
 
@@ -6,7 +6,7 @@ import os
 import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Callable
 import json
 
 # Import orchestrator agents with proper error handling
@@ -24,15 +24,34 @@ except ImportError:
         print("⚠️ Warning: Enhanced storage agent not available")
 
 try:
-    from .scripting_agent import store_script_content, retrieve_scripts, check_scripts_table_access
+    from .lookup_cache import script_cache
+except ImportError:
+    from lookup_cache import script_cache
+
+try:
+    from .scripting_agent import store_script_content, retrieve_scripts, check_scripts_table_access, generate_and_store_script
     SCRIPTING_AVAILABLE = True
 except ImportError:
     try:
-        from scripting_agent import store_script_content, retrieve_scripts, check_scripts_table_access
+        from scripting_agent import store_script_content, retrieve_scripts, check_scripts_table_access, generate_and_store_script
         SCRIPTING_AVAILABLE = True
     except ImportError:
         print("⚠️ Warning: Scripting agent not available")
 
+try:
+    from langgraph.config import get_stream_writer
+except ImportError:
+    get_stream_writer = None
+
+def get_chat_stream_writer() -> Callable[[Any], None]:
+    """Writer for LangGraph's "custom" stream mode, or a no-op outside a graph run."""
+    if get_stream_writer is not None:
+        try:
+            return get_stream_writer()
+        except RuntimeError:
+            pass
+    return lambda chunk: None
+
 # Load environment variables from multiple locations
 env_loaded = False
 for env_path in ['.env', '../.env', '../../.env']:
@@ -319,20 +338,21 @@ async def retrieve_script_by_id_and_generate_prompts(script_id: str, num_prompts
         if not STORAGE_AVAILABLE:
             return "❌ Storage functionality not available. Please check imports."
         
-        # Get script by ID from database
+        # Get script by ID, served from the lookup cache on repeat requests
         def sync_query():
             supabase = get_supabase_client()
             # Get script by specific ID
             result = supabase.table('scripts').select('*').eq('id', script_id).execute()
-            return result
+            return result.data[0] if result.data else None
         
-        result = await asyncio.to_thread(sync_query)
+        script = script_cache.get(str(script_id))
+        if script is None:
+            script = await asyncio.to_thread(sync_query)
+            script_cache.set(str(script_id), script)
         
-        if not result.data or len(result.data) == 0:
+        if not script:
             return f"❌ Script with ID {script_id} not found in database."
         
-        # Get the script
-        script = result.data[0]
         script_content = script.get('content', '')
         platform = script.get('platform', 'Unknown')
         style = script.get('style', 'Unknown')
@@ -457,6 +477,65 @@ etc."""
     except Exception as e:
         return f"❌ Error generating prompts: {str(e)}"
 
+@tool
+async def generate_script_from_article(article_id: str, platform: str = "youtube") -> str:
+    """Generate a video script from a stored article and save it to the scripts table.
+    
+    The script is streamed to the chat while it is being written.
+    
+    Args:
+        article_id: The UUID of the stored article
+        platform: Target platform (youtube, tiktok, instagram)
+        
+    Returns:
+        The generated script and its storage details
+    """
+    try:
+        if not STORAGE_AVAILABLE or not SCRIPTING_AVAILABLE:
+            return "❌ Storage or scripting functionality not available. Please check imports."
+        
+        def sync_query():
+            supabase = get_supabase_client()
+            result = supabase.table('articles').select('*').eq('id', article_id).execute()
+            return result.data[0] if result.data else None
+        
+        article = await asyncio.to_thread(sync_query)
+        if not article:
+            return f"❌ Article with ID {article_id} not found in database."
+        if not article.get('content'):
+            return "❌ Article content is empty."
+        
+        write = get_chat_stream_writer()
+        script_content = ""
+        
+        async def show_script_event(event):
+            nonlocal script_content
+            write({"type": "script_stream", "event": event})
+            if event["type"] == "complete":
+                script_content = event["script"]
+        
+        script_config = {
+            'platform': platform,
+            'style': 'engaging',
+            'template': 'viral',
+            'duration': 60 if platform == 'youtube' else 30
+        }
+        result = await generate_and_store_script(article, script_config, on_event=show_script_event)
+        
+        if not result.get('success'):
+            return f"❌ Error generating script: {result.get('error', 'Unknown error')}"
+        
+        return f"""🎬 **{platform.upper()} SCRIPT GENERATED AND STORED**
+
+**📰 Article:** {article.get('title', 'Untitled')}
+**🆔 Script ID:** {result.get('script_id', '')}
+
+{script_content}
+"""
+        
+    except Exception as e:
+        return f"❌ Error generating script: {str(e)}"
+
 @tool
 async def route_to_script_generation(request: str = "") -> str:
     """Route user to script generation when they want to create scripts.
@@ -530,6 +609,9 @@ SYSTEM_PROMPT = f"""You are Rocket Reels AI Chat Assistant specialized in helpin
    - "make video script", "write script"
    - "script for [platform]"
 
+9. **generate_script_from_article** - MUST USE when user asks for a script from a specific article ID:
+   - "write a script for article [ID]", "generate tiktok script from article [ID]"
+
 🎯 IMPORTANT INSTRUCTIONS:
 - ALWAYS use tools - never respond without calling at least one tool
 - If unsure which tool to use, check multiple tools
@@ -554,7 +636,8 @@ chat_tools = [
     generate_prompts_from_script,
     route_to_search,
     route_to_crawl,
-    route_to_script_generation
+    route_to_script_generation,
+    generate_script_from_article
 ]
 
 # Create the react agent using LangGraph pattern (simpler and more reliable)
@@ -647,6 +730,49 @@ async def run_chat_agent(message: str) -> str:
 
 Or try rephrasing your request."""
 
+async def stream_chat_agent(message: str) -> AsyncIterator[str]:
+    """Run the chat agent and yield its reply as it is generated.
+    
+    Yields the agent's own text and, while generate_script_from_article runs,
+    the script as it is written. Tool calls and tool output are skipped.
+    Falls back to the full run_chat_agent reply when streaming is not possible.
+    """
+    if not MODEL_AVAILABLE or chat_agent is None:
+        yield await run_chat_agent(message)
+        return
+    
+    streamed_any = False
+    last_source = None
+    try:
+        async for mode, chunk in chat_agent.astream(
+            {"messages": [HumanMessage(content=message)]},
+            stream_mode=["messages", "custom"]
+        ):
+            if mode == "custom":
+                if chunk.get("type") != "script_stream" or chunk["event"]["type"] != "token":
+                    continue
+                source, text = "script", chunk["event"]["text"]
+            else:
+                message_chunk, metadata = chunk
+                if metadata.get("langgraph_node") != "agent" or not isinstance(message_chunk.content, str):
+                    continue
+                source, text = "agent", message_chunk.content
+            
+            if not text:
+                continue
+            if last_source and source != last_source:
+                yield "\n\n"
+            last_source = source
+            streamed_any = True
+            yield text
+    except Exception as e:
+        print(f"❌ Chat agent streaming error: {str(e)}")
+        if streamed_any:
+            return
+    
+    if not streamed_any:
+        yield await run_chat_agent(message)
+
 def handle_direct_routing(message: str) -> str:
     """Handle routing when LLM is not available - direct pattern matching."""
     message_lower = message.lower()
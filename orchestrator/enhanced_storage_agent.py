@@ -6,6 +6,11 @@ from typing import Dict, Any, List
 from datetime import datetime
 from supabase import create_client, Client
 
+try:
+    from .lookup_cache import invalidate_article
+except ImportError:
+    from lookup_cache import invalidate_article
+
 # Initialize Supabase client
 def get_supabase_client():
     """Get Supabase client with proper configuration."""
@@ -140,6 +145,8 @@ async def store_enhanced_article(article_data: Dict[str, Any]) -> Dict[str, Any]
                 record_id = result.data[0]['id'] if result.data else "unknown"
                 print(f"✅ Article stored with minimal data, ID: {record_id}")
         
+        invalidate_article(url_hash)
+        
         # Prepare success response
         return {
             "status": "success",
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime
 import json
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
@@ -14,6 +14,7 @@ class HumanReviewInterface:
     def __init__(self):
         self.pending_reviews: Dict[str, ContentState] = {}
         self.review_decisions: Dict[str, HumanReview] = {}
+        self.connections: Dict[str, List[WebSocket]] = {}
         self.app = self._create_app()
         
     def _create_app(self) -> FastAPI:
@@ -28,6 +29,7 @@ class HumanReviewInterface:
         @app.websocket("/ws/{workflow_id}")
         async def websocket_endpoint(websocket: WebSocket, workflow_id: str):
             await websocket.accept()
+            self.connections.setdefault(workflow_id, []).append(websocket)
             
             try:
                 # Send current state to reviewer
@@ -60,10 +62,26 @@ class HumanReviewInterface:
             except WebSocketDisconnect:
                 pass
             finally:
+                if websocket in self.connections.get(workflow_id, []):
+                    self.connections[workflow_id].remove(websocket)
                 await websocket.close()
         
         return app
     
+    async def broadcast(self, workflow_id: str, message: Dict[str, Any]):
+        """Send a message to every reviewer connected to a workflow"""
+        for websocket in list(self.connections.get(workflow_id, [])):
+            try:
+                await websocket.send_json(message)
+            except Exception:
+                # The endpoint may already have dropped this socket while the send was pending
+                if websocket in self.connections.get(workflow_id, []):
+                    self.connections[workflow_id].remove(websocket)
+    
+    async def publish_script_event(self, workflow_id: str, event: Dict[str, Any]):
+        """Forward a script streaming event (token, section or complete) to reviewers"""
+        await self.broadcast(workflow_id, {"type": "script_stream", "event": event})
+    
     async def get_review(self, state: ContentState) -> HumanReview:
         """Get human review for current workflow state"""
         # Store state for review
@@ -228,6 +246,11 @@ class HumanReviewInterface:
             <div id="preview-content">Loading preview...</div>
         </div>
         
+        <div class="preview" id="script-stream-panel" style="display: none;">
+            <h3>Script <span id="script-stream-status">(generating...)</span></h3>
+            <pre id="script-stream"></pre>
+        </div>
+        
         <div>
             <h3>Feedback</h3>
             <textarea id="feedback" placeholder="Enter your feedback here..."></textarea>
@@ -257,6 +280,8 @@ class HumanReviewInterface:
                 
                 if (data.type === 'state_update') {
                     updateUI(data.data);
+                } else if (data.type === 'script_stream') {
+                    updateScriptStream(data.event);
                 } else if (data.type === 'decision_received') {
                     alert('Review submitted successfully!');
                     window.close();
@@ -283,6 +308,22 @@ class HumanReviewInterface:
             previewContent.innerHTML = '<pre>' + JSON.stringify(data.preview, null, 2) + '</pre>';
         }
         
+        function updateScriptStream(event) {
+            const panel = document.getElementById('script-stream-panel');
+            const stream = document.getElementById('script-stream');
+            panel.style.display = 'block';
+            
+            if (event.type === 'token') {
+                stream.textContent += event.text;
+                panel.scrollTop = panel.scrollHeight;
+            } else if (event.type === 'section') {
+                document.getElementById('script-stream-status').textContent = '(' + event.header + ' ready)';
+            } else if (event.type === 'complete') {
+                stream.textContent = event.script;
+                document.getElementById('script-stream-status').textContent = '(complete)';
+            }
+        }
+        
         function submitReview(status) {
             const feedback = document.getElementById('feedback').value;
             
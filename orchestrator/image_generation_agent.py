@@ -11,8 +11,10 @@ from pathlib import Path
 from supabase import create_client, Client
 try:
     from .workflow_state import ContentState, PhaseOutput
+    from .image_object_store import get_image_store
 except ImportError:
     from workflow_state import ContentState, PhaseOutput
+    from image_object_store import get_image_store
 from langchain_core.messages import HumanMessage, AIMessage
 
 
@@ -21,6 +23,7 @@ class ImageGenerationAgent:
     
     def __init__(self):
         self.supabase = self._get_supabase_client()
+        self.image_store = get_image_store(self.supabase)
         # Configure different image generation services
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.stability_api_key = os.getenv("STABILITY_API_KEY")
@@ -255,7 +258,6 @@ class ImageGenerationAgent:
                     
                     return {
                         "status": "success",
-                        "image_base64": image_b64[:100] + "...",
                         "file_path": str(output_path),
                         "model": "flux-schnell-free"
                     }
@@ -280,6 +282,7 @@ class ImageGenerationAgent:
             print(f"🖼️ Generating {len(prompts)} images using {service}...")
             
             generated_images = []
+            successful_results = []
             
             for i, prompt_data in enumerate(prompts):
                 print(f"  Generating image {i+1}/{len(prompts)}: {prompt_data['scene_description'][:50]}...")
@@ -329,34 +332,7 @@ class ImageGenerationAgent:
                     result = {"status": "error", "error": f"Unknown service: {service}"}
                 
                 if result['status'] == 'success':
-                    # Prepare image record
-                    image_record = {
-                        'prompt_id': prompt_data.get('id'),
-                        'prompt': prompt_data['prompt'],
-                        'scene_number': prompt_data['scene_number'],
-                        'scene_description': prompt_data['scene_description'],
-                        'image_url': result.get('image_url'),
-                        'image_base64': result.get('image_base64'),
-                        'revised_prompt': result.get('revised_prompt', prompt_data['prompt']),
-                        'model': result['model'],
-                        'style': prompt_data.get('style'),
-                        'aspect_ratio': prompt_data.get('aspect_ratio'),
-                        'created_at': datetime.now().isoformat(),
-                        'metadata': {
-                            'generation_service': service,
-                            'original_prompt_data': prompt_data
-                        }
-                    }
-                    
-                    # Store in Supabase (async wrapped)
-                    stored_result = await asyncio.to_thread(
-                        lambda: self.supabase.table('generated_images').insert(image_record).execute()
-                    )
-                    
-                    if stored_result.data:
-                        image_record['id'] = stored_result.data[0]['id']
-                        generated_images.append(image_record)
-                        print(f"  ✅ Generated and stored image for scene {prompt_data['scene_number']}")
+                    successful_results.append((prompt_data, result))
                 else:
                     print(f"  ❌ Failed to generate image: {result['error']}")
                 
@@ -364,6 +340,53 @@ class ImageGenerationAgent:
                 if i < len(prompts) - 1:
                     await asyncio.sleep(1)
             
+            # Move image payloads into object storage in parallel; rows keep only references
+            payloads = []
+            for prompt_data, result in successful_results:
+                if result.get('file_path'):
+                    payloads.append({"file_path": result['file_path']})
+                elif result.get('image_base64'):
+                    payloads.append({"base64": result['image_base64']})
+                else:
+                    payloads.append({"url": result.get('image_url')})
+            references = await self.image_store.put_many(payloads)
+            
+            image_records = []
+            for (prompt_data, result), reference in zip(successful_results, references):
+                reference = reference or {}
+                image_records.append({
+                    'prompt_id': prompt_data.get('id'),
+                    'prompt': prompt_data['prompt'],
+                    'scene_number': prompt_data['scene_number'],
+                    'scene_description': prompt_data['scene_description'],
+                    'image_url': reference.get('image_url') or result.get('image_url'),
+                    'content_hash': reference.get('content_hash'),
+                    'width': reference.get('width'),
+                    'height': reference.get('height'),
+                    'revised_prompt': result.get('revised_prompt', prompt_data['prompt']),
+                    'model': result['model'],
+                    'style': prompt_data.get('style'),
+                    'aspect_ratio': prompt_data.get('aspect_ratio'),
+                    'created_at': datetime.now().isoformat(),
+                    'metadata': {
+                        'generation_service': service,
+                        'source_url': result.get('image_url'),
+                        'file_path': result.get('file_path'),
+                        'original_prompt_data': prompt_data
+                    }
+                })
+            
+            if image_records:
+                # Store in Supabase with a single bulk insert (async wrapped)
+                stored_result = await asyncio.to_thread(
+                    lambda: self.supabase.table('generated_images').insert(image_records).execute()
+                )
+                
+                for image_record, stored_row in zip(image_records, stored_result.data or []):
+                    image_record['id'] = stored_row['id']
+                    generated_images.append(image_record)
+                    print(f"  ✅ Generated and stored image for scene {image_record['scene_number']}")
+            
             return {
                 "status": "success",
                 "images_generated": len(generated_images),
@@ -0,0 +1,193 @@
+import os
+import io
+import asyncio
+import base64
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import httpx
+import aiofiles
+
+
+IMAGE_STORAGE_BUCKET = os.getenv("IMAGE_STORAGE_BUCKET", "generated-images")
+IMAGE_UPLOAD_CONCURRENCY = int(os.getenv("IMAGE_UPLOAD_CONCURRENCY", "4"))
+
+
+def _image_dimensions(data: bytes) -> Dict[str, Optional[int]]:
+    """Read width/height from the image header without decoding pixels."""
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+        return {"width": width, "height": height}
+    except Exception:
+        return {"width": None, "height": None}
+
+
+def _extension_for(content_type: str) -> str:
+    return {
+        "image/png": "png",
+        "image/webp": "webp"
+    }.get(content_type, "jpg")
+
+
+class ImageObjectStore(ABC):
+    """Content-addressed image store. Rows keep only the hash, URL and dimensions."""
+
+    @abstractmethod
+    async def _write(self, key: str, data: bytes, content_type: str) -> str:
+        """Persist bytes under key and return a URL for them."""
+
+    async def put(self, data: bytes, content_type: str = "image/jpeg") -> Dict[str, Any]:
+        """Store image bytes and return the reference recorded in generated_images."""
+        content_hash = hashlib.sha256(data).hexdigest()
+        key = f"{content_hash[:2]}/{content_hash}.{_extension_for(content_type)}"
+        url = await self._write(key, data, content_type)
+        dimensions = await asyncio.to_thread(_image_dimensions, data)
+
+        return {
+            "content_hash": content_hash,
+            "image_url": url,
+            "width": dimensions["width"],
+            "height": dimensions["height"],
+            "size_bytes": len(data)
+        }
+
+    async def put_base64(self, image_b64: str, content_type: str = "image/jpeg") -> Dict[str, Any]:
+        """Store a base64 payload (e.g. a Stability or FLUX b64_json response)."""
+        if image_b64.startswith("data:"):
+            header, image_b64 = image_b64.split(",", 1)
+            content_type = header[5:].split(";")[0] or content_type
+        data = await asyncio.to_thread(base64.b64decode, image_b64)
+        return await self.put(data, content_type)
+
+    async def put_file(self, file_path: str, content_type: str = "image/jpeg") -> Dict[str, Any]:
+        """Store an image that was already written to local disk."""
+        async with aiofiles.open(file_path, 'rb') as f:
+            data = await f.read()
+        return await self.put(data, content_type)
+
+    async def put_url(self, url: str, content_type: str = "image/jpeg") -> Dict[str, Any]:
+        """Copy an image from a provider URL (which may expire) into the store."""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url, timeout=60.0)
+            response.raise_for_status()
+        return await self.put(response.content, response.headers.get("content-type", content_type))
+
+    async def put_many(self, payloads: List[Dict[str, Any]], concurrency: int = IMAGE_UPLOAD_CONCURRENCY) -> List[Optional[Dict[str, Any]]]:
+        """Upload several images in parallel.
+
+        Each payload has one of 'data', 'base64', 'file_path' or 'url'. Results come
+        back in input order; a failed upload yields None in its slot.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def upload(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            content_type = payload.get("content_type", "image/jpeg")
+            async with semaphore:
+                try:
+                    if payload.get("data") is not None:
+                        return await self.put(payload["data"], content_type)
+                    if payload.get("base64"):
+                        return await self.put_base64(payload["base64"], content_type)
+                    if payload.get("file_path"):
+                        return await self.put_file(payload["file_path"], content_type)
+                    if payload.get("url"):
+                        return await self.put_url(payload["url"], content_type)
+                except Exception as e:
+                    print(f"❌ Image upload failed: {str(e)}")
+                return None
+
+        return await asyncio.gather(*(upload(payload) for payload in payloads))
+
+
+class SupabaseImageStore(ImageObjectStore):
+    """Stores images in a Supabase Storage bucket."""
+
+    def __init__(self, supabase, bucket: str = IMAGE_STORAGE_BUCKET):
+        self.supabase = supabase
+        self.bucket = bucket
+
+    async def _write(self, key: str, data: bytes, content_type: str) -> str:
+        storage = self.supabase.storage.from_(self.bucket)
+        # Keys are content hashes, so re-uploading the same image is a no-op overwrite
+        await asyncio.to_thread(
+            lambda: storage.upload(key, data, {"content-type": content_type, "upsert": "true"})
+        )
+        return storage.get_public_url(key)
+
+
+class LocalImageStore(ImageObjectStore):
+    """Filesystem stand-in for tests and offline runs."""
+
+    def __init__(self, root: str = "image_store"):
+        self.root = Path(root)
+
+    async def _write(self, key: str, data: bytes, content_type: str) -> str:
+        path = self.root / key
+        if not path.exists():
+            await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+            async with aiofiles.open(path, 'wb') as f:
+                await f.write(data)
+        return path.resolve().as_uri()
+
+
+def get_image_store(supabase=None) -> ImageObjectStore:
+    """Pick the backend from IMAGE_STORE_BACKEND ("supabase" or "local")."""
+    backend = os.getenv("IMAGE_STORE_BACKEND", "supabase" if supabase is not None else "local")
+    if backend == "supabase" and supabase is not None:
+        return SupabaseImageStore(supabase)
+    return LocalImageStore(os.getenv("IMAGE_STORE_DIR", "image_store"))
+
+
+async def migrate_base64_rows(supabase, store: ImageObjectStore, batch_size: int = 20) -> Dict[str, int]:
+    """
+    Move existing generated_images.image_base64 payloads into the object store.
+
+    Each migrated row gets content_hash, image_url, width and height set and
+    its image_base64 column cleared. Safe to re-run: only rows that still
+    carry a payload are selected.
+    """
+    migrated = 0
+    failed = 0
+    failed_ids = set()
+
+    while True:
+        query = supabase.table('generated_images').select('id,image_base64').not_.is_('image_base64', 'null')
+        if failed_ids:
+            query = query.not_.in_('id', list(failed_ids))
+        result = await asyncio.to_thread(lambda: query.limit(batch_size).execute())
+        rows = result.data or []
+        if not rows:
+            break
+
+        # Truncated previews ("...") from older runs cannot be recovered; they are just cleared
+        payloads = [
+            {} if str(row['image_base64']).endswith("...") else {"base64": row['image_base64']}
+            for row in rows
+        ]
+        references = await store.put_many(payloads)
+
+        for row, payload, reference in zip(rows, payloads, references):
+            if payload and reference is None:
+                failed += 1
+                failed_ids.add(row['id'])
+                continue
+
+            updates = {"image_base64": None}
+            if reference:
+                updates.update({
+                    "content_hash": reference["content_hash"],
+                    "image_url": reference["image_url"],
+                    "width": reference["width"],
+                    "height": reference["height"]
+                })
+            await asyncio.to_thread(
+                lambda: supabase.table('generated_images').update(updates).eq('id', row['id']).execute()
+            )
+            migrated += 1
+
+        print(f"📦 Migrated {migrated} image rows to object storage ({failed} failed)")
+
+    return {"migrated": migrated, "failed": failed}
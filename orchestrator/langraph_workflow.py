@@ -47,7 +47,7 @@ except ImportError as e:
     SCRIPTING_AGENT_AVAILABLE = False
 
 try:
-    from chat_agent import run_chat_agent, handle_direct_routing
+    from chat_agent import run_chat_agent, stream_chat_agent, handle_direct_routing, get_chat_stream_writer
     CHAT_AGENT_AVAILABLE = True
     print("✅ Chat agent imported successfully")
 except ImportError as e:
@@ -72,6 +72,12 @@ Your message: "{message}"
 Your message: "{message}"
 
 Please try specific commands."""
+    
+    async def stream_chat_agent(message):
+        yield await run_chat_agent(message)
+    
+    def get_chat_stream_writer():
+        return lambda chunk: None
 
 # Load environment
 load_dotenv('.env')
@@ -444,8 +450,15 @@ async def write_script(state: ContentState) -> ContentState:
                 'duration': 60 if platform == 'youtube' else 30
             }
             
-            # Generate and store script
-            result = await generate_and_store_script(article_data, script_config)
+            # Generate and store script, streaming it to the review interface and the chat as it is written
+            write_chat = get_chat_stream_writer()
+            
+            async def publish_script_event(event, platform=platform):
+                event = {**event, "platform": platform}
+                await review_interface.publish_script_event(state.workflow_id, event)
+                write_chat({"type": "script_stream", "event": event})
+            
+            result = await generate_and_store_script(article_data, script_config, on_event=publish_script_event)
             
             if result['success']:
                 stored_scripts[platform] = {
@@ -814,8 +827,13 @@ async def chat_agent(state: ContentState) -> ContentState:
             # Use the chat agent for database queries and general help
             print("💬 Using chat agent for general queries")
             
-            # Run the chat agent (async)
-            response = await run_chat_agent(last_human_message)
+            # Run the chat agent, streaming its reply to LangGraph's "custom" stream mode as it is written
+            write_chat = get_chat_stream_writer()
+            chunks = []
+            async for chunk in stream_chat_agent(last_human_message):
+                write_chat({"type": "chat_stream", "text": chunk})
+                chunks.append(chunk)
+            response = "".join(chunks)
             
             # Add response to messages
             state.messages.append(AIMessage(content=response))
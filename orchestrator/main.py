@@ -6,8 +6,7 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from dotenv import load_dotenv
 
-from langraph_workflow import run_workflow
-from human_review import HumanReviewInterface
+from langraph_workflow import run_workflow, review_interface
 
 # Load environment
 load_dotenv('.env')
@@ -24,9 +23,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize human review interface
-review_interface = HumanReviewInterface()
-
+# Human review interface shared with the workflow, so reviewers see its streamed updates
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -1,10 +1,31 @@
 import os
+import sys
 import asyncio
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Awaitable
 from datetime import datetime
 from supabase import create_client, Client
 
+try:
+    from .lookup_cache import invalidate_script
+except ImportError:
+    from lookup_cache import invalidate_script
+
+# Scripts are written by the production workflow's generator, so both share one prompt and cleanup
+PRODUCTION_WORKFLOW_DIR = os.getenv(
+    "PRODUCTION_WORKFLOW_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "production-workflow")
+)
+if PRODUCTION_WORKFLOW_DIR not in sys.path:
+    sys.path.append(PRODUCTION_WORKFLOW_DIR)
+
+try:
+    from agents.scripting_agent import stream_youtube_script
+    SCRIPT_GENERATOR_AVAILABLE = True
+except ImportError as e:
+    print(f"⚠️ Production script generator not available: {e}")
+    SCRIPT_GENERATOR_AVAILABLE = False
+
 # Initialize Supabase client
 def get_supabase_client():
     """Get Supabase client with proper configuration."""
@@ -63,6 +84,7 @@ async def store_script_content(script_data: Dict[str, Any]) -> Dict[str, Any]:
         
         if result.data:
             script_id = result.data[0]['id']
+            invalidate_script(script_id)
             print(f"✅ Script stored successfully with ID: {script_id}")
             
             return {
@@ -160,6 +182,7 @@ async def update_script(script_id: str, updates: Dict[str, Any]) -> Dict[str, An
         
         # Update script
         result = supabase.table('scripts').update(updates).eq('id', script_id).execute()
+        invalidate_script(script_id)
         
         if result.data:
             print(f"✅ Script {script_id} updated successfully")
@@ -200,6 +223,7 @@ async def delete_script(script_id: str) -> Dict[str, Any]:
         
         # Delete script
         result = supabase.table('scripts').delete().eq('id', script_id).execute()
+        invalidate_script(script_id)
         
         if result.data:
             print(f"✅ Script {script_id} deleted successfully")
@@ -261,14 +285,42 @@ async def check_scripts_table_access() -> Dict[str, Any]:
             'message': error_msg
         }
 
+async def stream_script_content(article_data: Dict[str, Any], script_config: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate a script with the production workflow's generator and yield it progressively.
+    
+    Yields the events of stream_youtube_script: "token", "section" and a final
+    "complete" event carrying the cleaned script.
+    """
+    platform = script_config.get('platform', 'youtube')
+    title = article_data.get('title', 'Untitled')
+    
+    if not SCRIPT_GENERATOR_AVAILABLE:
+        yield {"type": "complete", "script": f"Generated {platform} script for article: {title}"}
+        return
+    
+    async for event in stream_youtube_script(
+        article_data.get('content', ''),
+        title,
+        platform=platform,
+        duration=script_config.get('duration') or 60
+    ):
+        yield event
+
 # Main functions for orchestrator workflow
-async def generate_and_store_script(article_data: Dict[str, Any], script_config: Dict[str, Any]) -> Dict[str, Any]:
+async def generate_and_store_script(
+    article_data: Dict[str, Any],
+    script_config: Dict[str, Any],
+    on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+) -> Dict[str, Any]:
     """
     Generate and store script based on article data and configuration.
     
     Args:
         article_data: Article data containing content to generate script from
         script_config: Configuration for script generation (platform, style, etc.)
+        on_event: Optional async callback receiving streaming events from stream_script_content,
+            used to show the script to reviewers while it is being written
         
     Returns:
         Dictionary with generation and storage result
@@ -281,12 +333,15 @@ async def generate_and_store_script(article_data: Dict[str, Any], script_config:
         if not article_id:
             raise Exception("Missing article ID in article data")
         
-        # Generate script content (placeholder - replace with actual generation logic)
         platform = script_config.get('platform', 'youtube')
         style = script_config.get('style', 'engaging')
         
-        # TODO: Replace this with actual script generation logic
-        script_content = f"Generated {platform} script for article: {article_data.get('title', 'Untitled')}"
+        script_content = ""
+        async for event in stream_script_content(article_data, script_config):
+            if on_event:
+                await on_event(event)
+            if event["type"] == "complete":
+                script_content = event["script"]
         
         # Prepare script data
         script_data = {
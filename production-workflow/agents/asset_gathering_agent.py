@@ -310,6 +310,8 @@ async def organize_generated_assets(project_folder_path: str, assets_data: Dict[
                             mimetype = 'audio/mp3'
                         elif voice_path.lower().endswith('.m4a'):
                             mimetype = 'audio/m4a'
+                        elif voice_path.lower().endswith(('.opus', '.ogg')):
+                            mimetype = 'audio/ogg'
                         else:
                             mimetype = 'audio/wav'  # Default
                         
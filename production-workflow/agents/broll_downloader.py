@@ -0,0 +1,163 @@
+"""
+Streamed, resumable downloads for b-roll assets.
+
+Files are streamed to disk in chunks as "<name>.part" and renamed once
+complete, so HD videos are never buffered whole in memory. Disk writes run
+in a worker thread to keep them off the event loop. If a download breaks
+off, the next attempt resumes the .part file with an HTTP Range request.
+A per-run DownloadBudget caps the total bytes fetched: assets that no
+longer fit are skipped, not truncated. When an asset of unknown size
+outgrows the budget mid-stream, its .part file is deleted and the bytes
+fetched for it are reported as abandoned.
+
+A .part file left by failed attempts is only kept with keep_partial, for
+callers that download into the same directory again. search_and_download_broll
+does this only for an explicit download_path; its default directory is
+new for every run.
+"""
+
+import os
+import asyncio
+import aiohttp
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+BROLL_DOWNLOAD_CONCURRENCY = int(os.getenv("BROLL_DOWNLOAD_CONCURRENCY", "4"))
+BROLL_DOWNLOAD_BUDGET_MB = float(os.getenv("BROLL_DOWNLOAD_BUDGET_MB", "0"))  # 0 = unlimited
+BROLL_DOWNLOAD_CHUNK_BYTES = 256 * 1024
+
+
+class DownloadBudgetExceeded(Exception):
+    """Raised when a download would take the run over its byte budget."""
+
+
+class DownloadBudget:
+    """Bytes a single run may download, shared by all its concurrent downloads."""
+
+    def __init__(self, max_bytes: int = int(BROLL_DOWNLOAD_BUDGET_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes  # 0 = unlimited
+        self.used = 0  # Fetched for files that were completed or are still in progress
+        self.abandoned = 0  # Fetched for files that were given up and deleted; still counts towards the budget
+        self.resumed = 0  # Bytes already on disk that resumed downloads didn't fetch again
+        self.skipped = 0  # Assets skipped because they didn't fit
+
+    def reserve(self, size: int) -> None:
+        if self.max_bytes and self.used + self.abandoned + size > self.max_bytes:
+            raise DownloadBudgetExceeded(
+                f"{size / 1024 / 1024:.1f}MB would exceed the {self.max_bytes / 1024 / 1024:.0f}MB download budget"
+            )
+        self.used += size
+
+    def release(self, size: int) -> None:
+        self.used -= size
+
+    def abandon(self, size: int) -> None:
+        """Move bytes of a deleted partial file from used to abandoned."""
+        self.used -= size
+        self.abandoned += size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bytes_downloaded": self.used,
+            "bytes_abandoned": self.abandoned,
+            "bytes_resumed": self.resumed,
+            "budget_bytes": self.max_bytes or None,
+            "skipped_over_budget": self.skipped
+        }
+
+
+def create_download_session() -> aiohttp.ClientSession:
+    """Session for CDN downloads: no total timeout (large videos), but a stalled read still fails."""
+    return aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=60))
+
+
+async def _stream_to_part(session: aiohttp.ClientSession, url: str, part_path: Path,
+                          budget: DownloadBudget, progress: Dict[str, int]) -> bool:
+    """One attempt at completing part_path. Returns True when the file is complete.
+
+    progress["fetched"] accumulates the bytes written to part_path in this run.
+    """
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 416 and offset:
+            # Nothing left to fetch; the previous attempt got the whole file but didn't get to rename it
+            return True
+        if response.status == 200:
+            if offset:
+                budget.abandon(progress["fetched"])  # Server ignored the range; what we had is overwritten
+                progress["fetched"] = 0
+            offset = 0
+        elif response.status != 206:
+            print(f"Failed to download {url}: HTTP {response.status}")
+            return False
+
+        # Reserve the whole remainder up front when the size is known, so a file that doesn't fit is never started
+        reserved = response.content_length or 0
+        budget.reserve(reserved)
+        if offset:
+            budget.resumed += offset
+
+        written = 0
+        f = await asyncio.to_thread(open, part_path, "ab" if offset else "wb")
+        try:
+            async for chunk in response.content.iter_chunked(BROLL_DOWNLOAD_CHUNK_BYTES):
+                if written + len(chunk) > reserved:
+                    budget.reserve(written + len(chunk) - max(reserved, written))
+                await asyncio.to_thread(f.write, chunk)
+                written += len(chunk)
+                progress["fetched"] += len(chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+            # Only bytes actually fetched count; a retry reserves its own remainder
+            budget.release(max(reserved, written) - written)
+        return True
+
+
+def _discard_part(part_path: Path, budget: DownloadBudget, progress: Dict[str, int]) -> None:
+    budget.abandon(progress["fetched"])
+    progress["fetched"] = 0
+    try:
+        part_path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def download_file(session: aiohttp.ClientSession, url: str, filepath: Path,
+                        budget: Optional[DownloadBudget] = None, retries: int = 3,
+                        keep_partial: bool = True) -> bool:
+    """
+    Stream url to filepath, resuming a partial download if one exists.
+
+    Args:
+        keep_partial: Keep the .part file when all attempts fail, so a later
+            download into the same directory can resume it
+
+    Returns:
+        True if filepath holds the complete file
+    """
+    budget = budget or DownloadBudget(0)
+    if filepath.exists() and filepath.stat().st_size > 0:
+        return True
+
+    part_path = filepath.with_name(filepath.name + ".part")
+    progress = {"fetched": 0}
+    for attempt in range(retries):
+        try:
+            if await _stream_to_part(session, url, part_path, budget, progress):
+                os.replace(part_path, filepath)
+                return True
+        except DownloadBudgetExceeded as e:
+            budget.skipped += 1
+            _discard_part(part_path, budget, progress)
+            print(f"Skipping {filepath.name}: {str(e)}")
+            return False
+        except Exception as e:
+            print(f"Download error attempt {attempt + 1}/{retries}: {str(e)}")
+        if attempt < retries - 1:
+            await asyncio.sleep(1)
+
+    if not keep_partial:
+        _discard_part(part_path, budget, progress)
+    return False
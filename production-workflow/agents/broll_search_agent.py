@@ -6,8 +6,8 @@ based on the prompts generated by the prompt generation agent.
 """
 
 import os
+import re
 import json
-import requests
 import asyncio
 import aiohttp
 from typing import List, Dict, Any, Optional, Union
@@ -16,6 +16,11 @@ from dotenv import load_dotenv
 from pathlib import Path
 import hashlib
 from datetime import datetime
+from agents.pexels_client import pexels_client
+from agents.video_renditions import select_rendition, legacy_hd_rendition, estimate_rendition_bytes
+from agents.broll_downloader import download_file, create_download_session, DownloadBudget, BROLL_DOWNLOAD_CONCURRENCY
+from agents.search_keywords import extract_keywords, prompt_set_hash, DEFAULT_QUERY
+from storage.lookup_cache import search_keyword_cache
 
 # Load environment variables
 load_dotenv()
@@ -25,8 +30,12 @@ PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
 if not PEXELS_API_KEY:
     raise ValueError("PEXELS_API_KEY not found in environment variables")
 
-PEXELS_IMAGE_URL = "https://api.pexels.com/v1/search"
-PEXELS_VIDEO_URL = "https://api.pexels.com/videos/search"
+# "local" extracts search keywords with TF-IDF; "llm" asks the model once per search for all prompts
+BROLL_KEYWORD_MODE = os.getenv("BROLL_KEYWORD_MODE", "local").lower()
+
+# Optional Pexels orientation filter for video search. Off by default: filtering drops landscape results that
+# can still be cropped to 9:16, and select_rendition already prefers portrait renditions
+BROLL_VIDEO_ORIENTATION = os.getenv("BROLL_VIDEO_ORIENTATION", "")
 
 async def search_broll_from_prompts(prompts_data: List[Dict[str, Any]]) -> str:
     """
@@ -63,111 +72,118 @@ async def search_broll_from_prompts(prompts_data: List[Dict[str, Any]]) -> str:
             }
         }
         
-        headers = {"Authorization": PEXELS_API_KEY}
-        
         # Limit prompts to search - select up to 6 diverse prompts for better variety
         prompts_to_search = prompts_data[:6] if len(prompts_data) <= 6 else prompts_data[::len(prompts_data)//6][:6]
+        prompts_to_search = [p for p in prompts_to_search if p.get("prompt")]
         
-        images_collected = 0
-        videos_collected = 0
         max_images = 6
         max_videos = 6
+        per_page = 2
         
-        for prompt_info in prompts_to_search:
-            # Stop if we've collected enough assets
-            if images_collected >= max_images and videos_collected >= max_videos:
+        # Extract key search terms from the prompts (cached, local-first, at most one LLM call)
+        search_queries = await simplify_prompts_for_search([p["prompt"] for p in prompts_to_search])
+        
+        async def search_prompt(prompt_info: Dict[str, Any], search_query: str, want_images: bool, want_videos: bool):
+            prompt_id = prompt_info.get("id", "unknown")
+            print(f"Searching b-roll for prompt {prompt_id}: '{search_query}'")
+            
+            async def no_results():
+                return []
+            
+            photos, videos = await asyncio.gather(
+                pexels_client.search_photos(search_query, per_page=per_page) if want_images else no_results(),
+                pexels_client.search_videos(search_query, per_page=per_page, orientation=BROLL_VIDEO_ORIENTATION) if want_videos else no_results(),
+                return_exceptions=True
+            )
+            if isinstance(photos, Exception):
+                print(f"Error searching images for prompt {prompt_id}: {str(photos)}")
+                photos = []
+            if isinstance(videos, Exception):
+                print(f"Error searching videos for prompt {prompt_id}: {str(videos)}")
+                videos = []
+            return photos, videos
+        
+        # Search in waves of just enough prompts to fill the quota, like the sequential loop that stopped
+        # once 6 images and 6 videos were collected; later prompts are only queried when results come up short
+        search_results = []
+        while len(search_results) < len(prompts_to_search):
+            images_found = sum(len(photos) for photos, _ in search_results)
+            videos_found = sum(1 for _, videos in search_results for video in videos if video.get("video_files"))
+            images_needed = max(0, max_images - images_found)
+            videos_needed = max(0, max_videos - videos_found)
+            if not images_needed and not videos_needed:
                 break
-                
+            
+            first = len(search_results)
+            wave_size = -(-max(images_needed, videos_needed) // per_page)
+            wave = list(zip(prompts_to_search, search_queries))[first:first + wave_size]
+            # Image and video searches within a wave run concurrently under the shared rate limiter
+            search_results += await asyncio.gather(*(
+                search_prompt(prompt_info, query, images_needed > 0, videos_needed > 0) for prompt_info, query in wave
+            ))
+        
+        # Estimated bytes of the chosen renditions vs. the first-"hd" files picked previously
+        rendition_bytes = 0
+        legacy_bytes = 0
+        
+        # Collect in prompt order so the selection matches the sequential search
+        for prompt_info, search_query, (photos, videos) in zip(prompts_to_search, search_queries, search_results):
             prompt_text = prompt_info.get("prompt", "")
             prompt_id = prompt_info.get("id", "unknown")
             scene_type = prompt_info.get("type", "scene")
             timing = prompt_info.get("timing", "")
             
-            if not prompt_text:
-                continue
-            
-            # Extract key search terms from the prompt
-            search_query = _simplify_prompt_for_search(prompt_text)
-            
-            print(f"Searching b-roll for prompt {prompt_id}: '{search_query}'")
+            for photo in photos[:max_images - len(broll_results["images"])]:
+                broll_results["images"].append({
+                    "url": photo["src"]["large"],
+                    "thumbnail": photo["src"]["medium"],
+                    "photographer": photo.get("photographer", "Unknown"),
+                    "query": search_query,
+                    "prompt_id": prompt_id,
+                    "scene_type": scene_type,
+                    "timing": timing,
+                    "width": photo.get("width", 0),
+                    "height": photo.get("height", 0),
+                    "pexels_id": photo.get("id", ""),
+                    "alt": photo.get("alt", search_query),
+                    "original_prompt": prompt_text
+                })
             
-            # Search for images (only if we need more)
-            if images_collected < max_images:
-                try:
-                    img_response = requests.get(
-                        PEXELS_IMAGE_URL,
-                        headers=headers,
-                        params={"query": search_query, "per_page": 2}
-                    )
-                    img_response.raise_for_status()
-                    img_data = img_response.json()
-                    
-                    images_needed = max_images - images_collected
-                    for photo in img_data.get("photos", [])[:images_needed]:
-                        broll_results["images"].append({
-                            "url": photo["src"]["large"],
-                            "thumbnail": photo["src"]["medium"],
-                            "photographer": photo.get("photographer", "Unknown"),
-                            "query": search_query,
-                            "prompt_id": prompt_id,
-                            "scene_type": scene_type,
-                            "timing": timing,
-                            "width": photo.get("width", 0),
-                            "height": photo.get("height", 0),
-                            "pexels_id": photo.get("id", ""),
-                            "alt": photo.get("alt", search_query),
-                            "original_prompt": prompt_text
-                        })
-                        images_collected += 1
-                        if images_collected >= max_images:
-                            break
-                except Exception as e:
-                    print(f"Error searching images for prompt {prompt_id}: {str(e)}")
-            
-            # Search for videos (only if we need more)
-            if videos_collected < max_videos:
-                try:
-                    vid_response = requests.get(
-                        PEXELS_VIDEO_URL,
-                        headers=headers,
-                        params={"query": search_query, "per_page": 2}
-                    )
-                    vid_response.raise_for_status()
-                    vid_data = vid_response.json()
-                    
-                    videos_needed = max_videos - videos_collected
-                    for video in vid_data.get("videos", [])[:videos_needed]:
-                        if video.get("video_files"):
-                            # Get HD quality video file
-                            video_file = next(
-                                (f for f in video["video_files"] if f.get("quality") == "hd"),
-                                video["video_files"][0]
-                            )
-                            broll_results["videos"].append({
-                                "url": video_file["link"],
-                                "width": video_file.get("width", 0),
-                                "height": video_file.get("height", 0),
-                                "duration": video.get("duration", 0),
-                                "query": search_query,
-                                "prompt_id": prompt_id,
-                                "scene_type": scene_type,
-                                "timing": timing,
-                                "pexels_id": video.get("id", ""),
-                                "user": video.get("user", {}).get("name", "Unknown"),
-                                "original_prompt": prompt_text
-                            })
-                            videos_collected += 1
-                            if videos_collected >= max_videos:
-                                break
-                except Exception as e:
-                    print(f"Error searching videos for prompt {prompt_id}: {str(e)}")
+            for video in videos[:max_videos - len(broll_results["videos"])]:
+                if video.get("video_files"):
+                    # Smallest portrait rendition that covers the 1080x1920 frame
+                    duration = video.get("duration", 0)
+                    video_file = select_rendition(video["video_files"], duration)
+                    rendition_bytes += estimate_rendition_bytes(video_file, duration)
+                    legacy_bytes += estimate_rendition_bytes(legacy_hd_rendition(video["video_files"]), duration)
+                    broll_results["videos"].append({
+                        "url": video_file["link"],
+                        "width": video_file.get("width", 0),
+                        "height": video_file.get("height", 0),
+                        "fps": video_file.get("fps"),
+                        "duration": video.get("duration", 0),
+                        "query": search_query,
+                        "prompt_id": prompt_id,
+                        "scene_type": scene_type,
+                        "timing": timing,
+                        "pexels_id": video.get("id", ""),
+                        "user": video.get("user", {}).get("name", "Unknown"),
+                        "original_prompt": prompt_text
+                    })
         
         # Add summary
         broll_results["metadata"]["images_found"] = len(broll_results["images"])
         broll_results["metadata"]["videos_found"] = len(broll_results["videos"])
         broll_results["metadata"]["search_completed"] = True
+        broll_results["metadata"]["rate_limit"] = pexels_client.limiter.status()
+        broll_results["metadata"]["video_renditions"] = {
+            "estimated_bytes": rendition_bytes,
+            "estimated_bytes_saved": legacy_bytes - rendition_bytes
+        }
         
         print(f"B-roll search complete: {len(broll_results['images'])} images, {len(broll_results['videos'])} videos")
+        if broll_results["videos"]:
+            print(f"🎞️ Video renditions: ~{rendition_bytes / 1024 / 1024:.1f}MB, ~{(legacy_bytes - rendition_bytes) / 1024 / 1024:.1f}MB saved vs. first HD file")
         
         return json.dumps(broll_results, indent=2)
         
@@ -180,37 +196,14 @@ async def search_broll_from_prompts(prompts_data: List[Dict[str, Any]]) -> str:
         }
         return json.dumps(error_result, indent=2)
 
-def _simplify_prompt_for_search(prompt_text: str) -> str:
-    """
-    Simplify a detailed image generation prompt into search keywords for Pexels.
-    Uses AI to extract the most relevant search terms without hardcoding.
-    
-    Args:
-        prompt_text: Full prompt text 
-    
-    Returns:
-        Simplified search query for Pexels
-    """
-    try:
-        from langchain_community.chat_models import ChatLiteLLM
-        import os
-        
-        # Use AI to extract search keywords
-        model = ChatLiteLLM(
-            model="deepseek/deepseek-chat",
-            api_key=os.getenv("DEEPSEEK_API_KEY"),
-            temperature=0.1
-        )
-        
-        system_prompt = """Extract 2-3 key search terms from this visual prompt that would help find relevant stock footage/images. 
+SEARCH_TERMS_SYSTEM_PROMPT = """Extract 2-3 key search terms from each visual prompt that would help find relevant stock footage/images. 
 
 Rules:
 1. Focus on main subjects, objects, actions, or settings mentioned in the prompt
 2. Ignore style descriptions (lighting, format, quality, cinematic, etc.)
 3. Choose terms that would exist in stock media libraries
-4. Return only the search terms separated by spaces
-5. Keep it simple and searchable
-6. Prioritize specific objects, interfaces, and actions over generic terms
+4. Keep it simple and searchable
+5. Prioritize specific objects, interfaces, and actions over generic terms
 
 Examples:
 - "AI chatbot interface displaying controversial messages with glowing red error alerts" → "chatbot interface error messages"
@@ -218,43 +211,85 @@ Examples:
 - "Corporate spokesperson in modern office gesturing defensively" → "corporate spokesperson office meeting"
 - "Futuristic AI interface with friendly personality displayed on screen" → "AI interface screen display"
 - "Social media outrage with angry emoji reactions flooding screen" → "social media reactions screen"
+
+Respond with a JSON object {"queries": [...]} holding one search string per prompt, in the same order.
 """
 
-        user_prompt = f"Visual prompt: {prompt_text}\n\nExtract search terms:"
+def _clean_search_query(query: str) -> str:
+    """Lowercase, strip punctuation and keep at most 4 words."""
+    query = re.sub(r'[^\w\s]', '', (query or "").lower())
+    return " ".join(query.split()[:4])
+
+def _prompt_key(prompt_text: str, set_hash: str = "") -> tuple:
+    """Local queries are ranked across their prompt set, so their key includes the set's hash."""
+    return (BROLL_KEYWORD_MODE, set_hash, hashlib.sha256(prompt_text.strip().encode("utf-8")).hexdigest()[:16])
+
+_keyword_model = None
+
+def _get_keyword_model():
+    """JSON-mode DeepSeek model for batched keyword extraction, created on first use and reused."""
+    global _keyword_model
+    if _keyword_model is None:
+        from langchain_community.chat_models import ChatLiteLLM
         
-        response = model.invoke([
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
+        _keyword_model = ChatLiteLLM(
+            model="deepseek/deepseek-chat",
+            api_key=os.getenv("DEEPSEEK_API_KEY"),
+            temperature=0.1
+        ).bind(response_format={"type": "json_object"})
+    return _keyword_model
+
+async def _simplify_prompts_with_llm(prompt_texts: List[str]) -> List[Optional[str]]:
+    """Simplify all prompts in one LLM call; entries the model didn't answer are None."""
+    try:
+        numbered = "\n".join(f"{i + 1}. {text}" for i, text in enumerate(prompt_texts))
+        response = await _get_keyword_model().ainvoke([
+            {"role": "system", "content": SEARCH_TERMS_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Visual prompts:\n{numbered}\n\nExtract search terms:"}
         ])
         
-        search_query = response.content.strip().lower()
-        
-        # Clean up the response
-        import re
-        search_query = re.sub(r'[^\w\s]', '', search_query)
-        search_query = re.sub(r'\s+', ' ', search_query).strip()
-        
-        # Limit to reasonable length
-        words = search_query.split()
-        if len(words) > 4:
-            search_query = " ".join(words[:4])
-        
-        return search_query if search_query else "business technology"
+        queries = json.loads(response.content).get("queries", [])
+        cleaned = [_clean_search_query(q) if isinstance(q, str) else "" for q in queries]
+        return [(cleaned[i] or None) if i < len(cleaned) else None for i in range(len(prompt_texts))]
         
     except Exception as e:
-        print(f"AI search extraction failed: {e}, using fallback")
-        # Simple fallback without hardcoding
-        import re
-        
-        # Basic cleanup
-        search_text = prompt_text.lower()
-        search_text = re.sub(r'vertical.*?format', '', search_text)
-        search_text = re.sub(r'[^\w\s]', ' ', search_text)
-        search_text = re.sub(r'\s+', ' ', search_text).strip()
-        
-        # Take first meaningful words
-        words = [w for w in search_text.split() if len(w) > 3][:3]
-        return " ".join(words) if words else "business"
+        print(f"Batched AI search extraction failed: {e}, using local keywords")
+        return [None] * len(prompt_texts)
+
+async def simplify_prompts_for_search(prompt_texts: List[str]) -> List[str]:
+    """
+    Turn detailed image generation prompts into short Pexels queries.
+    
+    Misses are extracted locally with TF-IDF over prompt_texts, or, with
+    BROLL_KEYWORD_MODE=llm, in one batched LLM call (falling back to the
+    local extractor for anything the model didn't answer). Local queries are
+    cached by prompt hash plus the prompt set's hash, LLM queries by prompt
+    hash alone.
+    
+    Args:
+        prompt_texts: Full prompt texts
+    
+    Returns:
+        One search query per prompt
+    """
+    set_hash = "" if BROLL_KEYWORD_MODE == "llm" else prompt_set_hash(prompt_texts)
+    keys = [_prompt_key(text, set_hash) for text in prompt_texts]
+    queries = [search_keyword_cache.get(key) for key in keys]
+    missing = [i for i, query in enumerate(queries) if query is None]
+    if not missing:
+        return queries
+    
+    llm_queries = await _simplify_prompts_with_llm([prompt_texts[i] for i in missing]) if BROLL_KEYWORD_MODE == "llm" else [None] * len(missing)
+    local_queries = extract_keywords(prompt_texts)
+    
+    for i, llm_query in zip(missing, llm_queries):
+        queries[i] = llm_query or _clean_search_query(local_queries[i]) or DEFAULT_QUERY
+        # In llm mode a local fallback isn't cached, so the next run asks the model again
+        if llm_query or BROLL_KEYWORD_MODE != "llm":
+            search_keyword_cache.set(keys[i], queries[i])
+    
+    print(f"Search keywords: {len(prompt_texts) - len(missing)} cached, {len(missing)} extracted ({BROLL_KEYWORD_MODE})")
+    return queries
 
 @tool  
 async def organize_broll_assets(broll_data: Dict[str, Any], project_folder_path: str) -> str:
@@ -320,30 +355,14 @@ Sample B-roll Assets:
     except Exception as e:
         return f"Failed to organize b-roll assets: {str(e)}"
 
-async def _download_file(session: aiohttp.ClientSession, url: str, filepath: Path, retries: int = 3) -> bool:
-    """Download a file with retry logic."""
-    for attempt in range(retries):
-        try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    filepath.write_bytes(content)
-                    return True
-                else:
-                    print(f"Failed to download {url}: HTTP {response.status}")
-        except Exception as e:
-            print(f"Download error attempt {attempt + 1}/{retries}: {str(e)}")
-            if attempt < retries - 1:
-                await asyncio.sleep(1)
-    return False
-
 async def search_and_download_broll(prompts_data: List[Dict[str, Any]], download_path: Optional[str] = None) -> str:
     """
     Search for b-roll content from Pexels and download assets locally.
     
     Args:
         prompts_data: List of prompt dictionaries containing id, prompt, type, timing, style
-        download_path: Optional path to download assets (defaults to temp directory)
+        download_path: Optional path to download assets (defaults to a new timestamped temp directory);
+            pass the same path again to reuse completed files and resume partial ones
     
     Returns:
         JSON string with search results and downloaded file paths
@@ -372,86 +391,71 @@ async def search_and_download_broll(prompts_data: List[Dict[str, Any]], download
         if search_results.get("error"):
             return json.dumps(search_results)
         
-        # Download assets
-        downloaded_files = []
-        
-        async with aiohttp.ClientSession() as session:
-            # Download images
-            for i, image in enumerate(search_results.get("images", [])):
-                try:
-                    url = image.get("url")
-                    if not url:
-                        continue
-                    
-                    # Generate filename
-                    prompt_id = image.get("prompt_id", "unknown")
-                    pexels_id = image.get("pexels_id", hashlib.md5(url.encode()).hexdigest()[:8])
-                    filename = f"image_{prompt_id}_{pexels_id}.jpg"
-                    filepath = download_dir / filename
-                    
-                    print(f"Downloading image {i+1}/{len(search_results['images'])}: {filename}")
-                    
-                    if await _download_file(session, url, filepath):
-                        image["local_path"] = str(filepath)
-                        downloaded_files.append({
-                            "type": "image",
-                            "filename": filename,
-                            "path": str(filepath),
-                            "url": url,
-                            "prompt_id": prompt_id,
-                            "scene_type": image.get("scene_type"),
-                            "timing": image.get("timing"),
-                            "photographer": image.get("photographer")
-                        })
-                        print(f"✓ Downloaded: {filename}")
-                    else:
-                        print(f"✗ Failed to download: {filename}")
-                        
-                except Exception as e:
-                    print(f"Error downloading image: {str(e)}")
+        # Download images and videos concurrently, streamed to disk
+        images = search_results.get("images", [])
+        videos = search_results.get("videos", [])
+        budget = DownloadBudget()
+        semaphore = asyncio.Semaphore(BROLL_DOWNLOAD_CONCURRENCY)
+        
+        async def download_asset(session: aiohttp.ClientSession, kind: str, asset: Dict[str, Any], index: int, total: int):
+            url = asset.get("url")
+            if not url:
+                return None
+            
+            # Generate filename
+            prompt_id = asset.get("prompt_id", "unknown")
+            pexels_id = asset.get("pexels_id", hashlib.md5(url.encode()).hexdigest()[:8])
+            filename = f"{kind}_{prompt_id}_{pexels_id}.{'jpg' if kind == 'image' else 'mp4'}"
+            filepath = download_dir / filename
             
-            # Download videos
-            for i, video in enumerate(search_results.get("videos", [])):
-                try:
-                    url = video.get("url")
-                    if not url:
-                        continue
-                    
-                    # Generate filename
-                    prompt_id = video.get("prompt_id", "unknown")
-                    pexels_id = video.get("pexels_id", hashlib.md5(url.encode()).hexdigest()[:8])
-                    filename = f"video_{prompt_id}_{pexels_id}.mp4"
-                    filepath = download_dir / filename
-                    
-                    print(f"Downloading video {i+1}/{len(search_results['videos'])}: {filename}")
-                    
-                    if await _download_file(session, url, filepath):
-                        video["local_path"] = str(filepath)
-                        downloaded_files.append({
-                            "type": "video",
-                            "filename": filename,
-                            "path": str(filepath),
-                            "url": url,
-                            "prompt_id": prompt_id,
-                            "scene_type": video.get("scene_type"),
-                            "timing": video.get("timing"),
-                            "duration": video.get("duration"),
-                            "user": video.get("user")
-                        })
-                        print(f"✓ Downloaded: {filename}")
-                    else:
-                        print(f"✗ Failed to download: {filename}")
-                        
-                except Exception as e:
-                    print(f"Error downloading video: {str(e)}")
+            try:
+                async with semaphore:
+                    print(f"Downloading {kind} {index + 1}/{total}: {filename}")
+                    # Only an explicit download_path is reused by later runs; the default directory is new each run
+                    downloaded = await download_file(session, url, filepath, budget, keep_partial=bool(download_path))
+            except Exception as e:
+                print(f"Error downloading {kind}: {str(e)}")
+                return None
+            
+            if not downloaded:
+                print(f"✗ Failed to download: {filename}")
+                return None
+            
+            asset["local_path"] = str(filepath)
+            entry = {
+                "type": kind,
+                "filename": filename,
+                "path": str(filepath),
+                "url": url,
+                "prompt_id": prompt_id,
+                "scene_type": asset.get("scene_type"),
+                "timing": asset.get("timing")
+            }
+            if kind == "image":
+                entry["photographer"] = asset.get("photographer")
+            else:
+                entry["duration"] = asset.get("duration")
+                entry["user"] = asset.get("user")
+            print(f"✓ Downloaded: {filename}")
+            return entry
+        
+        async with create_download_session() as session:
+            results = await asyncio.gather(
+                *(download_asset(session, "image", image, i, len(images)) for i, image in enumerate(images)),
+                *(download_asset(session, "video", video, i, len(videos)) for i, video in enumerate(videos))
+            )
+        downloaded_files = [entry for entry in results if entry]
         
         # Update results with download information
         search_results["download_directory"] = str(download_dir)
         search_results["downloaded_files"] = downloaded_files
         search_results["metadata"]["downloads_completed"] = True
         search_results["metadata"]["total_downloaded"] = len(downloaded_files)
+        search_results["metadata"]["download_stats"] = budget.stats()
         
-        print(f"\nB-roll download complete: {len(downloaded_files)} files downloaded to {download_dir}")
+        print(f"\nB-roll download complete: {len(downloaded_files)} files ({budget.used / 1024 / 1024:.1f}MB) downloaded to {download_dir}")
+        if budget.skipped:
+            print(f"⚠️ {budget.skipped} assets skipped by the {budget.max_bytes / 1024 / 1024:.0f}MB download budget")
         
         return json.dumps(search_results, indent=2)
         
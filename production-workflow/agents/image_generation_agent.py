@@ -2,8 +2,6 @@ from langchain_core.tools import tool
 import os
 import base64
 import asyncio
-import aiohttp
-import aiofiles
 from dotenv import load_dotenv
 from pathlib import Path
 import io
@@ -11,23 +9,15 @@ import json
 from PIL import Image
 from typing import Dict, List, Any, Optional, Union
 
+from storage.image_cache import image_cache, image_cache_key, file_content_hash
+from agents.image_providers import image_provider, TOGETHER_API_KEY, TOGETHER_AVAILABLE
+
 # Load environment variables
 load_dotenv()
 
-# Get Together AI API key
-TOGETHER_API_KEY = os.getenv("TogetherAI_API_KEY")
-
 # Using FLUX Schnell Free model
 FLUX_MODEL = "black-forest-labs/FLUX.1-schnell-Free"
 
-# Check if Together AI client is available
-try:
-    from together import Together
-    TOGETHER_AVAILABLE = True
-except ImportError:
-    TOGETHER_AVAILABLE = False
-    print("Together AI Python client not available. Install with: pip install together")
-
 async def ensure_dir_exists(directory):
     """Create directory asynchronously using to_thread if it doesn't exist."""
     if not os.path.exists(directory):
@@ -57,65 +47,88 @@ async def generate_image_with_together(
     print(f"Dimensions: {width}x{height} (9:16 portrait for social media)")
     print(f"Prompt: {prompt}")
     
-    try:
-        if not TOGETHER_AVAILABLE:
-            return {"error": "Together AI client not available. Install with: pip install together"}
-            
-        client = Together(api_key=TOGETHER_API_KEY)
+    results = await generate_image_variants_with_together(
+        prompt=prompt,
+        output_paths=[output_path],
+        width=width,
+        height=height,
+        model=model,
+        steps=steps
+    )
+    return results[0]
+
+async def _save_response_item(item, output_path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Write one entry of an images.generate response to disk."""
+    if getattr(item, 'url', None):
+        image_url = item.url
+        print(f"Found image URL: {image_url}")
+        
+        if output_path:
+            if not await image_provider.download(image_url, output_path):
+                return {"error": f"Failed to download generated image from {image_url}", "image_url": image_url}
+            print(f"Image saved to {output_path}")
+        
+        return {
+            "status": "success",
+            "image_url": image_url,
+            "file_path": output_path
+        }
+    
+    if getattr(item, 'b64_json', None):
+        image_b64 = item.b64_json
         
-        response = client.images.generate(
+        if output_path:
+            await ensure_dir_exists(os.path.dirname(output_path))
+            image_data = base64.b64decode(image_b64)
+            image = await asyncio.to_thread(lambda: Image.open(io.BytesIO(image_data)))
+            await asyncio.to_thread(lambda: image.save(output_path))
+            print(f"Image saved to {output_path}")
+        
+        return {
+            "status": "success",
+            "base64_image": image_b64[:100] + "...",
+            "file_path": output_path
+        }
+    
+    return None
+
+async def generate_image_variants_with_together(
+    prompt: str,
+    output_paths: List[Optional[str]],
+    width: int = 576,
+    height: int = 1024,
+    model: str = FLUX_MODEL,
+    steps: int = 4
+) -> List[Dict[str, Any]]:
+    """Generate len(output_paths) variants of one prompt in a single request (n > 1).
+    
+    Returns one result dict per output path, in order; missing variants get an error entry.
+    """
+    try:
+        # Routed through the configured providers (failover and p95 hedging, see agents/image_providers.py)
+        served = await image_provider.generate(
             prompt=prompt,
             model=model,
             width=width,
             height=height,
             steps=steps,
-            n=1
+            n=len(output_paths)
         )
+        items = served["items"]
         
-        if hasattr(response, 'data') and len(response.data) > 0:
-            if hasattr(response.data[0], 'url'):
-                image_url = response.data[0].url
-                print(f"Found image URL: {image_url}")
-                
-                if output_path:
-                    await ensure_dir_exists(os.path.dirname(output_path))
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(image_url) as img_response:
-                            if img_response.status == 200:
-                                async with aiofiles.open(output_path, 'wb') as f:
-                                    await f.write(await img_response.read())
-                                print(f"Image saved to {output_path}")
-                
-                print("Image generation successful!")
-                return {
-                    "status": "success",
-                    "image_url": image_url,
-                    "file_path": output_path
-                }
-            
-            elif hasattr(response.data[0], 'b64_json') and response.data[0].b64_json:
-                image_b64 = response.data[0].b64_json
-                
-                if output_path:
-                    await ensure_dir_exists(os.path.dirname(output_path))
-                    image_data = base64.b64decode(image_b64)
-                    image = await asyncio.to_thread(lambda: Image.open(io.BytesIO(image_data)))
-                    await asyncio.to_thread(lambda: image.save(output_path))
-                    print(f"Image saved to {output_path}")
-                
-                print("Image generation successful!")
-                return {
-                    "status": "success",
-                    "base64_image": image_b64[:100] + "...",
-                    "file_path": output_path
-                }
+        results = []
+        for index, output_path in enumerate(output_paths):
+            result = await _save_response_item(items[index], output_path) if index < len(items) else None
+            if result:
+                result.update({"provider": served["provider"], "cacheable": served["cacheable"]})
+            results.append(result or {"error": "No image data in response for this variant"})
         
-        print("No image data found in response")
-        return {"error": "No image data in response", "response": str(response)}
+        print(f"Image generation successful via {served['provider']}! ({len(items)} image(s))")
+        return results
                 
     except Exception as e:
         print(f"Exception: {str(e)}")
-        return {"error": str(e)}
+        return [{"error": str(e)} for _ in output_paths]
 
 @tool
 async def generate_image_flux(prompt: str, model: str = FLUX_MODEL, width: int = 576, height: int = 1024, steps: int = 4) -> str:
@@ -132,35 +145,57 @@ async def generate_image_flux(prompt: str, model: str = FLUX_MODEL, width: int =
         JSON string with image details and file path
     """
     try:
-        import uuid
-        
-        filename = f"{uuid.uuid4().hex[:8]}.jpg"
-        base_dir = Path(__file__).parent.parent
-        output_dir = base_dir / "assets" / "generated_images"
-        await ensure_dir_exists(output_dir)
-        output_path = output_dir / filename
-        
-        result = await generate_image_with_together(
-            prompt=prompt,
-            output_path=str(output_path),
-            width=width,
-            height=height,
-            model=model,
-            steps=steps
-        )
+        # Same prompt and parameters always map to the same file, so reruns cost no API call
+        params = {"model": model, "width": width, "height": height, "steps": steps}
+        cache_key = image_cache_key(prompt, **params)
+        output_path = image_cache.path_for(cache_key)
         
-        if "error" in result:
-            return json.dumps({
-                "error": result["error"], 
-                "status": "failed", 
-                "fallback": "Use manual image generation with DALL-E 3, Canva, or Leonardo.ai"
-            })
+        async with image_cache.key_lock(cache_key):
+            cached_path = await asyncio.to_thread(image_cache.lookup, cache_key)
+            if cached_path:
+                print(f"Image cache hit: {os.path.basename(cached_path)}")
+                return json.dumps({
+                    "status": "success",
+                    "file_path": cached_path,
+                    "image_url": "",
+                    "prompt": prompt,
+                    "model": model,
+                    "cache_key": cache_key,
+                    "content_hash": await asyncio.to_thread(file_content_hash, cached_path),
+                    "cached": True
+                })
+            
+            await ensure_dir_exists(output_path.parent)
+            result = await generate_image_with_together(
+                prompt=prompt,
+                output_path=str(output_path),
+                width=width,
+                height=height,
+                model=model,
+                steps=steps
+            )
             
+            if "error" in result:
+                return json.dumps({
+                    "error": result["error"], 
+                    "status": "failed", 
+                    "fallback": "Use manual image generation with DALL-E 3, Canva, or Leonardo.ai"
+                })
+            
+            # Stand-in providers write to the same path but are never indexed, so real output replaces them
+            if result.get("cacheable", True):
+                await asyncio.to_thread(image_cache.record, cache_key, str(output_path), params)
+        
         response_data = {
             "status": "success",
             "file_path": str(output_path),
             "image_url": result.get("image_url", ""),
-            "prompt": prompt
+            "prompt": prompt,
+            "model": model,
+            "provider": result.get("provider"),
+            "cache_key": cache_key,
+            "content_hash": await asyncio.to_thread(file_content_hash, str(output_path)),
+            "cached": False
         }
         
         return json.dumps(response_data)
@@ -172,6 +207,125 @@ async def generate_image_flux(prompt: str, model: str = FLUX_MODEL, width: int =
             "fallback": "Use manual image generation with DALL-E 3, Canva, or Leonardo.ai"
         })
 
+# Together accepts up to this many variants per request
+TOGETHER_MAX_VARIANTS = int(os.getenv("TOGETHER_MAX_VARIANTS", "4"))
+IMAGE_BATCH_CONCURRENCY = int(os.getenv("IMAGE_BATCH_CONCURRENCY", "4"))
+
+def _sharpness_score(file_path: str) -> float:
+    """Edge variance as a cheap detail/sharpness measure for picking the best variant."""
+    from PIL import ImageFilter, ImageStat
+    with Image.open(file_path) as image:
+        edges = image.convert("L").resize((144, 256)).filter(ImageFilter.FIND_EDGES)
+        return ImageStat.Stat(edges).var[0]
+
+async def _generate_prompt_variants(prompt: str, variants: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    """All variants of one prompt: cache hits first, then as few n>1 requests as possible for the rest."""
+    keys = [image_cache_key(prompt, **params) if i == 0 else image_cache_key(prompt, variant=i, **params) for i in range(variants)]
+    paths: List[Optional[str]] = [None] * variants
+    cached = [False] * variants
+    errors = []
+    provider = None
+    
+    for i, key in enumerate(keys):
+        paths[i] = await asyncio.to_thread(image_cache.lookup, key)
+        cached[i] = paths[i] is not None
+    
+    missing = [i for i in range(variants) if paths[i] is None]
+    for start in range(0, len(missing), TOGETHER_MAX_VARIANTS):
+        group = missing[start:start + TOGETHER_MAX_VARIANTS]
+        output_paths = [str(image_cache.path_for(keys[i])) for i in group]
+        await ensure_dir_exists(os.path.dirname(output_paths[0]))
+        results = await generate_image_variants_with_together(prompt=prompt, output_paths=output_paths, **params)
+        
+        for i, output_path, result in zip(group, output_paths, results):
+            if "error" in result or not os.path.exists(output_path):
+                errors.append(result.get("error", "Image file was not written"))
+                continue
+            paths[i] = output_path
+            provider = result.get("provider")
+            if result.get("cacheable", True):
+                await asyncio.to_thread(image_cache.record, keys[i], output_path, {**params, "variant": i})
+    
+    variant_paths = [path for path in paths if path]
+    if not variant_paths:
+        return {"status": "failed", "prompt": prompt, "error": errors[0] if errors else "No images generated"}
+    
+    best_path = variant_paths[0]
+    if len(variant_paths) > 1:
+        scores = await asyncio.gather(*(asyncio.to_thread(_sharpness_score, path) for path in variant_paths))
+        best_path = variant_paths[max(range(len(scores)), key=lambda i: scores[i])]
+    
+    return {
+        "cache_key": keys[paths.index(best_path)],
+        "content_hash": await asyncio.to_thread(file_content_hash, best_path),
+        "status": "success",
+        "file_path": best_path,
+        "variants": variant_paths,
+        "prompt": prompt,
+        "model": params["model"],
+        "provider": provider if not all(cached) else "cache",
+        "cached": all(cached[i] for i in range(variants) if paths[i])
+    }
+
+@tool
+async def generate_images_batch(
+    prompts: List[str],
+    variants: int = 1,
+    model: str = FLUX_MODEL,
+    width: int = 576,
+    height: int = 1024,
+    steps: int = 4
+) -> str:
+    """Generate images for several prompts, optionally several variants each, with as few requests as possible.
+    
+    Identical prompts share one generation, variants of a prompt are requested together (n > 1), and
+    the sharpest variant is returned as file_path.
+    
+    Args:
+        prompts: Image descriptions, e.g. one per shot
+        variants: Candidates to generate per prompt (default: 1)
+        model: Model to use (default: FLUX.1-schnell-Free)
+        width: Width of the generated images (default: 576 for 9:16 portrait)
+        height: Height of the generated images (default: 1024 for 9:16 portrait)
+        steps: Number of inference steps (default: 4 for Schnell)
+    
+    Returns:
+        JSON string with one result per input prompt, in input order
+    """
+    try:
+        params = {"model": model, "width": width, "height": height, "steps": steps}
+        variants = max(1, variants)
+        unique_prompts = list(dict.fromkeys(prompts))
+        semaphore = asyncio.Semaphore(max(1, IMAGE_BATCH_CONCURRENCY))
+        
+        async def generate(prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await _generate_prompt_variants(prompt, variants, params)
+                except Exception as e:
+                    return {"status": "failed", "prompt": prompt, "error": str(e)}
+        
+        print(f"Generating {len(unique_prompts)} prompts x {variants} variant(s) in batch")
+        generated = dict(zip(unique_prompts, await asyncio.gather(*(generate(p) for p in unique_prompts))))
+        
+        results = [{"index": i, **generated[prompt]} for i, prompt in enumerate(prompts)]
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        
+        return json.dumps({
+            "status": "success" if succeeded else "failed",
+            "generated": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results
+        })
+        
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "status": "failed",
+            "results": [],
+            "fallback": "Use manual image generation with DALL-E 3, Canva, or Leonardo.ai"
+        })
+
 @tool
 async def generate_from_visual_timing(visual_timing: Union[Dict, str], output_dir: str = "scene_images") -> str:
     """Generate images from visual timing plan."""
@@ -271,10 +425,16 @@ async def check_image_generation_status() -> str:
                 "action": "Check your .env file and ensure TogetherAI_API_KEY is properly set"
             })
         
-        from together import Together
-        client = Together(api_key=TOGETHER_API_KEY)
+        together = image_provider.get("together")
+        if together is None:
+            return json.dumps({
+                "status": "warning",
+                "message": f"Together AI is not in the configured image providers: {[p.name for p in image_provider.providers]}",
+                "provider_health": image_provider.health_report(),
+                "action": "Set IMAGE_PROVIDERS=together to use FLUX via Together AI"
+            })
         
-        test_response = client.models.list()
+        test_response = await asyncio.to_thread(together.client.models.list)
         available_models = [model.id for model in test_response.data if "FLUX" in model.id]
         
         if not available_models:
@@ -290,6 +450,7 @@ async def check_image_generation_status() -> str:
             "service": "Together AI", 
             "model": FLUX_MODEL,
             "available_models": available_models,
+            "provider_health": image_provider.health_report(),
             "message": "Image generation is fully operational",
             "action": "Proceed with generate_image_flux directly"
         })
@@ -373,5 +534,6 @@ image_generation_tools = [
     generate_image_flux,
     generate_from_visual_timing,
     check_image_generation_status,
-    extract_visual_cues_from_timing
+    extract_visual_cues_from_timing,
+    generate_images_batch
 ]
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Image post-processing for generated images and downloaded b-roll stills.
+
+Each source image gets:
+- an exact 1080x1920 (9:16) center crop for the video renderer and Drive upload
+- small JPEG and WebP thumbnails for review previews
+- a 64-bit perceptual difference hash (dHash) for near-duplicate detection
+
+The pixel work runs in a process pool so the workflow's event loop stays
+free. Results are recorded in a derivatives index keyed by source path, and
+sources whose size and mtime are unchanged are not processed again.
+"""
+
+import os
+import json
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+DERIVATIVES_DIR = os.getenv(
+    "IMAGE_DERIVATIVES_DIR",
+    str(Path(__file__).parent.parent / "assets" / "derivatives")
+)
+POSTPROCESS_WORKERS = int(os.getenv("IMAGE_POSTPROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+RENDER_SIZE = (1080, 1920)
+THUMBNAIL_SIZE = (270, 480)
+
+
+def _dhash(image, hash_size: int = 8) -> str:
+    """Difference hash: compare adjacent pixels of a tiny grayscale version."""
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Number of differing bits between two perceptual hashes (0-5 usually means the same picture)."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def process_image(source_path: str, output_dir: str) -> Dict[str, Any]:
+    """Create the crop, thumbnails and hash for one image. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    stem = Path(source_path).stem
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source_path) as opened:
+        image = ImageOps.exif_transpose(opened).convert("RGB")
+
+    crop_path = output / f"{stem}_{RENDER_SIZE[0]}x{RENDER_SIZE[1]}.jpg"
+    ImageOps.fit(image, RENDER_SIZE, Image.LANCZOS).save(crop_path, "JPEG", quality=90, optimize=True)
+
+    thumbnail = ImageOps.fit(image, THUMBNAIL_SIZE, Image.LANCZOS)
+    thumb_jpeg_path = output / f"{stem}_thumb.jpg"
+    thumb_webp_path = output / f"{stem}_thumb.webp"
+    thumbnail.save(thumb_jpeg_path, "JPEG", quality=80, optimize=True)
+    thumbnail.save(thumb_webp_path, "WEBP", quality=75)
+
+    stat = os.stat(source_path)
+    return {
+        "source": source_path,
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "source_dimensions": list(image.size),
+        "crop_path": str(crop_path),
+        "thumbnail_jpeg": str(thumb_jpeg_path),
+        "thumbnail_webp": str(thumb_webp_path),
+        "phash": _dhash(image)
+    }
+
+
+class DerivativesIndex:
+    """JSON index of derivatives per source image."""
+
+    def __init__(self, output_dir: str = DERIVATIVES_DIR):
+        self.output_dir = output_dir
+        self.path = Path(output_dir) / "index.json"
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                print(f"Could not read derivatives index {self.path}: {str(e)}")
+                self._entries = {}
+        return self._entries
+
+    def get_current(self, source_path: str) -> Optional[Dict[str, Any]]:
+        """Derivatives for source_path if the source is unchanged and the outputs still exist."""
+        with self._lock:
+            entry = self._load().get(source_path)
+        if not entry:
+            return None
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return None
+        if entry["source_size"] != stat.st_size or entry["source_mtime"] != stat.st_mtime:
+            return None
+        if not all(os.path.exists(entry[key]) for key in ("crop_path", "thumbnail_jpeg", "thumbnail_webp")):
+            return None
+        return entry
+
+    def update(self, entries: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            index = self._load()
+            for entry in entries:
+                index[entry["source"]] = entry
+            Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+derivatives_index = DerivativesIndex()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=POSTPROCESS_WORKERS)
+    return _executor
+
+
+async def postprocess_images(source_paths: List[str], index: DerivativesIndex = derivatives_index) -> Dict[str, Dict[str, Any]]:
+    """
+    Produce derivatives for every image, reusing up-to-date index entries.
+
+    Returns:
+        Mapping of source path to its derivatives entry (failed images are omitted)
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    processed = []
+    for source_path in dict.fromkeys(p for p in source_paths if p and os.path.exists(p)):
+        entry = index.get_current(source_path)
+        if entry:
+            results[source_path] = entry
+        else:
+            pending.append(source_path)
+
+    if pending:
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(executor, process_image, path, index.output_dir) for path in pending),
+            return_exceptions=True
+        )
+
+        for source_path, outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Post-processing failed for {os.path.basename(source_path)}: {str(outcome)}")
+                continue
+            processed.append(outcome)
+            results[source_path] = outcome
+
+        if processed:
+            await asyncio.to_thread(index.update, processed)
+
+    print(f"Image post-processing: {len(processed)} processed, {len(results) - len(processed)} reused, {len(pending) - len(processed)} failed")
+    return results
+
+
+def find_near_duplicates(entries: Dict[str, Dict[str, Any]], max_distance: int = 5) -> List[List[str]]:
+    """Pairs of source images whose perceptual hashes are within max_distance bits."""
+    items = list(entries.items())
+    duplicates = []
+    for i, (path_a, entry_a) in enumerate(items):
+        for path_b, entry_b in items[i + 1:]:
+            if hamming_distance(entry_a["phash"], entry_b["phash"]) <= max_distance:
+                duplicates.append([path_a, path_b])
+    return duplicates
+
+
+def shutdown_postprocessing() -> None:
+    """Stop the worker processes."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
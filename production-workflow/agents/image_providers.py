@@ -0,0 +1,359 @@
+"""
+Image provider abstraction for the image generation agent.
+
+Providers are tried in the order given by IMAGE_PROVIDERS (for example
+"together,together:black-forest-labs/FLUX.1-schnell,local"). Each provider's
+latency and failures are tracked; providers that keep failing are put on a
+short cooldown. When the active provider takes longer than its observed p95
+latency, the request is hedged by starting the next provider as well, and
+the first successful answer wins.
+
+The "local" provider renders a deterministic placeholder with PIL so the
+workflow can run offline and in tests without any API key.
+"""
+
+import io
+import os
+import math
+import time
+import base64
+import asyncio
+import hashlib
+import textwrap
+from abc import ABC, abstractmethod
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import aiofiles
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOGETHER_API_KEY = os.getenv("TogetherAI_API_KEY")
+
+IMAGE_PROVIDERS = os.getenv("IMAGE_PROVIDERS", "together")
+
+# Generation calls on the sync client run on this many dedicated threads
+IMAGE_GENERATION_WORKERS = int(os.getenv("IMAGE_GENERATION_WORKERS", "4"))
+IMAGE_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Hedge delay used until a provider has enough latency samples for a p95
+IMAGE_HEDGE_DEFAULT_SECONDS = float(os.getenv("IMAGE_HEDGE_DEFAULT_SECONDS", "20"))
+IMAGE_PROVIDER_FAILURE_THRESHOLD = int(os.getenv("IMAGE_PROVIDER_FAILURE_THRESHOLD", "3"))
+IMAGE_PROVIDER_COOLDOWN_SECONDS = float(os.getenv("IMAGE_PROVIDER_COOLDOWN_SECONDS", "60"))
+
+# Check if Together AI client is available
+try:
+    from together import Together
+    TOGETHER_AVAILABLE = True
+except ImportError:
+    TOGETHER_AVAILABLE = False
+    print("Together AI Python client not available. Install with: pip install together")
+
+# Older client versions have no async client; generation then runs on the thread pool
+try:
+    from together import AsyncTogether
+except ImportError:
+    AsyncTogether = None
+
+
+class ImageProvider(ABC):
+    """A backend that turns a prompt into images.
+
+    generate() returns a list of items with either a `url` or a `b64_json`
+    attribute, matching the shape of Together's images.generate response.
+    """
+
+    name = "provider"
+    # Stand-in providers set this to False so their output never enters the image cache
+    cacheable = True
+
+    @abstractmethod
+    async def generate(self, prompt: str, model: str, width: int, height: int, steps: int, n: int = 1) -> List[Any]:
+        """Generate n images for prompt."""
+
+    async def close(self) -> None:
+        pass
+
+
+class TogetherImageProvider(ImageProvider):
+    """Long-lived Together AI client; `model` overrides the requested model when set."""
+
+    def __init__(self, api_key: Optional[str] = TOGETHER_API_KEY, model: Optional[str] = None, max_workers: int = IMAGE_GENERATION_WORKERS):
+        self.api_key = api_key
+        self.model = model
+        self.name = f"together:{model}" if model else "together"
+        self.max_workers = max_workers
+        self._client = None
+        self._async_client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def client(self):
+        """Sync Together client, created once and reused for every request."""
+        if self._client is None:
+            from together import Together as TogetherClient
+            self._client = TogetherClient(api_key=self.api_key)
+        return self._client
+
+    async def generate(self, prompt: str, model: str, width: int, height: int, steps: int, n: int = 1) -> List[Any]:
+        """Run one generation request without blocking the event loop."""
+        model = self.model or model
+        if AsyncTogether is not None:
+            if self._async_client is None:
+                self._async_client = AsyncTogether(api_key=self.api_key)
+            response = await self._async_client.images.generate(
+                prompt=prompt, model=model, width=width, height=height, steps=steps, n=n
+            )
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="together-image")
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                self._executor,
+                lambda: self.client.images.generate(
+                    prompt=prompt, model=model, width=width, height=height, steps=steps, n=n
+                )
+            )
+        return list(getattr(response, 'data', None) or [])
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class LocalImageProvider(ImageProvider):
+    """Deterministic PIL placeholder: the same prompt and variant always give the same image."""
+
+    name = "local"
+    cacheable = False
+
+    @staticmethod
+    def render(prompt: str, width: int, height: int, variant: int = 0) -> bytes:
+        from PIL import Image, ImageDraw
+
+        seed = hashlib.sha256(f"{prompt}|{width}x{height}|{variant}".encode("utf-8")).digest()
+        top = tuple(seed[0:3])
+        bottom = tuple(seed[3:6])
+
+        image = Image.new("RGB", (width, height))
+        draw = ImageDraw.Draw(image)
+        for y in range(height):
+            ratio = y / max(1, height - 1)
+            draw.line([(0, y), (width, y)], fill=tuple(int(t + (b - t) * ratio) for t, b in zip(top, bottom)))
+
+        # A few seeded shapes so variants are visually distinguishable
+        for i in range(4):
+            x, y = seed[6 + i] / 255 * width, seed[10 + i] / 255 * height
+            radius = 20 + seed[14 + i] / 255 * width / 3
+            draw.ellipse([x - radius, y - radius, x + radius, y + radius], outline=tuple(seed[18 + i:21 + i]), width=4)
+
+        text = "\n".join(textwrap.wrap(prompt, width=max(10, width // 12))[:12])
+        draw.multiline_text((24, height // 3), text, fill=(255, 255, 255), spacing=6)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        return buffer.getvalue()
+
+    async def generate(self, prompt: str, model: str, width: int, height: int, steps: int, n: int = 1) -> List[Any]:
+        images = await asyncio.gather(*(
+            asyncio.to_thread(self.render, prompt, width, height, variant) for variant in range(n)
+        ))
+        return [SimpleNamespace(url=None, b64_json=base64.b64encode(data).decode("ascii")) for data in images]
+
+
+class ProviderHealth:
+    """Rolling latency window and failure streak for one provider."""
+
+    def __init__(
+        self,
+        window: int = 50,
+        failure_threshold: int = IMAGE_PROVIDER_FAILURE_THRESHOLD,
+        cooldown_seconds: float = IMAGE_PROVIDER_COOLDOWN_SECONDS,
+        default_hedge_seconds: float = IMAGE_HEDGE_DEFAULT_SECONDS
+    ):
+        self.latencies = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.default_hedge_seconds = default_hedge_seconds
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.successes = 0
+        self.failures = 0
+
+    def p95(self) -> float:
+        """95th percentile latency, or the default until there are enough samples."""
+        if len(self.latencies) < 5:
+            return self.default_hedge_seconds
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.cooldown_until = time.monotonic() + self.cooldown_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "available": self.available(),
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "p95_seconds": round(self.p95(), 2),
+            "samples": len(self.latencies)
+        }
+
+
+class ImageProviderRouter:
+    """Ordered providers with health tracking, failover and p95 hedging, plus a shared download session."""
+
+    def __init__(self, providers: List[ImageProvider]):
+        self.providers = providers
+        self.health = {provider.name: ProviderHealth() for provider in providers}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    def get(self, name: str) -> Optional[ImageProvider]:
+        return next((provider for provider in self.providers if provider.name == name), None)
+
+    async def _timed_generate(self, provider: ImageProvider, **request) -> List[Any]:
+        health = self.health[provider.name]
+        started = time.monotonic()
+        try:
+            items = await provider.generate(**request)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        if not items:
+            health.record_failure()
+            raise Exception("No image data in response")
+        health.record_success(time.monotonic() - started)
+        return items
+
+    async def generate(self, prompt: str, model: str, width: int, height: int, steps: int, n: int = 1) -> Dict[str, Any]:
+        """
+        Generate with the first healthy provider, hedging to the next one past its p95.
+
+        Returns:
+            {"provider": name, "items": [...], "cacheable": bool}
+        """
+        candidates = [p for p in self.providers if self.health[p.name].available()] or list(self.providers)
+        if not candidates:
+            raise Exception("No image providers configured (set IMAGE_PROVIDERS)")
+
+        request = {"prompt": prompt, "model": model, "width": width, "height": height, "steps": steps, "n": n}
+        loop = asyncio.get_running_loop()
+        tasks: Dict[asyncio.Task, ImageProvider] = {}
+        errors = []
+        next_index = 0
+        hedge_at = None
+
+        def launch() -> None:
+            nonlocal next_index, hedge_at
+            provider = candidates[next_index]
+            next_index += 1
+            tasks[asyncio.ensure_future(self._timed_generate(provider, **request))] = provider
+            hedge_at = loop.time() + self.health[provider.name].p95()
+
+        launch()
+        try:
+            while tasks:
+                timeout = max(0.0, hedge_at - loop.time()) if next_index < len(candidates) else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    slow = [p.name for p in tasks.values()]
+                    print(f"⏱️ {', '.join(slow)} slower than p95, hedging with {candidates[next_index].name}")
+                    launch()
+                    continue
+
+                for task in done:
+                    provider = tasks.pop(task)
+                    try:
+                        items = task.result()
+                    except Exception as e:
+                        errors.append(f"{provider.name}: {str(e)}")
+                        print(f"⚠️ Image provider {provider.name} failed: {str(e)}")
+                        continue
+                    return {"provider": provider.name, "items": items, "cacheable": provider.cacheable}
+
+                # Everything in flight failed: fail over immediately instead of waiting for the hedge
+                if not tasks and next_index < len(candidates):
+                    launch()
+
+            raise Exception("All image providers failed: " + "; ".join(errors))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Shared session for the running event loop (sessions cannot cross loops)."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+            self._session_loop = loop
+        return self._session
+
+    async def download(self, url: str, output_path: str, chunk_size: int = IMAGE_DOWNLOAD_CHUNK_SIZE) -> bool:
+        """Stream a result to disk in chunks; the file only appears once it is complete."""
+        await asyncio.to_thread(os.makedirs, os.path.dirname(output_path), exist_ok=True)
+        session = await self.get_session()
+        tmp_path = f"{output_path}.part"
+
+        async with session.get(url) as response:
+            if response.status != 200:
+                print(f"Image download failed: HTTP {response.status}")
+                return False
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    await f.write(chunk)
+
+        await asyncio.to_thread(os.replace, tmp_path, output_path)
+        return True
+
+    def health_report(self) -> Dict[str, Dict[str, Any]]:
+        return {name: health.snapshot() for name, health in self.health.items()}
+
+    async def close(self) -> None:
+        """Close the shared session and provider resources."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        for provider in self.providers:
+            await provider.close()
+
+
+def build_providers(spec: str = IMAGE_PROVIDERS) -> List[ImageProvider]:
+    """Parse IMAGE_PROVIDERS: comma-separated "together", "together:<model>" or "local" entries."""
+    providers: List[ImageProvider] = []
+    for entry in [e.strip() for e in spec.split(",") if e.strip()]:
+        name, _, option = entry.partition(":")
+        if name == "together":
+            if not TOGETHER_AVAILABLE or not TOGETHER_API_KEY:
+                print(f"Skipping image provider '{entry}': Together client or TogetherAI_API_KEY missing")
+                continue
+            providers.append(TogetherImageProvider(model=option or None))
+        elif name == "local":
+            providers.append(LocalImageProvider())
+        else:
+            print(f"Unknown image provider '{entry}' in IMAGE_PROVIDERS, ignoring")
+    return providers
+
+
+# Process-wide router shared by all image generation calls
+image_provider = ImageProviderRouter(build_providers())
@@ -0,0 +1,155 @@
+"""
+Async Pexels API client for b-roll search.
+
+All searches share one aiohttp session, so image and video queries for every
+prompt can run concurrently. Requests pass through a token bucket that paces
+them locally. The bucket also tracks the quota Pexels reports in the
+X-Ratelimit-Limit / -Remaining / -Reset headers: once the quota is used up,
+requests wait for the reset, or fail fast if the reset is too far away.
+"""
+
+import os
+import time
+import asyncio
+import aiohttp
+from typing import Any, Dict, List, Optional
+
+PEXELS_IMAGE_URL = "https://api.pexels.com/v1/search"
+PEXELS_VIDEO_URL = "https://api.pexels.com/videos/search"
+
+PEXELS_REQUESTS_PER_SECOND = float(os.getenv("PEXELS_REQUESTS_PER_SECOND", "5"))
+PEXELS_BURST = int(os.getenv("PEXELS_BURST", "10"))
+PEXELS_MAX_RATE_LIMIT_WAIT = float(os.getenv("PEXELS_MAX_RATE_LIMIT_WAIT", "30"))  # Seconds worth waiting for a quota reset
+
+
+class PexelsRateLimitError(Exception):
+    """Raised when the Pexels quota is exhausted for longer than we are willing to wait."""
+
+
+class PexelsRateLimiter:
+    """Token bucket for local pacing, capped by the remaining quota reported by Pexels."""
+
+    def __init__(self, rate: float = PEXELS_REQUESTS_PER_SECOND, burst: int = PEXELS_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None  # Unix time at which the quota resets
+
+    def _wait_time(self) -> float:
+        if self.remaining is not None and self.remaining <= 0:
+            if self.reset_at is None:
+                return float("inf")
+            if self.reset_at > time.time():
+                return self.reset_at - time.time()
+            self.remaining = None  # Reset passed; the next response reports the new quota
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        while True:
+            wait = self._wait_time()
+            if wait <= 0:
+                self.tokens -= 1
+                if self.remaining is not None:
+                    self.remaining -= 1  # Reserve quota until the response reports the real figure
+                return
+            if wait > PEXELS_MAX_RATE_LIMIT_WAIT:
+                raise PexelsRateLimitError(f"Pexels quota exhausted, resets in {wait:.0f}s")
+            await asyncio.sleep(wait)
+
+    def update(self, headers: Any) -> None:
+        """Sync with the X-Ratelimit-* headers of a response."""
+        try:
+            if headers.get("X-Ratelimit-Limit") is not None:
+                self.limit = int(headers["X-Ratelimit-Limit"])
+            if headers.get("X-Ratelimit-Remaining") is not None:
+                self.remaining = int(headers["X-Ratelimit-Remaining"])
+            if headers.get("X-Ratelimit-Reset") is not None:
+                self.reset_at = float(headers["X-Ratelimit-Reset"])
+        except (TypeError, ValueError):
+            pass
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "resets_in": round(self.reset_at - time.time()) if self.reset_at else None
+        }
+
+
+class PexelsClient:
+    """Shared-session, rate-limited Pexels search client."""
+
+    def __init__(self, api_key: Optional[str] = None, limiter: Optional[PexelsRateLimiter] = None):
+        self.api_key = api_key
+        self.limiter = limiter or PexelsRateLimiter()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Shared session for the running event loop (sessions cannot cross loops)."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            if self._session is not None and not self._session.closed:
+                await self._close_stale_session(self._session, self._session_loop)
+            self._session = aiohttp.ClientSession(
+                headers={"Authorization": self.api_key or os.getenv("PEXELS_API_KEY", "")},
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+            self._session_loop = loop
+        return self._session
+
+    @staticmethod
+    async def _close_stale_session(session: aiohttp.ClientSession, session_loop) -> None:
+        """Close a session left over from an earlier event loop (e.g. a previous asyncio.run)."""
+        if session_loop is not None and session_loop.is_running():
+            # Its loop still runs in another thread; close it there
+            asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            print(f"Could not close previous Pexels session: {str(e)}")
+
+    async def _get_json(self, url: str, params: Dict[str, Any], retries: int = 2) -> Dict[str, Any]:
+        session = await self.get_session()
+        for attempt in range(retries + 1):
+            await self.limiter.acquire()
+            async with session.get(url, params=params) as response:
+                self.limiter.update(response.headers)
+                if response.status == 429 and attempt < retries:
+                    # Rate limited despite the bucket (e.g. another process shares the key); back off and retry
+                    print(f"Pexels rate limited, retrying ({attempt + 1}/{retries})")
+                    self.limiter.tokens = 0
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                response.raise_for_status()
+                return await response.json()
+        return {}
+
+    async def search_photos(self, query: str, per_page: int = 2) -> List[Dict[str, Any]]:
+        data = await self._get_json(PEXELS_IMAGE_URL, {"query": query, "per_page": per_page})
+        return data.get("photos", [])
+
+    async def search_videos(self, query: str, per_page: int = 2, orientation: Optional[str] = None) -> List[Dict[str, Any]]:
+        params = {"query": query, "per_page": per_page}
+        if orientation:
+            params["orientation"] = orientation
+        data = await self._get_json(PEXELS_VIDEO_URL, params)
+        return data.get("videos", [])
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Process-wide client shared by all b-roll searches
+pexels_client = PexelsClient()
@@ -1,12 +1,16 @@
 from langchain_core.tools import tool
 from typing import List, Dict
 import os
+import json
+import asyncio
 from langchain_community.chat_models import ChatLiteLLM
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 import re
 import uuid
 
+from storage.prompt_memo import prompt_memo
+
 # Load environment variables
 load_dotenv("../.env")
 
@@ -57,27 +61,86 @@ def extract_prompts_from_llm_response(response_text: str, num_prompts: int = 5)
     print("❌ No PROMPT patterns found in LLM response")
     return []
 
-@tool
-def generate_prompts_from_script(script_content: str, num_prompts: int = 5) -> List[Dict]:
-    """
-    Generate multiple image prompts for different scenes in a script using LLM.
+# Scripts longer than this are split at their section headers and prompted per section
+PROMPT_CHUNK_CHARS = int(os.getenv("PROMPT_CHUNK_CHARS", "1500"))
+
+# Section header with timing, e.g. "[15-45s: MAIN CONTENT]"
+SCRIPT_SECTION_PATTERN = re.compile(r'\[\s*(\d+)\s*-\s*(\d+)s\s*:\s*([^\]]+)\]')
+
+# Structured output: the model returns a JSON object instead of free text
+deepseek_json_model = deepseek_model.bind(response_format={"type": "json_object"})
+
+def split_script_sections(script_content: str) -> List[Dict]:
+    """Split a script at its section headers; text before the first header is kept as its own section."""
+    matches = list(SCRIPT_SECTION_PATTERN.finditer(script_content))
+    if not matches:
+        return [{"header": "", "start": None, "end": None, "text": script_content.strip()}]
     
-    Args:
-        script_content: The script content to generate prompts from
-        num_prompts: Number of prompts to generate (default: 5)
-        
-    Returns:
-        List of dictionaries containing prompt metadata
+    sections = []
+    preamble = script_content[:matches[0].start()].strip()
+    if preamble:
+        sections.append({"header": "", "start": None, "end": None, "text": preamble})
+    
+    for i, match in enumerate(matches):
+        text_end = matches[i + 1].start() if i + 1 < len(matches) else len(script_content)
+        text = script_content[match.end():text_end].strip()
+        if text:
+            sections.append({
+                "header": match.group(0),
+                "start": int(match.group(1)),
+                "end": int(match.group(2)),
+                "text": text
+            })
+    return sections
+
+def _split_long_section(section: Dict, max_chars: int = PROMPT_CHUNK_CHARS) -> List[Dict]:
+    """Split an oversized section at sentence boundaries, dividing its time range by length."""
+    if len(section["text"]) <= max_chars:
+        return [section]
+    
+    pieces, current = [], ""
+    for sentence in re.split(r'(?<=[.!?])\s+', section["text"]):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    
+    chunks = []
+    offset = 0
+    total_chars = sum(len(piece) for piece in pieces)
+    for piece in pieces:
+        chunk = {"header": section["header"], "start": None, "end": None, "text": piece}
+        if section["start"] is not None:
+            span = section["end"] - section["start"]
+            chunk["start"] = section["start"] + span * offset / total_chars
+            chunk["end"] = section["start"] + span * (offset + len(piece)) / total_chars
+        offset += len(piece)
+        chunks.append(chunk)
+    return chunks
+
+def _allocate_prompts(sections: List[Dict], num_prompts: int) -> List[int]:
+    """Spread num_prompts over sections in proportion to their length (largest remainder).
+    
+    When there are enough prompts every section gets at least one, so short sections like the hook are covered.
     """
-    try:
-        print(f"🎨 Generating {num_prompts} content-specific image prompts from script...")
-        print(f"📝 Script length: {len(script_content)} characters")
-        
-        # Create a specific prompt for the LLM
-        llm_prompt = f"""Analyze the following script content and create {num_prompts} specific visual image prompts.
+    base = 1 if num_prompts >= len(sections) else 0
+    remaining = num_prompts - base * len(sections)
+    total_chars = sum(len(section["text"]) for section in sections) or 1
+    shares = [remaining * len(section["text"]) / total_chars for section in sections]
+    counts = [base + int(share) for share in shares]
+    by_remainder = sorted(range(len(sections)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    for i in by_remainder[:num_prompts - sum(counts)]:
+        counts[i] += 1
+    return counts
 
+def _build_script_prompt_request(script_text: str, num_prompts: int, section: str = "") -> str:
+    section_line = f"\nSCRIPT SECTION: {section}\n" if section else ""
+    return f"""Analyze the following script content and create {num_prompts} specific visual image prompts.
+{section_line}
 SCRIPT CONTENT:
-{script_content[:1500]}
+{script_text}
 
 Your task: Create {num_prompts} image generation prompts that are directly related to the provided script content.
 
@@ -86,95 +149,107 @@ IMPORTANT RULES:
 2. Avoid generic tech/business prompts unless explicitly mentioned in the script.
 3. Reference specific concepts, people, events, or objects mentioned in the script.
 4. Each prompt must be unique, visually descriptive, and at least 30 characters long.
-5. Use the following format exactly, with no additional text before or after:
+5. Respond with ONLY a JSON object in this exact shape:
 
-PROMPT 1: [Specific visual description based on script content]
-PROMPT 2: [Specific visual description based on script content]
-PROMPT 3: [Specific visual description based on script content]
-PROMPT 4: [Specific visual description based on script content]
-PROMPT 5: [Specific visual description based on script content]
+{{"prompts": [{{"visual_description": "<specific visual description based on script content>", "mood_style": "<2-4 style words>", "key_elements": ["<element>", "<element>"]}}]}}
 
-Example format:
-PROMPT 1: Professional visualization of a futuristic AI interface from the script, showing a glowing terminal with code execution
-PROMPT 2: Illustration depicting a specific AI agent from the script fixing bugs in a vibrant code editor
+Example visual_description: "Professional visualization of a futuristic AI interface from the script, showing a glowing terminal with code execution"
 """
 
-        # Call LLM
-        print("🔄 Calling DeepSeek LLM for content analysis...")
-        response = deepseek_model.invoke([HumanMessage(content=llm_prompt)])
-        llm_response = response.content.strip()
-        
-        print(f"📥 LLM Response length: {len(llm_response)} characters")
-        print(f"📄 Response preview: {llm_response[:300]}...")
-        
-        # Extract prompts from LLM response
-        prompts = extract_prompts_from_llm_response(llm_response, num_prompts)
-        
-        if not prompts:
-            print("❌ No valid prompts extracted from LLM response")
-            return []
-        
-        print(f"✅ Generated {len(prompts)} content-specific prompts")
-        return prompts
-        
-    except Exception as e:
-        print(f"❌ Error generating content-specific prompts: {str(e)}")
-        return []
+async def _generate_section_prompts(section: Dict, num_prompts: int) -> List[Dict]:
+    """One structured LLM call for a script section."""
+    response = await deepseek_json_model.ainvoke([
+        HumanMessage(content=_build_script_prompt_request(section["text"][:PROMPT_CHUNK_CHARS], num_prompts, section["header"]))
+    ])
+    
+    try:
+        data = json.loads(response.content)
+        entries = data.get("prompts", []) if isinstance(data, dict) else data
+    except (json.JSONDecodeError, AttributeError):
+        # Model ignored the response format; the PROMPT X: parser still recovers plain-text answers
+        print("⚠️ Structured response was not valid JSON, falling back to text extraction")
+        return extract_prompts_from_llm_response(response.content, num_prompts)
+    
+    prompts = []
+    for entry in entries[:num_prompts]:
+        if isinstance(entry, str):
+            entry = {"visual_description": entry}
+        description = str(entry.get("visual_description", "")).strip()
+        if len(description) > 20:  # Ensure meaningful descriptions
+            prompts.append({
+                "id": str(uuid.uuid4()),
+                "visual_description": description,
+                "mood_style": entry.get("mood_style") or "dynamic, engaging",
+                "key_elements": entry.get("key_elements") or [],
+                "technical_specs": "high resolution, cinematic"
+            })
+    return prompts
 
 @tool
-def generate_shot_specific_prompts(shot_breakdown: List[Dict]) -> List[Dict]:
+async def generate_prompts_from_script(script_content: str, num_prompts: int = 5) -> List[Dict]:
     """
-    Generate shot-specific visual prompts based on individual shots from script analysis.
+    Generate multiple image prompts for different scenes in a script using LLM.
     
     Args:
-        shot_breakdown: List of shot dictionaries with text, type, and metadata
+        script_content: The script content to generate prompts from
+        num_prompts: Number of prompts to generate (default: 5)
         
     Returns:
-        List of dictionaries containing shot-specific visual prompts
+        List of dictionaries containing prompt metadata
     """
     try:
-        print(f"🎯 Generating shot-specific prompts for {len(shot_breakdown)} shots...")
+        print(f"🎨 Generating {num_prompts} content-specific image prompts from script...")
+        print(f"📝 Script length: {len(script_content)} characters")
+        
+        # Short scripts go out in one call; long ones are prompted section by section concurrently
+        if len(script_content) <= PROMPT_CHUNK_CHARS:
+            sections = [{"header": "", "start": None, "end": None, "text": script_content.strip()}]
+        else:
+            sections = [chunk for section in split_script_sections(script_content) for chunk in _split_long_section(section)]
         
-        shot_prompts = []
+        counts = _allocate_prompts(sections, num_prompts)
+        work = [(section, count) for section, count in zip(sections, counts) if count > 0]
         
-        for shot in shot_breakdown:
-            shot_number = shot.get('shot_number', 0)
-            shot_text = shot.get('text', '')
-            shot_type = shot.get('type', 'talking_head')
-            section = shot.get('section', '')
-            
-            if not shot_text:
+        print(f"🔄 Calling DeepSeek LLM for {len(work)} script section(s)...")
+        results = await asyncio.gather(
+            *(_generate_section_prompts(section, count) for section, count in work),
+            return_exceptions=True
+        )
+        
+        # Merge in script order, numbering scenes across sections
+        prompts = []
+        for (section, count), section_prompts in zip(work, results):
+            if isinstance(section_prompts, Exception):
+                print(f"❌ Prompt generation failed for section {section['header'] or '(untitled)'}: {str(section_prompts)}")
                 continue
-                
-            print(f"Processing shot {shot_number}: {shot_text[:50]}...")
-            
-            # Generate prompt based on shot type
-            visual_prompt = generate_prompt_for_shot_type(shot_text, shot_type, section)
-            
-            shot_prompts.append({
-                "id": str(uuid.uuid4()),
-                "shot_number": shot_number,
-                "original_text": shot_text,
-                "shot_type": shot_type,
-                "section": section,
-                "visual_description": visual_prompt,
-                "prompt": visual_prompt,  # For backward compatibility
-                "mood_style": get_mood_for_shot_type(shot_type),
-                "technical_specs": "9:16 vertical format, high resolution, professional lighting"
-            })
+            for i, prompt in enumerate(section_prompts):
+                scene_number = len(prompts) + 1
+                prompt["scene_number"] = scene_number
+                if section["start"] is not None:
+                    step = (section["end"] - section["start"]) / max(1, len(section_prompts))
+                    prompt["timing"] = f"{round(section['start'] + i * step)}-{round(section['start'] + (i + 1) * step)} seconds"
+                else:
+                    prompt["timing"] = f"{(scene_number - 1) * 12}-{scene_number * 12} seconds"
+                prompts.append(prompt)
         
-        print(f"✅ Generated {len(shot_prompts)} shot-specific prompts")
-        return shot_prompts
+        if not prompts:
+            print("❌ No valid prompts extracted from LLM response")
+            return []
+        
+        print(f"✅ Generated {len(prompts)} content-specific prompts")
+        return prompts[:num_prompts]
         
     except Exception as e:
-        print(f"❌ Error generating shot-specific prompts: {str(e)}")
+        print(f"❌ Error generating content-specific prompts: {str(e)}")
         return []
 
-def generate_prompt_for_shot_type(shot_text: str, shot_type: str, section: str) -> str:
-    """Generate appropriate visual prompt based on shot type and content"""
-    
-    # Use AI to generate contextually relevant visual prompts
-    system_prompt = """You are an expert visual director for social media content. Create a single, cohesive visual prompt for image generation based on the script text provided.
+# Shot prompts can be generated one LLM call per shot ("concurrent") or several shots per call ("batched")
+PROMPT_GENERATION_MODE = os.getenv("PROMPT_GENERATION_MODE", "concurrent")
+PROMPT_CONCURRENCY = int(os.getenv("PROMPT_CONCURRENCY", "5"))
+PROMPT_BATCH_SIZE = int(os.getenv("PROMPT_BATCH_SIZE", "10"))
+
+# Shared by every shot prompt call, and always sent first, so provider-side prompt caching can reuse it
+SHOT_PROMPT_SYSTEM = """You are an expert visual director for social media content. Create a single, cohesive visual prompt for image generation based on the script text provided.
 
 REQUIREMENTS:
 1. Write ONE unified prompt (40-60 words) that captures the complete visual scene
@@ -202,7 +277,15 @@ Use: "AI chatbot interface displaying controversial messages with glowing red er
 
 Create ONE cohesive prompt that focuses on the subject matter, not the presenter."""
 
-    user_prompt = f"""
+# Batched calls append their output format after the shared prefix
+SHOT_PROMPT_BATCH_INSTRUCTIONS = """
+
+BATCH MODE:
+You will receive several shots as a JSON array. Apply the rules above to each shot independently.
+Respond with ONLY a JSON object of the form {"prompts": [{"shot_number": <number>, "prompt": "<visual prompt>"}]} containing one entry per shot."""
+
+def _build_shot_user_prompt(shot_text: str, shot_type: str, section: str) -> str:
+    return f"""
 Shot Type: {shot_type}
 Section: {section}
 Script Text: "{shot_text}"
@@ -210,27 +293,171 @@ Script Text: "{shot_text}"
 Analyze this script text and create a specific visual prompt for image generation. Extract the key people, concepts, events, or elements mentioned and translate them into compelling visuals that directly support this part of the story.
 """
 
+def _clean_visual_prompt(visual_prompt: str) -> str:
+    """Strip quotes and make sure the format specification is included."""
+    visual_prompt = visual_prompt.strip().strip('"\'')
+    
+    if "9:16" not in visual_prompt and "vertical" not in visual_prompt.lower():
+        visual_prompt += ", vertical 9:16 format"
+    
+    return visual_prompt
+
+def _fallback_visual_prompt(shot_type: str) -> str:
+    # Generic fallback that works for any content
+    return f"Professional {shot_type} shot supporting the narrative, clean modern aesthetic, vertical 9:16 format"
+
+def _build_shot_prompt_record(shot: Dict, visual_prompt: str) -> Dict:
+    shot_type = shot.get('type', 'talking_head')
+    return {
+        "id": str(uuid.uuid4()),
+        "shot_number": shot.get('shot_number', 0),
+        "fingerprint": shot.get('fingerprint'),
+        "original_text": shot.get('text', ''),
+        "shot_type": shot_type,
+        "section": shot.get('section', ''),
+        "visual_description": visual_prompt,
+        "prompt": visual_prompt,  # For backward compatibility
+        "mood_style": get_mood_for_shot_type(shot_type),
+        "technical_specs": "9:16 vertical format, high resolution, professional lighting"
+    }
+
+def _parse_batch_response(response_text: str) -> Dict[int, str]:
+    """Map shot_number -> prompt from a batched JSON response."""
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text)
+    
+    data = json.loads(text)
+    entries = data.get("prompts", []) if isinstance(data, dict) else data
+    
+    prompts = {}
+    for entry in entries:
+        if isinstance(entry, dict) and entry.get("prompt"):
+            prompts[int(entry.get("shot_number", 0))] = entry["prompt"]
+    return prompts
+
+async def _generate_prompts_concurrent(shots: List[Dict], concurrency: int = PROMPT_CONCURRENCY) -> List[str]:
+    """One LLM call per shot, at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def generate(shot: Dict) -> str:
+        async with semaphore:
+            print(f"Processing shot {shot.get('shot_number', 0)}: {shot.get('text', '')[:50]}...")
+            return await agenerate_prompt_for_shot_type(
+                shot.get('text', ''), shot.get('type', 'talking_head'), shot.get('section', '')
+            )
+    
+    return await asyncio.gather(*(generate(shot) for shot in shots))
+
+async def _generate_prompts_batched(
+    shots: List[Dict],
+    batch_size: int = PROMPT_BATCH_SIZE,
+    concurrency: int = PROMPT_CONCURRENCY
+) -> List[str]:
+    """Several shots per LLM call; chunks keep each request well under the context limit.
+    
+    Shots missing from a batch response are retried individually.
+    """
+    # Shots already in the memo never enter a batch
+    memoized = [prompt_memo.get(shot.get('text', ''), shot.get('type', 'talking_head'), shot.get('section', '')) for shot in shots]
+    pending = [shot for shot, prompt in zip(shots, memoized) if prompt is None]
+    if len(pending) < len(shots):
+        print(f"Served {len(shots) - len(pending)} shot prompts from memo")
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    chunks = [pending[i:i + max(1, batch_size)] for i in range(0, len(pending), max(1, batch_size))]
+    
+    async def generate_chunk(chunk: List[Dict]) -> List[str]:
+        shot_list = [
+            {
+                "shot_number": shot.get('shot_number', index),
+                "shot_type": shot.get('type', 'talking_head'),
+                "section": shot.get('section', ''),
+                "script_text": shot.get('text', '')
+            } for index, shot in enumerate(chunk)
+        ]
+        
+        batch_prompts = {}
+        async with semaphore:
+            print(f"Processing shots {shot_list[0]['shot_number']}-{shot_list[-1]['shot_number']} in one batch...")
+            try:
+                response = await deepseek_model.ainvoke([
+                    {"role": "system", "content": SHOT_PROMPT_SYSTEM + SHOT_PROMPT_BATCH_INSTRUCTIONS},
+                    {"role": "user", "content": json.dumps(shot_list, indent=2)}
+                ])
+                batch_prompts = _parse_batch_response(response.content)
+            except Exception as e:
+                print(f"Batched prompt generation failed, falling back to per-shot calls: {str(e)}")
+        
+        prompts = [None] * len(chunk)
+        for index, (shot, entry) in enumerate(zip(chunk, shot_list)):
+            if entry["shot_number"] in batch_prompts:
+                prompts[index] = _clean_visual_prompt(batch_prompts[entry["shot_number"]])
+                prompt_memo.set(entry["script_text"], entry["shot_type"], entry["section"], prompts[index])
+        
+        missing = [index for index, prompt in enumerate(prompts) if prompt is None]
+        if missing:
+            retried = await _generate_prompts_concurrent([chunk[index] for index in missing], concurrency)
+            for index, prompt in zip(missing, retried):
+                prompts[index] = prompt
+        
+        return prompts
+    
+    results = await asyncio.gather(*(generate_chunk(chunk) for chunk in chunks))
+    generated = iter([prompt for chunk_prompts in results for prompt in chunk_prompts])
+    return [prompt if prompt is not None else next(generated) for prompt in memoized]
+
+@tool
+async def generate_shot_specific_prompts(shot_breakdown: List[Dict], mode: str = PROMPT_GENERATION_MODE) -> List[Dict]:
+    """
+    Generate shot-specific visual prompts based on individual shots from script analysis.
+    
+    Args:
+        shot_breakdown: List of shot dictionaries with text, type, and metadata
+        mode: "concurrent" for parallel per-shot LLM calls, "batched" for several shots per call
+        
+    Returns:
+        List of dictionaries containing shot-specific visual prompts
+    """
     try:
-        response = deepseek_model.invoke([
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ])
+        shots = [shot for shot in shot_breakdown if shot.get('text')]
+        print(f"🎯 Generating shot-specific prompts for {len(shots)} shots ({mode} mode)...")
         
-        visual_prompt = response.content.strip()
+        if mode == "batched":
+            visual_prompts = await _generate_prompts_batched(shots)
+        else:
+            visual_prompts = await _generate_prompts_concurrent(shots)
         
-        # Clean up the response
-        visual_prompt = visual_prompt.strip('"\'')
+        shot_prompts = [
+            _build_shot_prompt_record(shot, visual_prompt)
+            for shot, visual_prompt in zip(shots, visual_prompts)
+        ]
+        
+        print(f"✅ Generated {len(shot_prompts)} shot-specific prompts")
+        return shot_prompts
         
-        # Ensure format specification is included
-        if "9:16" not in visual_prompt and "vertical" not in visual_prompt.lower():
-            visual_prompt += ", vertical 9:16 format"
-            
+    except Exception as e:
+        print(f"❌ Error generating shot-specific prompts: {str(e)}")
+        return []
+
+async def agenerate_prompt_for_shot_type(shot_text: str, shot_type: str, section: str) -> str:
+    """Generate a visual prompt for one shot based on its type and content, served from the memo when possible"""
+    memoized = prompt_memo.get(shot_text, shot_type, section)
+    if memoized:
+        return memoized
+    
+    try:
+        response = await deepseek_model.ainvoke([
+            {"role": "system", "content": SHOT_PROMPT_SYSTEM},
+            {"role": "user", "content": _build_shot_user_prompt(shot_text, shot_type, section)}
+        ])
+        visual_prompt = _clean_visual_prompt(response.content)
+        prompt_memo.set(shot_text, shot_type, section, visual_prompt)
         return visual_prompt
         
     except Exception as e:
         print(f"Error generating visual prompt with AI: {str(e)}")
-        # Generic fallback that works for any content
-        return f"Professional {shot_type} shot supporting the narrative, clean modern aesthetic, vertical 9:16 format"
+        return _fallback_visual_prompt(shot_type)
 
 def extract_visual_context(text: str) -> str:
     """Extract key visual concepts from text for fallback scenarios"""
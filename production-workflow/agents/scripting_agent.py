@@ -1,11 +1,14 @@
 from langchain_core.tools import tool
 from langchain_community.chat_models import ChatLiteLLM
 from langchain_core.messages import HumanMessage
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
 import os
 import re
+import asyncio
 from dotenv import load_dotenv
 
+from storage.shot_manifest import shot_fingerprint
+
 # Load environment variables
 load_dotenv()
 
@@ -17,49 +20,56 @@ deepseek_model = ChatLiteLLM(
     temperature=0.5
 )
 
-@tool
-async def generate_youtube_script(
-    article_content: str,
-    article_title: str,
-    platform: str = "youtube",
-    duration: int = 60
-) -> str:
+# Matches a section header as it appears in raw LLM output, e.g. "[0-5s: HOOK]"
+SECTION_HEADER_PATTERN = re.compile(r'\[\s*\d+\s*-\s*\d+s\s*:\s*[^\]]+\]')
+
+class ScriptSectionParser:
     """
-    Generate a voiceover-friendly YouTube script in Varun Mayya's style from article content using AI.
+    Splits streamed script text into {"header", "content"} sections.
     
-    Args:
-        article_content: The actual article content to base the script on
-        article_title: Title of the article
-        platform: Target platform (youtube, tiktok, etc.)
-        duration: Target duration in seconds
-        
-    Returns:
-        Plain text script optimized for voiceover
+    A section is only complete once the next header (or the end of the
+    script) has been seen.
     """
-    try:
-        print(f"Generating {platform} script in Varun Mayya's style from article content...")
-        print(f"Article title: {article_title}")
-        print(f"Content length: {len(article_content)} characters")
-        
-        # Clean and prepare the article content
-        clean_content = clean_article_content(article_content)
-        clean_title = clean_article_title(article_title)
-        
-        # Calculate target word count based on duration
-        # Using 2.5 words per second for natural speech pace
-        if duration <= 30:
-            target_words = 75
-        elif duration <= 60:
-            target_words = 225  # Increased from 150 to get 60s of audio
-        elif duration <= 180:
-            target_words = 450
-        else:
-            target_words = 900
-        
-        # Create the script generation prompt
-        # Replace your existing script_prompt with this improved version:
-
-        script_prompt = f"""You are an expert YouTube script writer who emulates Varun Mayya's engaging, conversational, and energetic style, creating voiceover-friendly content that captivates a tech-savvy audience.
+    
+    def __init__(self):
+        self.text = ""
+        self.sections_emitted = 0
+    
+    def _section(self, header, end: int) -> Dict[str, str]:
+        return {"header": header.group(0), "content": self.text[header.end():end].strip()}
+    
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """Add streamed text and return the sections it completed."""
+        self.text += text
+        headers = list(SECTION_HEADER_PATTERN.finditer(self.text))
+        completed = []
+        while self.sections_emitted < len(headers) - 1:
+            completed.append(self._section(headers[self.sections_emitted], headers[self.sections_emitted + 1].start()))
+            self.sections_emitted += 1
+        return completed
+    
+    def finish(self) -> List[Dict[str, str]]:
+        """Return the last section once the script has ended."""
+        headers = list(SECTION_HEADER_PATTERN.finditer(self.text))
+        if self.sections_emitted >= len(headers):
+            return []
+        self.sections_emitted = len(headers)
+        return [self._section(headers[-1], len(self.text))]
+
+def build_script_prompt(clean_content: str, clean_title: str, platform: str, duration: int) -> str:
+    """Build the script generation prompt from the cleaned article"""
+    # Calculate target word count based on duration
+    # Using 2.5 words per second for natural speech pace
+    if duration <= 30:
+        target_words = 75
+    elif duration <= 60:
+        target_words = 225  # Increased from 150 to get 60s of audio
+    elif duration <= 180:
+        target_words = 450
+    else:
+        target_words = 900
+    
+    return f"""You are an expert YouTube script writer who emulates Varun Mayya's engaging, conversational, and energetic style, creating voiceover-friendly content that captivates a tech-savvy audience.
 
         Your task is to create a compelling {duration}-second YouTube script based on this article content, styled like Varun Mayya's videos.
 
@@ -126,12 +136,73 @@ async def generate_youtube_script(
         - The script reads naturally when spoken aloud
 
         If the article content is long or complex, summarize the 3-5 most engaging points (e.g., key features, real-world impacts, or exciting developments). Do not include any additional text, metadata, or notes outside the script structure."""
+
+@tool
+async def generate_youtube_script(
+    article_content: str,
+    article_title: str,
+    platform: str = "youtube",
+    duration: int = 60
+) -> str:
+    """
+    Generate a voiceover-friendly YouTube script in Varun Mayya's style from article content using AI.
+    
+    Args:
+        article_content: The actual article content to base the script on
+        article_title: Title of the article
+        platform: Target platform (youtube, tiktok, etc.)
+        duration: Target duration in seconds
         
+    Returns:
+        Plain text script optimized for voiceover
+    """
+    script = ""
+    async for event in stream_youtube_script(article_content, article_title, platform, duration):
+        if event["type"] == "complete":
+            script = event["script"]
+    return script
+
+async def stream_youtube_script(
+    article_content: str,
+    article_title: str,
+    platform: str = "youtube",
+    duration: int = 60
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate a script like generate_youtube_script, yielding it while DeepSeek writes it.
+    
+    Yields:
+        {"type": "token", "text": ...}                      - every streamed chunk
+        {"type": "section", "header": ..., "content": ...}  - each section once the next header starts
+        {"type": "complete", "script": ...}                 - the cleaned script, or the fallback script
+    """
+    print(f"Generating {platform} script in Varun Mayya's style from article content...")
+    print(f"Article title: {article_title}")
+    print(f"Content length: {len(article_content)} characters")
+    
+    # Clean and prepare the article content
+    clean_content = clean_article_content(article_content)
+    clean_title = clean_article_title(article_title)
+    
+    script_prompt = build_script_prompt(clean_content, clean_title, platform, duration)
+    parser = ScriptSectionParser()
+    
+    try:
         # Generate script using Deepseek
         print("Calling DeepSeek LLM for script generation...")
-        response = await deepseek_model.ainvoke([HumanMessage(content=script_prompt)])
-        generated_script = response.content.strip()
+        async for chunk in deepseek_model.astream([HumanMessage(content=script_prompt)]):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if not text:
+                continue
+            
+            yield {"type": "token", "text": text}
+            for section in parser.feed(text):
+                yield {"type": "section", **section}
+        
+        for section in parser.finish():
+            yield {"type": "section", **section}
         
+        generated_script = parser.text.strip()
         print(f"Raw LLM response: {generated_script[:200]}...")
         print(f"Generated script length: {len(generated_script)} characters")
         
@@ -142,13 +213,11 @@ async def generate_youtube_script(
             print("Falling back to basic script generation due to invalid LLM response")
             clean_script = generate_fallback_script(clean_content, clean_title, duration)
         
-        return clean_script
-        
     except Exception as e:
         print(f"Error generating script: {str(e)}")
-        clean_content = clean_article_content(article_content)
-        clean_title = clean_article_title(article_title)
-        return generate_fallback_script(clean_content, clean_title, duration)
+        clean_script = generate_fallback_script(clean_content, clean_title, duration)
+    
+    yield {"type": "complete", "script": clean_script}
 
 def clean_article_content(content: str) -> str:
     """Clean and prepare article content for script generation"""
@@ -323,15 +392,23 @@ def generate_fallback_script(article_content: str, article_title: str, duration:
 async def generate_script_variations(
     base_script: str,
     num_variations: int = 3,
-    style_variations: List[str] = None
+    style_variations: List[str] = None,
+    max_concurrency: int = 3,
+    timeout_seconds: float = 90.0
 ) -> str:
     """
     Generate multiple variations of a script for A/B testing.
     
+    Variations are generated concurrently (up to max_concurrency LLM calls at once),
+    each bounded by timeout_seconds. Results keep the order of style_variations and a
+    failed or timed-out variation does not affect the others.
+    
     Args:
         base_script: The original script to create variations from
         num_variations: Number of variations to generate
         style_variations: List of style adjustments (e.g., ["more casual", "more technical"])
+        max_concurrency: Maximum number of variations generated at the same time
+        timeout_seconds: Time limit for each individual variation
         
     Returns:
         Plain text script variations
@@ -340,9 +417,9 @@ async def generate_script_variations(
         if style_variations is None:
             style_variations = ["more casual and conversational", "more technical and detailed", "more energetic and enthusiastic"]
         
-        variations = []
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
         
-        for i, style in enumerate(style_variations[:num_variations]):
+        async def generate_variation(style: str) -> str:
             variation_prompt = f"""Take this YouTube script and rewrite it to be {style}, while keeping the same core information and structure, in Varun Mayya's engaging, conversational style:
 
 ORIGINAL SCRIPT:
@@ -352,9 +429,29 @@ STYLE ADJUSTMENT: {style}
 
 Rewrite the script maintaining the same key information but adjusting the tone and delivery style. Keep it the same length and maintain the section structure ([0-5s: HOOK], [5-15s: INTRODUCTION], etc.). Use plain text with no emoticons or formatting markers."""
 
-            response = await deepseek_model.ainvoke([HumanMessage(content=variation_prompt)])
-            clean_variation = clean_generated_script(response.content, "", "", 60)
-            variations.append(f"VARIATION {i+1} - {style.upper()}:\n{clean_variation}\n")
+            async with semaphore:
+                response = await asyncio.wait_for(
+                    deepseek_model.ainvoke([HumanMessage(content=variation_prompt)]),
+                    timeout=timeout_seconds
+                )
+            return clean_generated_script(response.content, "", "", 60)
+        
+        styles = style_variations[:num_variations]
+        results = await asyncio.gather(
+            *(generate_variation(style) for style in styles),
+            return_exceptions=True
+        )
+        
+        variations = []
+        for i, (style, result) in enumerate(zip(styles, results)):
+            if isinstance(result, asyncio.TimeoutError):
+                print(f"Variation {i+1} ({style}) timed out after {timeout_seconds}s")
+                variations.append(f"VARIATION {i+1} - {style.upper()}:\nError: generation timed out after {timeout_seconds}s\n")
+            elif isinstance(result, Exception):
+                print(f"Variation {i+1} ({style}) failed: {str(result)}")
+                variations.append(f"VARIATION {i+1} - {style.upper()}:\nError: {str(result)}\n")
+            else:
+                variations.append(f"VARIATION {i+1} - {style.upper()}:\n{result}\n")
         
         return '\n\n'.join(variations).strip()
         
@@ -459,12 +556,15 @@ async def analyze_script_shots(script_content: str) -> Dict[str, Any]:
                         # Determine shot type based on content
                         shot_type = determine_shot_type(sentence, section_header)
                         
-                        shot_breakdown.append({
+                        shot = {
                             "shot_number": shot_number,
                             "text": sentence.strip(),
                             "section": section_header,
                             "type": shot_type
-                        })
+                        }
+                        # Content fingerprint lets later stages reuse artifacts for unchanged shots
+                        shot["fingerprint"] = shot_fingerprint(shot)
+                        shot_breakdown.append(shot)
                         
                         shot_timing.append({
                             "shot_number": shot_number,
@@ -0,0 +1,118 @@
+"""
+Local keyword extraction for stock media search.
+
+Turns detailed image-generation prompts into 2-3 word Pexels queries without
+an LLM call. Tokens are filtered with stopword, style-word and adjective
+heuristics (a light stand-in for POS tagging), then ranked by TF-IDF across
+the prompts searched together, with a bonus for words near the start of the
+prompt, where the main subject usually sits. Terms shared by many prompts of
+the set, and generic words that fit almost any prompt ("ai", "technology"),
+rank lower, so each prompt gets a distinctive query. A query depends on the
+whole prompt set, so it must be cached by prompt and set (prompt_set_hash).
+"""
+
+import re
+import math
+import hashlib
+from collections import Counter
+from typing import List
+
+DEFAULT_QUERY = "business technology"
+
+STOPWORDS = frozenset("""
+a an the and or but nor of to in on at for with from by as into onto over under about above below between
+through during before after while within without against across along around behind beside beyond near
+is are was were be been being has have had do does did can could will would should may might must shall
+it its this that these those there here their them they his her him she he we you your our us i me my
+which who whom whose what when where why how all any both each every few more most other some such only own
+same so than too very just also not no yes up down out off again then once one two three
+""".split())
+
+# Describe how the image should look rather than what is in it; stock libraries don't index these
+STYLE_WORDS = frozenset("""
+cinematic lighting light lit glow glowing vertical horizontal format aspect ratio portrait landscape
+quality resolution hd 4k 8k ultra detailed detail realistic photorealistic hyperrealistic style shot
+close closeup close-up wide angle view background foreground dramatic vibrant soft sharp focus depth field
+bokeh professional modern sleek minimalist futuristic composition color colors colour tones tone palette
+image photo photograph picture scene render rendering rendered camera lens mood atmosphere aesthetic
+high low bright dark warm cool clean dynamic stunning beautiful elegant epic visual visuals illustration
+displaying displayed showing shown featuring featured depicting depicted highlighting overlay overlays
+effect effects elements element
+""".split())
+
+# Suffixes that almost only form adjectives; nouns such as "detective" or "vegetable" end in
+# -ive/-able too often for those to be used
+ADJECTIVE_SUFFIXES = ("ous", "ful", "less", "ical", "ial")
+
+# Nouns, and words that mostly appear in noun compounds ("social media"), with an adjective suffix
+SUFFIX_NOUNS = frozenset("""
+material memorial tutorial editorial testimonial commercial official chemical musical initial social
+""".split())
+
+# Common prompt adjectives no suffix rule catches
+ADJECTIVES = frozenset("""
+friendly lonely lovely elderly costly angry happy sad busy crowded empty fresh young old new large small big tiny
+huge giant massive defensive aggressive creative innovative interactive expressive intense active
+visible incredible terrible comfortable reliable responsible remarkable
+""".split())
+
+# Fit almost any prompt in this channel, so they only win when nothing more specific is there
+GENERIC_TERMS = frozenset("ai technology tech digital business concept people person thing things".split())
+GENERIC_WEIGHT = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9'-]*")
+
+
+def _is_adjective(token: str) -> bool:
+    if token in ADJECTIVES:
+        return True
+    return len(token) > 5 and token.endswith(ADJECTIVE_SUFFIXES) and token not in SUFFIX_NOUNS
+
+
+def candidate_terms(prompt: str) -> List[str]:
+    """Searchable tokens of a prompt, in order of appearance."""
+    text = re.sub(r"vertical.*?format", " ", (prompt or "").lower())
+    terms = []
+    for token in TOKEN_PATTERN.findall(text):
+        token = token.strip("-'")
+        if token.endswith("'s"):
+            token = token[:-2]
+        if len(token) < 2 or token in STOPWORDS or token in STYLE_WORDS or _is_adjective(token):
+            continue
+        terms.append(token)
+    return terms
+
+
+def prompt_set_hash(prompts: List[str]) -> str:
+    """Identifies a prompt set regardless of order, for caching extract_keywords results."""
+    joined = "\n".join(sorted({(prompt or "").strip() for prompt in prompts}))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+
+
+def extract_keywords(prompts: List[str], max_terms: int = 3) -> List[str]:
+    """One search query per prompt, ranked by TF-IDF over the whole prompt set."""
+    documents = [candidate_terms(prompt) for prompt in prompts]
+    document_count = len(documents)
+    document_frequency = Counter(term for terms in documents for term in set(terms))
+
+    queries = []
+    for terms in documents:
+        if not terms:
+            queries.append(DEFAULT_QUERY)
+            continue
+
+        term_frequency = Counter(terms)
+        first_position = {}
+        for position, term in enumerate(terms):
+            first_position.setdefault(term, position)
+
+        def score(term: str) -> float:
+            idf = math.log((1 + document_count) / (1 + document_frequency[term])) + 1
+            position_bonus = 1 + 1 / (1 + first_position[term])
+            weight = GENERIC_WEIGHT if term in GENERIC_TERMS else 1.0
+            return term_frequency[term] * idf * position_bonus * weight
+
+        best = sorted(term_frequency, key=score, reverse=True)[:max_terms]
+        # Keep the prompt's word order so the query reads naturally ("robot arm factory")
+        queries.append(" ".join(sorted(best, key=first_position.get)))
+    return queries
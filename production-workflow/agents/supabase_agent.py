@@ -7,6 +7,8 @@ from datetime import datetime
 import json
 import hashlib
 
+from storage.lookup_cache import article_cache, script_cache, invalidate_article, invalidate_script
+
 # Initialize Supabase client
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_ANON_KEY")
@@ -111,6 +113,8 @@ def store_article_content_sync_wrapped(article_data: dict) -> str:
                 record_id = result.data[0]['id'] if result.data else "unknown"
                 print(f"✅ DEBUG - Article inserted. ID: {record_id}")
             
+            invalidate_article(url_hash)
+            
             return f"""
 ✅ **ARTICLE SUCCESSFULLY {action.upper()} IN SUPABASE**
 
@@ -210,6 +214,8 @@ def store_multiple_articles(articles_data: list) -> str:
                     # Insert new record
                     result = supabase.table('articles').insert(storage_data).execute()
                     stored_count += 1
+                
+                invalidate_article(url_hash)
                         
             except Exception as e:
                 errors.append(f"Article {i}: {str(e)}")
@@ -305,14 +311,16 @@ def get_article_by_url(url: str) -> str:
     """
     try:
         url_hash = hashlib.md5(url.encode()).hexdigest()
-        supabase = get_supabase_client()
         
-        response = supabase.table('articles').select('*').eq('url_hash', url_hash).execute()
+        def load_article():
+            supabase = get_supabase_client()
+            response = supabase.table('articles').select('*').eq('url_hash', url_hash).execute()
+            return response.data[0] if response.data else None
         
-        if not response.data:
-            return f"❌ Article not found in database for URL: {url}"
+        article = article_cache.get_or_load(("row", url_hash), load_article)
         
-        article = response.data[0]
+        if not article:
+            return f"❌ Article not found in database for URL: {url}"
         
         return f"""
 📰 **ARTICLE RETRIEVED FROM SUPABASE**
@@ -445,14 +453,18 @@ def get_article_id_by_url(url: str) -> str:
     """
     try:
         url_hash = hashlib.md5(url.encode()).hexdigest()
-        supabase = get_supabase_client()
         
-        response = supabase.table('articles').select('id,title').eq('url_hash', url_hash).execute()
+        # A full row cached by get_article_by_url already carries the ID
+        cached_article = article_cache.get(("row", url_hash))
+        if cached_article:
+            return cached_article['id']
         
-        if response.data:
-            return response.data[0]['id']
-        else:
-            return None
+        def load_article_id():
+            supabase = get_supabase_client()
+            response = supabase.table('articles').select('id,title').eq('url_hash', url_hash).execute()
+            return response.data[0]['id'] if response.data else None
+        
+        return article_cache.get_or_load(("id", url_hash), load_article_id)
         
     except Exception as e:
         return None
@@ -497,6 +509,7 @@ def store_script_content(script_data: dict) -> str:
         
         if result.data:
             script_id = result.data[0]['id']
+            invalidate_script(script_id)
             
             return f"""
 ✅ **SCRIPT SUCCESSFULLY STORED IN SUPABASE**
@@ -604,16 +617,18 @@ def get_script_by_id(script_id: str) -> str:
         Full script content if found
     """
     try:
-        supabase = get_supabase_client()
+        def load_script():
+            supabase = get_supabase_client()
+            response = supabase.table('scripts').select(
+                'id,article_id,platform,script_content,hook,visual_suggestions,approved,created_at,metadata,articles(title,url,domain)'
+            ).eq('id', script_id).execute()
+            return response.data[0] if response.data else None
         
-        response = supabase.table('scripts').select(
-            'id,article_id,platform,script_content,hook,visual_suggestions,approved,created_at,metadata,articles(title,url,domain)'
-        ).eq('id', script_id).execute()
+        script = script_cache.get_or_load(str(script_id), load_script)
         
-        if not response.data:
+        if not script:
             return f"❌ Script not found in database for ID: {script_id}"
         
-        script = response.data[0]
         article_info = script.get('articles', {}) or {}
         
         return f"""
@@ -702,6 +717,8 @@ def approve_script(script_id: str) -> str:
             "updated_at": datetime.now().isoformat()
         }).eq('id', script_id).execute()
         
+        invalidate_script(script_id)
+        
         if result.data:
             return f"""
 ✅ **SCRIPT APPROVED SUCCESSFULLY**
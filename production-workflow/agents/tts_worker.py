@@ -0,0 +1,111 @@
+"""
+Out-of-process TTS workers for voice generation.
+
+Chatterbox synthesis is CPU/GPU-bound torch code. Run inline in an async tool,
+it blocks the event loop and stalls the parallel image and b-roll branches.
+Voice requests are therefore queued to dedicated worker processes. Each worker
+loads the model once through tts_registry and caps torch's intra-op threads,
+so it doesn't compete with the main process for every core.
+
+TTS_WORKER_PROCESSES=0 keeps synthesis in the main process, on a thread.
+"""
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from agents.tts_registry import TTS_WARMUP, tts_registry
+
+TTS_WORKER_PROCESSES = int(os.getenv("TTS_WORKER_PROCESSES", "1"))
+TTS_TORCH_THREADS = int(os.getenv("TTS_TORCH_THREADS", "0"))  # 0 leaves torch's default
+
+
+def _init_worker(torch_threads: int) -> None:
+    """Runs once in each worker process before it takes requests."""
+    if torch_threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    if TTS_WARMUP:
+        tts_registry.warmup()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _generate_in_worker(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Synthesize one voiceover inside a worker process."""
+    from agents.voice_generation_agent import VoiceGenerationAgent
+    return VoiceGenerationAgent().generate_voice(**request)
+
+
+class TTSWorkerClient:
+    """Async front end for the TTS worker processes; requests queue until a worker is free."""
+
+    def __init__(self, processes: int = TTS_WORKER_PROCESSES, torch_threads: int = TTS_TORCH_THREADS):
+        self.processes = processes
+        self.torch_threads = torch_threads
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers don't inherit CUDA or OpenMP state from the parent
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.torch_threads,)
+            )
+            print(f"🧵 Started {self.processes} TTS worker process(es), torch threads: {self.torch_threads or 'default'}")
+        return self._executor
+
+    def start(self) -> None:
+        """Spawn the workers now (and warm them up if TTS_WARMUP is set) instead of on the first request."""
+        if self.processes <= 0:
+            if TTS_WARMUP:
+                tts_registry.start_warmup()
+            return
+        executor = self._get_executor()
+        for _ in range(self.processes):
+            executor.submit(_ping)
+
+    async def generate_voice(self, **request: Any) -> Dict[str, Any]:
+        """Run VoiceGenerationAgent.generate_voice off the event loop and return its result."""
+        self.pending += 1
+        try:
+            if self.processes <= 0:
+                from agents.voice_generation_agent import VoiceGenerationAgent
+                return await asyncio.to_thread(VoiceGenerationAgent().generate_voice, **request)
+
+            if self.pending > self.processes:
+                print(f"⏳ TTS request queued ({self.pending - self.processes} ahead)")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), _generate_in_worker, request)
+
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); start a fresh pool for the next request
+            self._executor = None
+            return {
+                "success": False,
+                "error": f"TTS worker process crashed: {str(e)}",
+                "file_path": None
+            }
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Process-wide client used by the voice generation tools
+tts_worker = TTSWorkerClient()
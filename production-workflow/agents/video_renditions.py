@@ -0,0 +1,84 @@
+"""
+Pexels video rendition selection for 9:16 b-roll.
+
+Each Pexels video lists several renditions in `video_files`. Picking the
+first "hd" one often fetches a 1920x1080 landscape file, or a 4K one, when
+the renderer only needs 1080x1920. Renditions are ranked by:
+1. orientation match with the target (portrait)
+2. the smallest resolution that still covers the target, or the largest
+   one when none does
+3. frame rate no higher than the renderer uses
+4. estimated file size
+
+A landscape rendition has to be cropped to 9:16 anyway, so it is judged by
+its short side only. Requiring the full 1920 height would push every
+landscape pick up to 4K.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+TARGET_SIZE = (1080, 1920)
+TARGET_FPS = float(os.getenv("BROLL_TARGET_FPS", "30"))
+
+# H.264 stock footage averages roughly 0.1 bits per pixel per frame
+ESTIMATED_BITS_PER_PIXEL = 0.1
+
+
+def _is_progressive_mp4(video_file: Dict[str, Any]) -> bool:
+    """Downloadable single-file renditions (HLS playlists can't be saved as .mp4)."""
+    return (
+        bool(video_file.get("link"))
+        and video_file.get("quality") != "hls"
+        and (video_file.get("file_type") or "video/mp4") == "video/mp4"
+        and bool(video_file.get("width")) and bool(video_file.get("height"))
+    )
+
+
+def estimate_rendition_bytes(video_file: Dict[str, Any], duration: float) -> int:
+    """Reported file size, or an estimate from resolution, fps and duration."""
+    size = video_file.get("size") or video_file.get("file_size")
+    if size:
+        return int(size)
+    fps = video_file.get("fps") or TARGET_FPS
+    pixels = (video_file.get("width") or 0) * (video_file.get("height") or 0)
+    return int(pixels * fps * max(duration or 0, 1) * ESTIMATED_BITS_PER_PIXEL / 8)
+
+
+def rendition_score(video_file: Dict[str, Any], duration: float, target_size: Tuple[int, int] = TARGET_SIZE) -> tuple:
+    """Sort key for a rendition; lower is better."""
+    width, height = video_file["width"], video_file["height"]
+    target_width, target_height = target_size
+    target_portrait = target_height >= target_width
+    orientation_mismatch = (height >= width) != target_portrait
+
+    short_side, long_side = min(width, height), max(width, height)
+    covers = short_side >= min(target_size) and (orientation_mismatch or long_side >= max(target_size))
+    pixels = width * height
+
+    fps = video_file.get("fps") or TARGET_FPS
+    fps_penalty = 0 if fps <= TARGET_FPS + 1 else 1
+
+    return (
+        int(orientation_mismatch),
+        0 if covers else 1,
+        pixels if covers else -pixels,
+        fps_penalty,
+        estimate_rendition_bytes(video_file, duration)
+    )
+
+
+def legacy_hd_rendition(video_files: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The rendition the old picker took: the first "hd" file, else the first file."""
+    if not video_files:
+        return None
+    return next((f for f in video_files if f.get("quality") == "hd"), video_files[0])
+
+
+def select_rendition(video_files: List[Dict[str, Any]], duration: float = 0,
+                     target_size: Tuple[int, int] = TARGET_SIZE) -> Optional[Dict[str, Any]]:
+    """Best rendition of a Pexels video for the target frame, or None if it has none."""
+    candidates = [f for f in video_files or [] if _is_progressive_mp4(f)]
+    if not candidates:
+        return legacy_hd_rendition(video_files)
+    return min(candidates, key=lambda f: rendition_score(f, duration, target_size))
@@ -1,14 +1,203 @@
 # voice_generation_agent.py
 import os
+import re
 import json
+import wave
+import shutil
 import asyncio
 import hashlib
-import torchaudio as ta
-from typing import Dict, List, Any, Optional
+import subprocess
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 from langchain_core.tools import tool
 from datetime import datetime
-import subprocess
-import sys
+from agents.tts_registry import tts_registry
+from agents.tts_worker import tts_worker
+from storage.voice_conditioning_cache import voice_conditioning_cache, sample_hash
+from storage.sentence_audio_cache import sentence_audio_cache, sentence_cache_key
+
+# Chunked synthesis: sentences are synthesized separately and stitched with short crossfades
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "300"))        # Longer sentences are split at clauses, then words
+TTS_MIN_CHUNK_CHARS = int(os.getenv("TTS_MIN_CHUNK_CHARS", "12"))  # Shorter fragments are merged into a neighbour
+TTS_PREFETCH_CHUNKS = int(os.getenv("TTS_PREFETCH_CHUNKS", "2"))  # Chunks queued ahead of the one being written
+TTS_CROSSFADE_MS = int(os.getenv("TTS_CROSSFADE_MS", "30"))
+
+# Voiceovers are encoded while they are synthesized; the lossless WAV is only kept when asked for
+TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "aac").lower()  # aac, opus, mp3 or wav
+TTS_AUDIO_BITRATE = os.getenv("TTS_AUDIO_BITRATE", "96k")
+TTS_KEEP_WAV = os.getenv("TTS_KEEP_WAV", "false").lower() in ("1", "true", "yes")
+
+# Output format -> (file extension, ffmpeg encoder, extra ffmpeg arguments)
+AUDIO_ENCODERS = {
+    "aac": ("m4a", "aac", ["-movflags", "+faststart"]),
+    "opus": ("opus", "libopus", ["-ar", "48000"]),
+    "mp3": ("mp3", "libmp3lame", [])
+}
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+CLAUSE_BOUNDARY = re.compile(r'(?<=[,;:])\s+')
+
+
+def _pack(parts: List[str], max_chars: int) -> List[str]:
+    """Greedily join parts with spaces into pieces of at most max_chars."""
+    packed = []
+    current = ""
+    for part in parts:
+        if current and len(current) + 1 + len(part) > max_chars:
+            packed.append(current)
+            current = part
+        else:
+            current = f"{current} {part}" if current else part
+    if current:
+        packed.append(current)
+    return packed
+
+
+def split_into_tts_chunks(text: str, max_chars: int = TTS_CHUNK_CHARS, min_chars: int = TTS_MIN_CHUNK_CHARS) -> List[str]:
+    """Split narration into sentence-sized chunks for synthesis (shot lines split on newlines too)."""
+    chunks = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        clauses = []
+        for clause in CLAUSE_BOUNDARY.split(sentence):
+            clauses.extend(_pack(clause.split(), max_chars) if len(clause) > max_chars else [clause])
+        chunks.extend(_pack(clauses, max_chars))
+
+    # Very short fragments ("Wow.") synthesize poorly on their own
+    merged = []
+    for chunk in chunks:
+        if merged and (len(chunk) < min_chars or len(merged[-1]) < min_chars) and len(merged[-1]) + 1 + len(chunk) <= max_chars:
+            merged[-1] = f"{merged[-1]} {chunk}"
+        else:
+            merged.append(chunk)
+    return merged
+
+
+def load_voice_timestamps(audio_path: str) -> List[Dict[str, Any]]:
+    """Per-chunk timestamps written next to a voiceover by generate_voice, if any."""
+    try:
+        with open(os.path.splitext(audio_path)[0] + "_timestamps.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+class StreamingAudioEncoder:
+    """Pipes 16-bit mono PCM into ffmpeg, which encodes it to a compressed file as it arrives."""
+    
+    def __init__(self, path: str, sample_rate: int, output_format: str = TTS_OUTPUT_FORMAT, bitrate: str = TTS_AUDIO_BITRATE):
+        _, codec, extra_args = AUDIO_ENCODERS[output_format]
+        self.path = path
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error",
+             "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+             "-c:a", codec, "-b:a", bitrate, *extra_args, path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+    
+    def write(self, pcm: bytes) -> None:
+        self._process.stdin.write(pcm)
+    
+    def close(self) -> None:
+        self._process.stdin.close()
+        error = self._process.stderr.read().decode("utf-8", "replace").strip()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not encode {os.path.basename(self.path)}: {error}")
+    
+    def abort(self) -> str:
+        """Stop a failed encode, reap the process and return what ffmpeg reported."""
+        self._process.kill()
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        error = self._process.stderr.read().decode("utf-8", "replace").strip()
+        self._process.stderr.close()
+        self._process.wait()
+        return error
+
+
+class CrossfadeAudioWriter:
+    """
+    Streams mono float chunks to a 16-bit WAV and/or a streaming encoder,
+    crossfading each chunk into the previous one.
+    
+    An encoder failure doesn't interrupt the WAV: the encoder is dropped and
+    the error kept in encoder_error, so the caller can fall back to the WAV.
+    """
+    
+    def __init__(self,
+                 wav_path: Optional[str],
+                 sample_rate: int,
+                 crossfade_ms: int = TTS_CROSSFADE_MS,
+                 encoder: Optional[StreamingAudioEncoder] = None):
+        self.sample_rate = sample_rate
+        self.crossfade_samples = int(sample_rate * crossfade_ms / 1000)
+        self.samples_written = 0
+        self._tail = np.zeros(0, dtype=np.float32)  # Held back until the next chunk fades in over it
+        self._encoder = encoder
+        self.encoder_error: Optional[str] = None
+        self._wav = None
+        if wav_path:
+            self._wav = wave.open(wav_path, "wb")
+            self._wav.setnchannels(1)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(sample_rate)
+    
+    def _write(self, samples: np.ndarray) -> None:
+        if len(samples):
+            pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+            if self._wav is not None:
+                self._wav.writeframes(pcm)
+            if self._encoder is not None:
+                try:
+                    self._encoder.write(pcm)
+                except OSError as e:
+                    # ffmpeg exited early (broken pipe); keep writing the WAV
+                    reported = self._encoder.abort()
+                    self.encoder_error = f"ffmpeg stopped while encoding {os.path.basename(self._encoder.path)}: {reported or e}"
+                    self._encoder = None
+            self.samples_written += len(samples)
+    
+    def append(self, samples: np.ndarray) -> Tuple[int, int]:
+        """Add one chunk; returns its start and end position in samples."""
+        samples = samples.astype(np.float32, copy=False)
+        fade = min(len(self._tail), len(samples))
+        self._write(self._tail[:len(self._tail) - fade])
+        start = self.samples_written
+        
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            self._write(self._tail[len(self._tail) - fade:] * (1.0 - ramp) + samples[:fade] * ramp)
+        
+        rest = samples[fade:]
+        hold = min(self.crossfade_samples, len(rest))
+        self._write(rest[:len(rest) - hold])
+        self._tail = rest[len(rest) - hold:]
+        return start, start + len(samples)
+    
+    def close(self) -> None:
+        try:
+            self._write(self._tail)
+            self._tail = np.zeros(0, dtype=np.float32)
+        finally:
+            if self._wav is not None:
+                self._wav.close()
+            if self._encoder is not None:
+                try:
+                    self._encoder.close()
+                except (OSError, RuntimeError) as e:
+                    self.encoder_error = str(e)
+
 
 class VoiceGenerationAgent:
     def __init__(self):
@@ -25,53 +214,31 @@ class VoiceGenerationAgent:
         os.makedirs(self.voice_samples_dir, exist_ok=True)
         os.makedirs(self.generated_voices_dir, exist_ok=True)
         
-    def _install_chatterbox(self):
-        """Install Chatterbox TTS if not already installed."""
-        try:
-            import chatterbox.tts
-            return True
-        except ImportError:
-            print("📦 Installing Chatterbox TTS...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "chatterbox-tts"])
-                print("✅ Chatterbox TTS installed successfully!")
-                return True
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Failed to install Chatterbox TTS: {e}")
-                return False
-    
     def _load_model(self):
-        """Load the Chatterbox TTS model."""
+        """Attach the process-wide Chatterbox TTS model (loaded once, shared by all agents)."""
         if self.model is not None:
             return True
-            
-        try:
-            if not self._install_chatterbox():
-                return False
-                
-            from chatterbox.tts import ChatterboxTTS
-            print("🤖 Loading Chatterbox TTS model...")
-            self.model = ChatterboxTTS.from_pretrained(device="cuda" if self._has_cuda() else "cpu")
-            self.sample_rate = self.model.sr
-            print("✅ Model loaded successfully!")
-            return True
-        except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            return False
-    
-    def _has_cuda(self):
-        """Check if CUDA is available."""
-        try:
-            import torch
-            return torch.cuda.is_available()
-        except ImportError:
+        
+        self.model = tts_registry.get_model()
+        if self.model is None:
             return False
+        self.sample_rate = tts_registry.sample_rate
+        return True
     
-    def _generate_filename(self, text: str, voice_name: str = "default") -> str:
+    def _generate_filename(self, text: str, voice_name: str = "default", extension: str = "wav") -> str:
         """Generate a unique filename for the audio."""
         text_hash = hashlib.md5(text.encode()).hexdigest()[:8]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return f"voice_{voice_name}_{timestamp}_{text_hash}.wav"
+        return f"voice_{voice_name}_{timestamp}_{text_hash}.{extension}"
+    
+    def _output_format(self) -> str:
+        """Configured compressed format, or "wav" when WAV was requested or ffmpeg is missing."""
+        if TTS_OUTPUT_FORMAT not in AUDIO_ENCODERS:
+            return "wav"
+        if shutil.which("ffmpeg") is None:
+            print(f"⚠️ ffmpeg not found, writing WAV instead of {TTS_OUTPUT_FORMAT}")
+            return "wav"
+        return TTS_OUTPUT_FORMAT
     
     def _get_voice_sample_path(self, voice_name: str) -> Optional[str]:
         """Get the path to a voice sample file."""
@@ -120,33 +287,55 @@ class VoiceGenerationAgent:
             # Get voice sample path if using custom voice
             audio_prompt_path = self._get_voice_sample_path(voice_name)
             
-            # Generate audio with optimized parameters for speed and quality
-            print(f"🎙️ Generating voice for: {text[:50]}...")
-            if audio_prompt_path:
-                print(f"👤 Using voice sample: {audio_prompt_path}")
-                wav = self.model.generate(
-                    text, 
-                    audio_prompt_path=audio_prompt_path,
-                    exaggeration=exaggeration,
-                    cfg_weight=cfg_weight
-                )
-            else:
-                print("⚠️ Using default voice - consider using 'my_voice' for personalized results")
-                wav = self.model.generate(
-                    text,
-                    exaggeration=exaggeration,
-                    cfg_weight=cfg_weight
+            chunks = split_into_tts_chunks(text)
+            if not chunks:
+                return {
+                    "success": False,
+                    "error": "No text to synthesize",
+                    "file_path": None
+                }
+            
+            print(f"🎙️ Generating voice for: {text[:50]}... ({len(chunks)} chunks)")
+            # One request at a time drives the shared model, from conditioning to the last chunk
+            with tts_registry.synthesis_lock:
+                if audio_prompt_path:
+                    print(f"👤 Using voice sample: {audio_prompt_path}")
+                    # Condition once up front (cached per sample); every chunk of this request uses the same voice
+                    voice_conditioning_cache.apply(self.model, audio_prompt_path, exaggeration)
+                else:
+                    print("⚠️ Using default voice - consider using 'my_voice' for personalized results")
+                    # The model is shared, so the last cloned voice's conditioning would otherwise still be set
+                    tts_registry.use_default_voice()
+                
+                output_format = self._output_format()
+                extension = AUDIO_ENCODERS[output_format][0] if output_format in AUDIO_ENCODERS else "wav"
+                filename = self._generate_filename(text, voice_name, extension)
+                file_path = os.path.join(self.generated_voices_dir, filename)
+                # Compressed output always gets a WAV alongside, kept only with TTS_KEEP_WAV or if encoding fails
+                wav_path = file_path if output_format == "wav" else os.path.splitext(file_path)[0] + ".wav"
+                # Cached sentences are keyed on the sample's content, so replacing a sample never reuses old audio
+                voice_key = f"{voice_name}:{sample_hash(audio_prompt_path)}" if audio_prompt_path else "default"
+                timestamps, encoder_error = self._synthesize_chunks(
+                    chunks, file_path, exaggeration, cfg_weight, voice_key, emotion,
+                    output_format=output_format, wav_path=wav_path
                 )
             
-            # Save the generated audio
-            filename = self._generate_filename(text, voice_name)
-            file_path = os.path.join(self.generated_voices_dir, filename)
+            if encoder_error:
+                print(f"⚠️ {encoder_error}; keeping the WAV instead")
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                file_path, filename, output_format = wav_path, os.path.basename(wav_path), "wav"
+            elif output_format != "wav" and not TTS_KEEP_WAV:
+                os.remove(wav_path)
+                wav_path = None
             
-            ta.save(file_path, wav, self.sample_rate)
+            timestamps_path = os.path.splitext(file_path)[0] + "_timestamps.json"
+            with open(timestamps_path, "w", encoding="utf-8") as f:
+                json.dump(timestamps, f, indent=2)
             
             # Get file info
             file_size = os.path.getsize(file_path)
-            duration = wav.shape[-1] / self.sample_rate
+            duration = timestamps[-1]["end"] if timestamps else 0.0
             
             return {
                 "success": True,
@@ -154,13 +343,19 @@ class VoiceGenerationAgent:
                 "filename": filename,
                 "duration": f"{duration:.2f}s",
                 "file_size": f"{file_size / 1024:.1f}KB",
+                "format": output_format,
+                "bitrate": TTS_AUDIO_BITRATE if output_format != "wav" else None,
+                "wav_path": wav_path,
                 "voice_name": voice_name,
                 "emotion": emotion,
                 "text_length": len(text),
+                "chunks": timestamps,
+                "timestamps_path": timestamps_path,
                 "parameters": {
                     "exaggeration": exaggeration,
                     "cfg_weight": cfg_weight
-                }
+                },
+                "model": tts_registry.stats()
             }
             
         except Exception as e:
@@ -170,6 +365,97 @@ class VoiceGenerationAgent:
                 "file_path": None
             }
     
+    def _synthesize_chunks(self,
+                           chunks: List[str],
+                           file_path: str,
+                           exaggeration: float,
+                           cfg_weight: float,
+                           voice_key: str = "default",
+                           emotion: str = "neutral",
+                           output_format: str = "wav",
+                           wav_path: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Synthesize chunks on a background thread and stream them into file_path in order.
+        
+        For compressed formats the audio is piped to an ffmpeg encoder as it is
+        produced; wav_path additionally gets a lossless copy, which is complete
+        even if the encoder fails.
+        
+        Synthesis runs on a single thread, because the Chatterbox model is not
+        safe to call concurrently (the caller holds tts_registry.synthesis_lock);
+        parallelism across voiceovers comes from the tts_worker processes.
+        Writing and encoding one chunk overlaps synthesis of the next, and at
+        most TTS_PREFETCH_CHUNKS chunks are in flight, so peak memory stays
+        bounded regardless of script length. Chunks already in the sentence
+        audio cache are stitched from their stored samples instead of being
+        synthesized again.
+        
+        Returns:
+            Per-chunk timestamps (index, text, start, end in seconds and whether it
+            was cached), and the encoder error if compressed output failed
+        """
+        def cache_key(chunk_text: str) -> str:
+            return sentence_cache_key(chunk_text, voice_key, emotion, exaggeration, cfg_weight, self.sample_rate)
+        
+        def synthesize(chunk_text: str) -> np.ndarray:
+            wav = self.model.generate(chunk_text, exaggeration=exaggeration, cfg_weight=cfg_weight)
+            samples = wav.squeeze(0).detach().cpu().numpy()
+            sentence_audio_cache.put(cache_key(chunk_text), samples)
+            return samples
+        
+        encoder = None
+        encoder_error = None
+        if output_format in AUDIO_ENCODERS:
+            try:
+                encoder = StreamingAudioEncoder(file_path, self.sample_rate, output_format)
+            except OSError as e:
+                encoder_error = f"Could not start ffmpeg: {e}"
+        writer = CrossfadeAudioWriter(wav_path, self.sample_rate, encoder=encoder)
+        writer.encoder_error = encoder_error
+        timestamps = []
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-chunk") as pool:
+                pending_chunks = iter(enumerate(chunks))
+                in_flight = deque()
+                
+                def submit_next() -> None:
+                    next_chunk = next(pending_chunks, None)
+                    if next_chunk is None:
+                        return
+                    index, chunk_text = next_chunk
+                    cached = sentence_audio_cache.get(cache_key(chunk_text))
+                    if cached is None:
+                        in_flight.append((index, chunk_text, False, pool.submit(synthesize, chunk_text)))
+                    else:
+                        future = Future()
+                        future.set_result(cached)
+                        in_flight.append((index, chunk_text, True, future))
+                
+                for _ in range(max(1, TTS_PREFETCH_CHUNKS)):
+                    submit_next()
+                
+                while in_flight:
+                    index, chunk_text, cached, future = in_flight.popleft()
+                    samples = future.result()
+                    submit_next()
+                    start, end = writer.append(samples)
+                    timestamps.append({
+                        "index": index,
+                        "text": chunk_text,
+                        "start": round(start / self.sample_rate, 3),
+                        "end": round(end / self.sample_rate, 3),
+                        "cached": cached
+                    })
+                    source = "cached" if cached else "synthesized"
+                    print(f"🧩 Chunk {index + 1}/{len(chunks)} ({source}): {start / self.sample_rate:.2f}s-{end / self.sample_rate:.2f}s")
+        finally:
+            writer.close()
+        
+        reused = sum(1 for chunk in timestamps if chunk["cached"])
+        if reused:
+            print(f"♻️ Reused {reused}/{len(timestamps)} sentences from the audio cache")
+        return timestamps, writer.encoder_error
+    
     def list_voice_samples(self) -> List[str]:
         """List available voice samples."""
         if not os.path.exists(self.voice_samples_dir):
@@ -204,13 +490,12 @@ async def generate_voiceover(
         JSON string with generation result and file path
     """
     try:
-        agent = VoiceGenerationAgent()
-        
         # Clean up script text (remove markdown formatting)
         clean_text = script_text.replace("**", "").replace("*", "")
         clean_text = clean_text.replace("HOOK:", "").replace("ACT 1:", "").replace("ACT 2:", "").replace("ACT 3:", "")
         clean_text = clean_text.replace("CONCLUSION/CTA:", "").replace("CTA:", "")
-        clean_text = " ".join(clean_text.split())  # Remove extra whitespace
+        # Remove extra whitespace but keep line breaks, which mark shot boundaries for chunking
+        clean_text = "\n".join(" ".join(line.split()) for line in clean_text.splitlines() if line.strip())
         
         if not clean_text.strip():
             return json.dumps({
@@ -219,11 +504,8 @@ async def generate_voiceover(
                 "file_path": None
             })
         
-        # Limit text length for reasonable generation time 
-        if len(clean_text) > 5000:
-            clean_text = clean_text[:5000] + "..."
-            
-        result = agent.generate_voice(
+        # Synthesis runs in a TTS worker process so the event loop (and the parallel branches) keep going
+        result = await tts_worker.generate_voice(
             text=clean_text,
             voice_name=voice_name,
             exaggeration=exaggeration,
@@ -238,10 +520,13 @@ async def generate_voiceover(
 **📄 Script Preview:** {clean_text[:100]}...
 **🎵 Audio File:** {result['filename']}
 **⏱️ Duration:** {result['duration']}
-**📁 File Size:** {result['file_size']}
+**📁 File Size:** {result['file_size']} ({result['format']}{', ' + result['bitrate'] if result['bitrate'] else ''})
 **👤 Voice:** {result['voice_name']}
 **🎭 Emotion:** {result['emotion']}
 **📊 Parameters:** Exaggeration: {result['parameters']['exaggeration']}, CFG: {result['parameters']['cfg_weight']}
+**🧩 Chunks:** {len(result['chunks'])} sentences stitched with {TTS_CROSSFADE_MS}ms crossfades ({sum(1 for chunk in result['chunks'] if chunk['cached'])} reused from cache)
+**🕒 Timestamps:** {result['timestamps_path']}
+**🤖 TTS Model:** {result['model']['device']}, loaded once in {result['model']['load_seconds']}s ({result['model']['memory_mb']}MB)
 
 **📍 Local Path:** {result['file_path']}
 
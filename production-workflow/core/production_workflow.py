@@ -15,12 +15,21 @@ from agents.crawl_agent import crawl_tools
 from agents.supabase_agent import supabase_tools_sync_wrapped
 from agents.scripting_agent import script_generation_tools
 from agents.prompt_generation_agent import prompt_generation_tools
-from agents.image_generation_agent import image_generation_tools
-from agents.voice_generation_agent import voice_tools
+from agents.image_generation_agent import image_generation_tools, image_provider
+from agents.voice_generation_agent import voice_tools, load_voice_timestamps
+from agents.tts_worker import tts_worker
+from agents.pexels_client import pexels_client
 from agents.broll_search_agent import broll_search_tools
 from agents.asset_gathering_agent import asset_gathering_tools
 from agents.notion_agent import notion_tools
 from agents.visual_table_agent import visual_table_tools
+from agents.image_postprocessing import postprocess_images, find_near_duplicates, shutdown_postprocessing
+from storage.persistence_queue import persistence_queue, build_prompt_row, build_image_row
+from storage.image_cache import image_cache, copy_cache_key
+from storage.shot_manifest import get_shot_manifest, shot_fingerprint, text_fingerprint
+
+# Candidate images generated per shot; the sharpest one is kept
+IMAGE_VARIANTS = int(os.getenv("IMAGE_VARIANTS", "1"))
 
 @dataclass
 class WorkflowState:
@@ -51,13 +60,17 @@ class WorkflowState:
     shot_breakdown: List[Dict[str, Any]] = field(default_factory=list)
     shot_timing: List[Dict[str, Any]] = field(default_factory=list)
     shot_types: List[str] = field(default_factory=list)
+    shot_manifest_key: str = ""  # Lineage key for reusing per-shot artifacts across script revisions
+    shot_diff: Dict[str, Any] = field(default_factory=dict)
     
     # Parallel generation phase (prompt, image, voice, broll)
     prompts_generated: Annotated[List[Dict], add] = field(default_factory=list)
     images_generated: Annotated[List[str], add] = field(default_factory=list)
     image_prompt_mapping: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # Track which image came from which prompt
     voice_files: Annotated[List[str], add] = field(default_factory=list)
+    voice_timestamps: List[Dict[str, Any]] = field(default_factory=list)  # Per-chunk start/end of the voiceover
     broll_assets: Dict[str, Any] = field(default_factory=dict)
+    image_derivatives: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # Source image path -> crop, thumbnails, phash
     
     # Asset gathering phase
     project_folder_path: str = ""
@@ -121,8 +134,10 @@ class ProductionWorkflow:
         self.workflow.add_edge("voice_generation", "parallel_sync")
         self.workflow.add_edge("broll_search", "parallel_sync")
         
-        # Parallel sync leads to visual table generation
-        self.workflow.add_edge("parallel_sync", "visual_table_generation")
+        # Parallel sync leads to image post-processing, then visual table generation
+        self.workflow.add_node("image_postprocessing", self.image_postprocessing_node)
+        self.workflow.add_edge("parallel_sync", "image_postprocessing")
+        self.workflow.add_edge("image_postprocessing", "visual_table_generation")
         
         # Visual table generation leads to asset gathering
         self.workflow.add_edge("visual_table_generation", "asset_gathering")
@@ -145,20 +160,41 @@ class ProductionWorkflow:
             if state.shot_breakdown:
                 print(f"Using shot breakdown with {len(state.shot_breakdown)} shots for specific prompts")
                 
+                # Unchanged shots keep the prompt generated for them in the previous run
+                manifest = self._shot_manifest(state)
+                reused_prompts = []
+                shots_to_generate = []
+                for shot in state.shot_breakdown:
+                    cached_prompt = manifest.get(shot.get("fingerprint"), "prompt")
+                    if cached_prompt:
+                        reused_prompts.append({
+                            **cached_prompt,
+                            "shot_number": shot.get("shot_number"),
+                            "timing": f"Shot {shot.get('shot_number', 'Unknown')}"
+                        })
+                    else:
+                        shots_to_generate.append(shot)
+                
+                if reused_prompts:
+                    print(f"Reusing prompts for {len(reused_prompts)} unchanged shots, generating {len(shots_to_generate)}")
+                
                 shot_prompt_tool = prompt_generation_tools[1]  # generate_shot_specific_prompts
-                prompts_result = await shot_prompt_tool.ainvoke({"shot_breakdown": state.shot_breakdown})
+                prompts_result = []
+                if shots_to_generate:
+                    prompts_result = await shot_prompt_tool.ainvoke({"shot_breakdown": shots_to_generate})
                 
                 print(f"DEBUG - Generated {len(prompts_result)} shot-specific prompts")
                 for i, prompt in enumerate(prompts_result[:3], 1):
                     print(f"  Shot {prompt.get('shot_number', i)}: {prompt.get('visual_description', 'No description')[:50]}...")
                 
-                if prompts_result:
+                if prompts_result or reused_prompts:
                     # Convert to workflow format
                     generated_prompts = [
                         {
                             "id": prompt["id"],
                             "prompt": prompt["visual_description"],
                             "shot_number": prompt.get("shot_number"),
+                            "fingerprint": prompt.get("fingerprint"),
                             "type": prompt.get("shot_type", "scene"),
                             "style": prompt.get("mood_style", "dynamic, engaging"),
                             "timing": f"Shot {prompt.get('shot_number', 'Unknown')}"
@@ -167,9 +203,19 @@ class ProductionWorkflow:
                     
                     print(f"Generated {len(generated_prompts)} shot-specific prompts for image generation")
                     
+                    for prompt in generated_prompts:
+                        manifest.put(prompt["fingerprint"], "prompt", prompt)
+                    manifest.save()
+                    
+                    # Persist prompt history in the background without delaying the parallel branches;
+                    # reused prompts were already stored by the run that generated them
+                    persistence_queue.enqueue_many("prompts", [build_prompt_row(p, state.script_id) for p in generated_prompts])
+                    
+                    all_prompts = sorted(reused_prompts + generated_prompts, key=lambda p: p.get("shot_number") or 0)
+                    
                     return {
-                        "prompts_generated": generated_prompts,
-                        "messages": [AIMessage(content=f"Generated {len(generated_prompts)} shot-specific LLM-powered image prompts")]
+                        "prompts_generated": all_prompts,
+                        "messages": [AIMessage(content=f"Generated {len(generated_prompts)} shot-specific LLM-powered image prompts ({len(reused_prompts)} reused from previous run)")]
                     }
             
             # Fallback to script-based prompts if no shot breakdown
@@ -214,6 +260,8 @@ class ProductionWorkflow:
             
             print(f"Generated {len(generated_prompts)} prompts for image generation")
             
+            persistence_queue.enqueue_many("prompts", [build_prompt_row(p, state.script_id) for p in generated_prompts])
+            
             return {
                 "prompts_generated": generated_prompts,
                 "messages": [AIMessage(content=f"Generated {len(generated_prompts)} LLM-powered image prompts from script content")]
@@ -502,10 +550,21 @@ class ProductionWorkflow:
                 for i, shot in enumerate(shot_breakdown[:3], 1):
                     print(f"  Shot {i}: {shot.get('text', 'N/A')[:50]}... ({shot.get('type', 'unknown')})")
                 
+                # Diff against the previous run of this script so later stages only redo changed shots
+                for shot in shot_breakdown:
+                    shot.setdefault("fingerprint", shot_fingerprint(shot))
+                manifest_key = state.shot_manifest_key or state.article_id or state.topic or "default"
+                shot_diff = get_shot_manifest(manifest_key).begin_run(shot_breakdown)
+                if shot_diff["previous_run"]:
+                    print(f"Shot diff vs previous run: {len(shot_diff['unchanged'])} unchanged, "
+                          f"{len(shot_diff['changed'])} changed, {len(shot_diff['removed'])} removed")
+                
                 return {
                     "shot_breakdown": shot_breakdown,
                     "shot_timing": shot_timing, 
                     "shot_types": shot_types,
+                    "shot_manifest_key": manifest_key,
+                    "shot_diff": shot_diff,
                     "current_step": "shot_analysis",
                     "messages": [AIMessage(content=f"Script analyzed into {len(shot_breakdown)} shots")]
                 }
@@ -545,24 +604,71 @@ class ProductionWorkflow:
                     "messages": [AIMessage(content="No prompts available, skipped image generation")]
                 }
             
-            # Intelligently select which shots need images based on visual importance
-            selected_prompts = self._select_shots_for_image_generation(
-                state.prompts_generated, 
-                state.shot_breakdown,
-                target_images=10  # Generate 10 images spread across the video timeline
-            )
-            
-            image_tool = image_generation_tools[0]  # generate_image_flux
+            target_images = 10  # Generate 10 images spread across the video timeline
+            manifest = self._shot_manifest(state)
             
             generated_images = []
             image_prompt_mapping = {}  # Track which image was generated from which prompt
             
-            for prompt_data in selected_prompts:
+            # Unchanged shots keep the image generated for them in the previous run
+            candidate_prompts = []
+            for prompt_data in state.prompts_generated:
+                cached_image = manifest.get(prompt_data.get("fingerprint"), "image")
+                if cached_image and os.path.exists(cached_image.get("file_path", "")):
+                    file_path = cached_image["file_path"]
+                    generated_images.append(file_path)
+                    image_prompt_mapping[file_path] = {
+                        "shot_number": prompt_data.get("shot_number"),
+                        "prompt": prompt_data["prompt"],
+                        "shot_type": prompt_data.get("shot_type"),
+                        "original_text": prompt_data.get("original_text", "")
+                    }
+                else:
+                    candidate_prompts.append(prompt_data)
+            
+            # On a revision only shots whose text changed are candidates for new images
+            if state.shot_diff.get("previous_run"):
+                changed = set(state.shot_diff.get("changed", []))
+                candidate_prompts = [p for p in candidate_prompts if p.get("fingerprint") in changed]
+                print(f"Reusing {len(generated_images)} images, {len(candidate_prompts)} changed shots to consider")
+            
+            selected_prompts = []
+            remaining_images = target_images - len(generated_images)
+            if candidate_prompts and remaining_images > 0:
+                shots_by_fingerprint = {shot.get("fingerprint"): shot for shot in state.shot_breakdown}
+                candidate_shots = (
+                    [shots_by_fingerprint.get(p.get("fingerprint"), {}) for p in candidate_prompts]
+                    if all(p.get("fingerprint") for p in candidate_prompts) else state.shot_breakdown
+                )
+                # Intelligently select which shots need images based on visual importance
+                selected_prompts = self._select_shots_for_image_generation(
+                    candidate_prompts, 
+                    candidate_shots,
+                    target_images=remaining_images
+                )
+            
+            batch_tool = image_generation_tools[4]  # generate_images_batch
+            
+            # One batch call; identical prompts and variants share provider requests
+            batch_result = {"results": []}
+            if selected_prompts:
+                batch_result = json.loads(await batch_tool.ainvoke({
+                    "prompts": [prompt_data["prompt"] for prompt_data in selected_prompts],
+                    "variants": IMAGE_VARIANTS
+                }))
+            
+            results_by_index = {result["index"]: result for result in batch_result.get("results", [])}
+            for index, prompt_data in enumerate(selected_prompts):
                 try:
-                    image_result = await image_tool.ainvoke({"prompt": prompt_data["prompt"]})
-                    result_dict = json.loads(image_result)
+                    result_dict = results_by_index.get(index, {})
                     if result_dict.get("status") == "success":
                         file_path = result_dict["file_path"]
+                        if file_path in image_prompt_mapping:
+                            # Shots with identical prompts still get their own file, tracked by the image cache
+                            copy_label = f"shot{prompt_data.get('shot_number', index)}"
+                            copy_key = copy_cache_key(file_path, copy_label)
+                            file_path = await asyncio.to_thread(image_cache.copy_entry, file_path, copy_label)
+                            result_dict = {**result_dict, "file_path": file_path, "cache_key": copy_key}
                         generated_images.append(file_path)
                         # Create mapping from image file to the prompt data that generated it
                         image_prompt_mapping[file_path] = {
@@ -571,12 +677,19 @@ class ProductionWorkflow:
                             "shot_type": prompt_data.get("shot_type"),
                             "original_text": prompt_data.get("original_text", "")
                         }
+                        manifest.put(prompt_data.get("fingerprint"), "image", {
+                            "file_path": file_path,
+                            "model": result_dict.get("model")
+                        })
+                        persistence_queue.enqueue("generated_images", build_image_row(prompt_data, result_dict))
                         print(f"Generated image for shot {prompt_data.get('shot_number')}: {os.path.basename(file_path) if file_path else 'Unknown'}")
                     else:
                         print(f"Image generation failed for prompt: {prompt_data['prompt'][:50]}...")
                 except Exception as img_error:
                     print(f"Image generation failed for prompt: {img_error}")
             
+            manifest.save()
+            
             return {
                 "images_generated": generated_images,
                 "image_prompt_mapping": image_prompt_mapping,
@@ -621,6 +734,39 @@ class ProductionWorkflow:
                 "messages": [AIMessage(content="Parallel synchronization failed")]
             }
     
+    async def image_postprocessing_node(self, state: WorkflowState) -> WorkflowState:
+        """Create 1080x1920 crops, preview thumbnails and perceptual hashes in a process pool"""
+        try:
+            print("Step 7.2: Post-processing images")
+            
+            source_paths = list(state.images_generated)
+            source_paths += [image.get("local_path") for image in state.broll_assets.get("images", []) if image.get("local_path")]
+            
+            if not source_paths:
+                return {
+                    "image_derivatives": {},
+                    "messages": [AIMessage(content="No images to post-process")]
+                }
+            
+            derivatives = await postprocess_images(source_paths)
+            
+            for path_a, path_b in find_near_duplicates(derivatives):
+                print(f"Near-duplicate images: {os.path.basename(path_a)} ~ {os.path.basename(path_b)}")
+            
+            return {
+                "image_derivatives": derivatives,
+                "messages": [AIMessage(content=f"Post-processed {len(derivatives)} images into 1080x1920 crops and thumbnails")]
+            }
+            
+        except Exception as e:
+            error_msg = f"Image post-processing failed: {str(e)}"
+            print(f"{error_msg}")
+            return {
+                "errors": [error_msg],
+                "image_derivatives": {},
+                "messages": [AIMessage(content="Image post-processing failed")]
+            }
+    
     async def broll_search_node(self, state: WorkflowState) -> WorkflowState:
         """Search for b-roll content based on generated prompts (parallel node)"""
         try:
@@ -634,12 +780,49 @@ class ProductionWorkflow:
                 }
             
             broll_tool = broll_search_tools[2]  # search_and_download_broll_tool
+            manifest = self._shot_manifest(state)
+            
+            # Unchanged shots keep the b-roll found for them in the previous run
+            reused_assets = {"images": [], "videos": [], "downloaded_files": []}
+            prompts_to_search = []
+            for prompt_data in state.prompts_generated:
+                cached_broll = manifest.get(prompt_data.get("fingerprint"), "broll")
+                if cached_broll is not None and all(
+                    os.path.exists(f.get("path", "")) for f in cached_broll.get("downloaded_files", [])
+                ):
+                    for kind in reused_assets:
+                        reused_assets[kind].extend(cached_broll.get(kind, []))
+                else:
+                    prompts_to_search.append(prompt_data)
             
             # Use the same prompts that were used for image generation
-            broll_result = await broll_tool.ainvoke({"prompts_data": state.prompts_generated})
+            if prompts_to_search:
+                broll_result = await broll_tool.ainvoke({"prompts_data": prompts_to_search})
+            else:
+                broll_result = json.dumps({"images": [], "videos": [], "downloaded_files": [], "metadata": {"source": "Pexels"}})
             
             try:
                 broll_data = json.loads(broll_result)
+                
+                if not broll_data.get("error"):
+                    # Record what each searched prompt produced, including nothing, so it is not searched again
+                    for prompt_data in prompts_to_search:
+                        manifest.put(prompt_data.get("fingerprint"), "broll", {
+                            kind: [asset for asset in broll_data.get(kind, []) if asset.get("prompt_id") == prompt_data.get("id")]
+                            for kind in reused_assets
+                        })
+                    manifest.save()
+                
+                if reused_assets["images"] or reused_assets["videos"]:
+                    for kind in reused_assets:
+                        broll_data[kind] = reused_assets[kind] + broll_data.get(kind, [])
+                    metadata = broll_data.setdefault("metadata", {})
+                    metadata["images_found"] = len(broll_data["images"])
+                    metadata["videos_found"] = len(broll_data["videos"])
+                    metadata["total_downloaded"] = len(broll_data["downloaded_files"])
+                    metadata["reused_from_previous_run"] = len(reused_assets["images"]) + len(reused_assets["videos"])
+                    print(f"Reused {metadata['reused_from_previous_run']} b-roll assets, searched {len(prompts_to_search)} changed prompts")
+                
                 print(f"Found {broll_data.get('metadata', {}).get('images_found', 0)} images and {broll_data.get('metadata', {}).get('videos_found', 0)} videos")
                 
                 return {
@@ -692,6 +875,18 @@ class ProductionWorkflow:
                 "voice_name": "audio",  # Use the audio.wav sample for voice cloning
                 "emotion": "neutral"
             }
+            
+            # The voiceover is one file, so it is reused only when the narration is unchanged
+            manifest = self._shot_manifest(state)
+            narration_fingerprint = text_fingerprint(clean_script, voice_input["voice_name"], voice_input["emotion"])
+            cached_voice = manifest.get_voice(narration_fingerprint)
+            if cached_voice and cached_voice["files"] and all(os.path.exists(f) for f in cached_voice["files"]):
+                print("Narration unchanged since previous run, reusing voiceover")
+                return {
+                    "voice_files": cached_voice["files"],
+                    "voice_timestamps": load_voice_timestamps(cached_voice["files"][0]),
+                    "messages": [AIMessage(content=f"Reused {len(cached_voice['files'])} voice files from previous run")]
+                }
         
             voice_result = await voice_tool.ainvoke(voice_input)
             
@@ -709,15 +904,19 @@ class ProductionWorkflow:
                 
                 if file_path and os.path.exists(file_path):
                     voice_files = [file_path]
+                    manifest.put_voice(narration_fingerprint, voice_files)
                     print(f"DEBUG: Extracted voice file path: {file_path}")
                 else:
                     # Fallback: store the full result for parsing later
                     voice_files = [voice_result]
                     print(f"DEBUG: Voice file path not found, storing result for later parsing")
         
+            voice_timestamps = load_voice_timestamps(voice_files[0]) if voice_files and os.path.exists(voice_files[0]) else []
+            
             return {
                 "voice_files": voice_files,
-                "messages": [AIMessage(content=f"Generated {len(voice_files)} voice files")]
+                "voice_timestamps": voice_timestamps,
+                "messages": [AIMessage(content=f"Generated {len(voice_files)} voice files ({len(voice_timestamps)} timed chunks)")]
             }
         
         except Exception as e:
@@ -765,15 +964,22 @@ class ProductionWorkflow:
                     "messages": [AIMessage(content="Could not determine project folder path for visual table")]
                 }
             
+            # Name images by the files that are uploaded to Drive, so the table matches the project folder
+            uploaded_images = [self._upload_image_path(state, path) for path in state.images_generated]
+            uploaded_prompt_mapping = {
+                self._upload_image_path(state, path): mapping
+                for path, mapping in state.image_prompt_mapping.items()
+            }
+            
             # Generate visual production table
             table_tool = visual_table_tools[0]  # create_visual_production_table
             table_result = await table_tool.ainvoke({
                 "shot_breakdown": state.shot_breakdown,
                 "shot_timing": state.shot_timing,
                 "visual_prompts": state.prompts_generated,
-                "generated_images": state.images_generated,
+                "generated_images": uploaded_images,
                 "broll_assets": state.broll_assets,
-                "image_prompt_mapping": state.image_prompt_mapping
+                "image_prompt_mapping": uploaded_prompt_mapping
             })
             
             print(f"Visual table generation result: {table_result[:200]}...")
@@ -783,7 +989,7 @@ class ProductionWorkflow:
             summary_result = await summary_tool.ainvoke({
                 "shot_breakdown": state.shot_breakdown,
                 "visual_prompts": state.prompts_generated,
-                "generated_images": state.images_generated,
+                "generated_images": uploaded_images,
                 "broll_assets": state.broll_assets
             })
             
@@ -828,7 +1034,8 @@ class ProductionWorkflow:
                 asset_result = await organize_tool.ainvoke({
                     'project_folder_path': project_folder_path,
                     'assets_data': {
-                        'images': state.images_generated,
+                        # Upload the renderer-ready 1080x1920 crops when post-processing produced them
+                        'images': [self._upload_image_path(state, path) for path in state.images_generated],
                         'voice_files': state.voice_files,
                         'script_content': state.script_content,
                         'prompts': state.prompts_generated,
@@ -913,6 +1120,16 @@ class ProductionWorkflow:
         try:
             print("Step 10: Finalizing workflow")
             
+            # Drain any prompt/image rows still waiting in the write-behind queue
+            persisted_rows = await persistence_queue.flush()
+            print(f"Persisted {persisted_rows} queued prompt/image rows")
+            
+            # Release the shared image download and Pexels sessions and generation threads
+            await image_provider.close()
+            await pexels_client.close()
+            shutdown_postprocessing()
+            tts_worker.shutdown()
+            
             final_summary = f"""
 PRODUCTION WORKFLOW COMPLETED
 
@@ -983,6 +1200,14 @@ Workflow Complete - Ready for Editor!
                 "messages": [AIMessage(content="Workflow finalization failed")]
             }
     
+    def _upload_image_path(self, state: WorkflowState, path: str) -> str:
+        """File uploaded to Drive for a generated image: its 1080x1920 crop when post-processing produced one."""
+        return state.image_derivatives.get(path, {}).get("crop_path", path)
+    
+    def _shot_manifest(self, state: WorkflowState):
+        """Artifact manifest for this script lineage (see storage.shot_manifest)."""
+        return get_shot_manifest(state.shot_manifest_key or state.article_id or state.topic or "default")
+    
     def _select_shots_for_image_generation(self, prompts: List[Dict], shot_breakdown: List[Dict], target_images: int = 6) -> List[Dict]:
         """
         Intelligently select which shots should have images generated based on content analysis
@@ -1084,6 +1309,9 @@ async def run_production_workflow(topic: str, user_query: str = "") -> WorkflowS
     print(f"Starting production workflow for topic: '{topic}'")
     print("=" * 60)
     
+    # Spawn (and optionally warm up) the TTS workers while search and scripting run
+    tts_worker.start()
+    
     try:
         final_state = await production_workflow.ainvoke(initial_state)
         
@@ -514,7 +514,7 @@ if __name__ == "__main__":
         
         # Check for voiceover files
         if os.path.exists("voiceover"):
-            audio_files = [f for f in os.listdir("voiceover") if f.endswith(('.mp3', '.wav', '.m4a', '.aac', '.ogg'))]
+            audio_files = [f for f in os.listdir("voiceover") if f.endswith(('.mp3', '.wav', '.m4a', '.aac', '.ogg', '.opus'))]
             if audio_files:
                 upload_candidates['voiceover'] = audio_files
         
@@ -0,0 +1,183 @@
+"""
+Content-addressed cache for generated images.
+
+Images are stored under a key derived from the prompt and every generation
+parameter (model, size, steps), so rerunning the same prompt returns the
+existing file without an API call. An index file records size and last
+access per entry; the least recently used files are evicted once the
+directory exceeds its size or entry cap.
+"""
+
+import os
+import json
+import time
+import asyncio
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR",
+    str(Path(__file__).parent.parent / "assets" / "generated_images")
+)
+IMAGE_CACHE_MAX_BYTES = int(float(os.getenv("IMAGE_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "5000"))
+
+
+def image_cache_key(prompt: str, **params: Any) -> str:
+    """Hash of the prompt plus generation parameters."""
+    payload = json.dumps({"prompt": prompt.strip(), **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def copy_cache_key(file_path: str, label: str) -> str:
+    """Key of a labelled copy of a cached image (see ImageCache.copy_entry)."""
+    return image_cache_key(str(file_path), copy=label)
+
+
+def file_content_hash(file_path: str) -> str:
+    """SHA-256 of the image bytes, identifying the same image across keys and copies."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImageCache:
+    """LRU, size-capped directory of generated images indexed by content key."""
+
+    def __init__(
+        self,
+        root: str = IMAGE_CACHE_DIR,
+        max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+        max_entries: int = IMAGE_CACHE_MAX_ENTRIES
+    ):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, key: str, extension: str = "jpg") -> Path:
+        return self.root / f"{key[:24]}.{extension}"
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            for key, entry in sorted(entries.items(), key=lambda item: item[1].get("last_access", 0)):
+                self._entries[key] = entry
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Could not read image cache index {self.index_path}: {str(e)}")
+
+    def _save(self) -> None:
+        """Write the index atomically (caller holds the lock)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+
+    def key_lock(self, key: str) -> asyncio.Lock:
+        """Per-key lock so concurrent requests for the same image generate it once."""
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = asyncio.Lock()
+            return self._key_locks[key]
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the cached file for key, refreshing its LRU position, or None."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(entry["file_path"]):
+                if entry is not None:
+                    del self._entries[key]
+                    self._save()
+                self.misses += 1
+                return None
+
+            entry["last_access"] = time.time()
+            self._entries.move_to_end(key)
+            self._save()
+            self.hits += 1
+            return entry["file_path"]
+
+    def record(self, key: str, file_path: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """Add a freshly generated file and evict least recently used files over the caps."""
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return
+
+        with self._lock:
+            self._load()
+            now = time.time()
+            self._entries[key] = {
+                "file_path": str(file_path),
+                "size": size,
+                "created_at": now,
+                "last_access": now,
+                "params": params or {}
+            }
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def copy_entry(self, file_path: str, label: str) -> str:
+        """
+        Give a cached image a second file of its own, tracked as a cache entry.
+        
+        Shots with identical prompts need separate files. The copy's key is
+        derived from the source file and label, so later runs reuse it, and it
+        counts towards the caps and is evicted like any other image.
+        """
+        key = copy_cache_key(file_path, label)
+        copy_path = self.path_for(key, Path(file_path).suffix.lstrip(".") or "jpg")
+        if not copy_path.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file_path, copy_path)
+        self.record(key, str(copy_path), {"copy_of": str(file_path), "label": label})
+        return str(copy_path)
+
+    def _evict(self) -> None:
+        total_bytes = sum(entry["size"] for entry in self._entries.values())
+        while self._entries and (total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            key, entry = self._entries.popitem(last=False)
+            total_bytes -= entry["size"]
+            self.evictions += 1
+            try:
+                os.remove(entry["file_path"])
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load()
+            return {
+                "entries": len(self._entries),
+                "total_bytes": sum(entry["size"] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+# Process-wide cache for the generated_images directory
+image_cache = ImageCache()
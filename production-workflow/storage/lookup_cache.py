@@ -0,0 +1,140 @@
+"""
+Read-through lookup cache for Supabase rows.
+
+Articles and scripts are fetched repeatedly within a single workflow run and
+across chat interactions. This module keeps recently fetched rows in process,
+bounded by entry count and TTL, and is invalidated by the write paths
+(store / update / approve) so callers never see stale data written here.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("LOOKUP_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_TTL_SECONDS = float(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "300"))
+
+
+class LookupCache:
+    """Thread-safe LRU cache with per-entry TTL and hit-rate statistics."""
+
+    def __init__(self, name: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries over the size limit."""
+        if value is None or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Read-through lookup: serve from cache or call loader and cache its result.
+
+        A loader returning None (row not found) is not cached so that rows
+        stored later become visible immediately.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drop the given keys, typically called right after a write."""
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every entry while keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit-rate counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Article rows keyed by ("row", url_hash) and article ids keyed by ("id", url_hash)
+article_cache = LookupCache("articles")
+
+# Script rows keyed by script id
+script_cache = LookupCache("scripts")
+
+# Pexels search queries keyed by (keyword mode, prompt set hash, prompt hash); the set hash is empty for LLM queries
+search_keyword_cache = LookupCache(
+    "search_keywords",
+    max_entries=int(os.getenv("SEARCH_KEYWORD_CACHE_MAX_ENTRIES", "2048")),
+    ttl_seconds=float(os.getenv("SEARCH_KEYWORD_CACHE_TTL_SECONDS", "86400"))
+)
+
+
+def invalidate_article(url_hash: str) -> None:
+    """Invalidate every cached view of an article after it is written."""
+    article_cache.invalidate(("row", url_hash), ("id", url_hash))
+
+
+def invalidate_script(script_id: str) -> None:
+    """Invalidate a cached script after it is stored, updated or approved."""
+    script_cache.invalidate(str(script_id))
+
+
+def lookup_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit-rate statistics for all lookup caches."""
+    return {
+        "articles": article_cache.stats(),
+        "scripts": script_cache.stats(),
+        "search_keywords": search_keyword_cache.stats(),
+    }
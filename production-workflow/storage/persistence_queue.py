@@ -0,0 +1,200 @@
+"""
+Write-behind persistence for generated prompts and images.
+
+The prompt and image generation nodes push rows here instead of writing to
+Supabase inline. Rows are buffered in memory and flushed in batches, either
+when a size threshold is reached or on a timer, using one bulk insert per
+table per batch. Enqueueing never blocks generation and never raises.
+"""
+
+import os
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "25"))
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "5"))
+PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", "3"))
+
+# Tables are flushed in this order so foreign keys (generated_images.prompt_id) resolve
+TABLE_ORDER = ["prompts", "generated_images"]
+
+
+def _create_supabase_client():
+    """Create a Supabase client, or None when credentials are not configured."""
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_ANON_KEY")
+    if not supabase_url or not supabase_key:
+        return None
+
+    from supabase import create_client
+    return create_client(supabase_url, supabase_key)
+
+
+class WriteBehindQueue:
+    """Buffers rows per table and bulk-inserts them in the background."""
+
+    def __init__(
+        self,
+        table_order: List[str] = TABLE_ORDER,
+        batch_size: int = PERSIST_BATCH_SIZE,
+        flush_interval: float = PERSIST_FLUSH_INTERVAL,
+        max_retries: int = PERSIST_MAX_RETRIES,
+        client_factory=_create_supabase_client
+    ):
+        self.table_order = list(table_order)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._client_factory = client_factory
+        self._client = None
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {table: [] for table in self.table_order}
+        self._lock = threading.Lock()
+        self._flush_locks: Dict[int, asyncio.Lock] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer_task: Optional[asyncio.Task] = None
+        self.stats = {"enqueued": 0, "inserted": 0, "batches": 0, "retried": 0, "dropped": 0}
+
+    def enqueue(self, table: str, row: Dict[str, Any]) -> None:
+        """Queue a single row for insertion."""
+        self.enqueue_many(table, [row])
+
+    def enqueue_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Queue rows for insertion without waiting for the database."""
+        if not rows:
+            return
+
+        with self._lock:
+            buffer = self._buffers.setdefault(table, [])
+            if table not in self.table_order:
+                self.table_order.append(table)
+            buffer.extend({"row": row, "attempts": 0} for row in rows)
+            self.stats["enqueued"] += len(rows)
+            pending = sum(len(b) for b in self._buffers.values())
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop: rows stay buffered until the next flush()
+            return
+
+        if pending >= self.batch_size:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = loop.create_task(self.flush())
+        if self._timer_task is None or self._timer_task.done():
+            self._timer_task = loop.create_task(self._flush_periodically())
+
+    def pending(self) -> int:
+        """Number of rows waiting to be written."""
+        with self._lock:
+            return sum(len(b) for b in self._buffers.values())
+
+    async def _flush_periodically(self) -> None:
+        """Flush on a timer until the buffers are drained."""
+        while self.pending():
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _get_flush_lock(self) -> asyncio.Lock:
+        """One flush at a time per event loop, so table order is preserved."""
+        loop_id = id(asyncio.get_running_loop())
+        if loop_id not in self._flush_locks:
+            self._flush_locks[loop_id] = asyncio.Lock()
+        return self._flush_locks[loop_id]
+
+    def _insert(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Bulk insert a batch of rows (runs on a worker thread)."""
+        if self._client is None:
+            self._client = self._client_factory()
+        if self._client is None:
+            raise Exception("Supabase credentials not configured")
+        self._client.table(table).insert(rows).execute()
+
+    async def flush(self) -> int:
+        """Write all buffered rows in batches. Returns the number of rows inserted."""
+        async with self._get_flush_lock():
+            with self._lock:
+                drained = {table: self._buffers.get(table, []) for table in self.table_order}
+                self._buffers = {table: [] for table in self.table_order}
+
+            inserted = 0
+            for table in self.table_order:
+                entries = drained.get(table, [])
+                for start in range(0, len(entries), self.batch_size):
+                    batch = entries[start:start + self.batch_size]
+                    try:
+                        await asyncio.to_thread(self._insert, table, [entry["row"] for entry in batch])
+                        inserted += len(batch)
+                        self.stats["inserted"] += len(batch)
+                        self.stats["batches"] += 1
+                    except Exception as e:
+                        print(f"Write-behind insert into '{table}' failed ({len(batch)} rows): {str(e)}")
+                        self._requeue(table, batch)
+
+            return inserted
+
+    def _requeue(self, table: str, batch: List[Dict[str, Any]]) -> None:
+        """Put a failed batch back in the buffer until it runs out of retries."""
+        retry = []
+        for entry in batch:
+            entry["attempts"] += 1
+            if entry["attempts"] < self.max_retries:
+                retry.append(entry)
+            else:
+                self.stats["dropped"] += 1
+
+        self.stats["retried"] += len(retry)
+        with self._lock:
+            self._buffers.setdefault(table, [])[:0] = retry
+
+
+def build_prompt_row(prompt: Dict[str, Any], script_id: str = "") -> Dict[str, Any]:
+    """Map a workflow prompt dict onto the prompts table."""
+    now = datetime.now().isoformat()
+    scene_number = prompt.get("shot_number") or prompt.get("scene_number") or 0
+    row = {
+        "script_id": script_id or None,
+        "scene_number": int(scene_number),
+        "scene_description": prompt.get("original_text") or prompt.get("timing") or "",
+        "prompt": prompt.get("prompt") or prompt.get("visual_description", ""),
+        "style": (prompt.get("style") or "")[:50],
+        "aspect_ratio": "9:16",
+        "metadata": {
+            "type": prompt.get("type"),
+            "timing": prompt.get("timing")
+        },
+        "created_at": now,
+        "updated_at": now
+    }
+    # Reuse the workflow's prompt id so generated_images rows can reference it
+    if prompt.get("id"):
+        row["id"] = prompt["id"]
+    return row
+
+
+def build_image_row(prompt: Dict[str, Any], image_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an image generation result onto the generated_images table."""
+    now = datetime.now().isoformat()
+    return {
+        "prompt_id": prompt.get("id"),
+        "prompt": prompt.get("prompt", ""),
+        "scene_number": prompt.get("shot_number"),
+        "scene_description": prompt.get("original_text", ""),
+        "image_url": image_result.get("image_url", ""),
+        "model": image_result.get("model"),
+        "style": (prompt.get("style") or "")[:50],
+        "aspect_ratio": "9:16",
+        "metadata": {
+            "file_path": image_result.get("file_path"),
+            # Match rows to the image cache entry and to the same image stored under other keys
+            "cache_key": image_result.get("cache_key"),
+            "content_hash": image_result.get("content_hash")
+        },
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+# Process-wide queue shared by the workflow nodes
+persistence_queue = WriteBehindQueue()
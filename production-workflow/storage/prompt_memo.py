@@ -0,0 +1,204 @@
+"""
+Persistent memo cache for shot-to-visual prompt generation.
+
+Intros, CTAs ("follow for more") and common tech phrases recur across reels
+and produce near-identical (shot text, shot type, section) triples. Each
+generated visual prompt is remembered here so repeated shots are served
+locally instead of costing another LLM call.
+
+Lookups try an exact match on the normalized key first. When
+PROMPT_MEMO_SIMILARITY is below 1.0, shots of the same type and section are
+also compared by the Jaccard similarity of their hashed normalized tokens.
+Entries are appended to a JSON-lines file and compacted when it grows.
+"""
+
+import os
+import re
+import json
+import zlib
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional
+
+PROMPT_MEMO_PATH = os.getenv(
+    "PROMPT_MEMO_PATH",
+    str(Path(__file__).parent.parent / "assets" / "prompt_memo.jsonl")
+)
+PROMPT_MEMO_SIMILARITY = float(os.getenv("PROMPT_MEMO_SIMILARITY", "0.9"))
+PROMPT_MEMO_MAX_ENTRIES = int(os.getenv("PROMPT_MEMO_MAX_ENTRIES", "5000"))
+
+# Words that carry no visual meaning and would otherwise dilute the similarity score
+STOPWORDS = frozenset("""
+a an the and or but of to in on at for with from by as is are was were be been it its this that
+these those so just very really you your we our they their i my me he she his her them us do does
+""".split())
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = re.sub(r"[^\w\s']", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def normalize_section(section: str) -> str:
+    """Reduce a header like "[5-15s: INTRODUCTION]" to its label, since timings differ between reels."""
+    section = re.sub(r"[\[\]]", "", section or "")
+    section = re.sub(r"^\s*\d+\s*-\s*\d+s\s*:\s*", "", section)
+    return normalize_text(section)
+
+
+def token_hashes(text: str) -> FrozenSet[int]:
+    """Hash each meaningful token; plural "s" is stripped so "agents" matches "agent"."""
+    tokens = set()
+    for token in normalize_text(text).split():
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.add(zlib.crc32(token.encode("utf-8")))
+    return frozenset(tokens)
+
+
+def _jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / len(a | b)
+
+
+class PromptMemo:
+    """LRU memo of generated visual prompts, persisted as JSON lines."""
+
+    def __init__(
+        self,
+        path: str = PROMPT_MEMO_PATH,
+        similarity_threshold: float = PROMPT_MEMO_SIMILARITY,
+        max_entries: int = PROMPT_MEMO_MAX_ENTRIES
+    ):
+        self.path = Path(path)
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tokens: Dict[str, FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._lines_written = 0
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(shot_text: str, shot_type: str, section: str) -> str:
+        key = "|".join([normalize_text(shot_text), (shot_type or "").lower(), normalize_section(section)])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        """Read the memo file once; later lines override earlier ones."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._lines_written += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._store(entry)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Could not read prompt memo {self.path}: {str(e)}")
+
+    def _store(self, entry: Dict[str, Any]) -> None:
+        key = entry["key"]
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._tokens[key] = token_hashes(entry.get("text", ""))
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._tokens.pop(evicted, None)
+
+    def get(self, shot_text: str, shot_type: str, section: str) -> Optional[str]:
+        """Return a memoized prompt for this shot or a sufficiently similar one."""
+        key = self.make_key(shot_text, shot_type, section)
+        with self._lock:
+            self._load()
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["prompt"]
+
+            if self.similarity_threshold < 1.0:
+                tokens = token_hashes(shot_text)
+                shot_type = (shot_type or "").lower()
+                section = normalize_section(section)
+                best_key, best_score = None, self.similarity_threshold
+                for candidate_key, candidate in self._entries.items():
+                    if candidate["type"] != shot_type or candidate["section"] != section:
+                        continue
+                    score = _jaccard(tokens, self._tokens[candidate_key])
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.similar_hits += 1
+                    return self._entries[best_key]["prompt"]
+
+            self.misses += 1
+            return None
+
+    def set(self, shot_text: str, shot_type: str, section: str, prompt: str) -> None:
+        """Remember a generated prompt and append it to the memo file."""
+        if not prompt or self.max_entries <= 0:
+            return
+
+        entry = {
+            "key": self.make_key(shot_text, shot_type, section),
+            "text": normalize_text(shot_text),
+            "type": (shot_type or "").lower(),
+            "section": normalize_section(section),
+            "prompt": prompt
+        }
+        with self._lock:
+            self._load()
+            self._store(entry)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+                self._lines_written += 1
+                if self._lines_written > 2 * self.max_entries:
+                    self._compact()
+            except Exception as e:
+                print(f"Could not write prompt memo {self.path}: {str(e)}")
+
+    def _compact(self) -> None:
+        """Rewrite the file with only the live entries (caller holds the lock)."""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
+        self._lines_written = len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+                "similarity_threshold": self.similarity_threshold
+            }
+
+
+# Process-wide memo shared by all prompt generation calls
+prompt_memo = PromptMemo()
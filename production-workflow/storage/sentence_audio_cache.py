@@ -0,0 +1,163 @@
+"""
+Per-sentence cache of synthesized voiceover audio.
+
+Voiceovers are synthesized sentence by sentence. Each sentence's samples are
+stored as float32 .npy under a key of the normalized sentence text and every
+setting that changes the audio (voice sample, emotion, exaggeration,
+cfg_weight, sample rate). When a reviewer edits one line, only that sentence
+is synthesized again. The rest come back sample-for-sample identical and are
+stitched exactly as before.
+
+The directory itself is the index: a file's mtime is its last access and is
+refreshed on every hit. TTS worker processes share the directory without
+any coordination, since there is no index file for them to overwrite. After
+each write the least recently used files are evicted once the directory
+exceeds its size cap.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SENTENCE_AUDIO_CACHE_DIR = os.getenv(
+    "SENTENCE_AUDIO_CACHE_DIR",
+    str(Path(__file__).parent.parent / "assets" / "sentence_audio")
+)
+SENTENCE_AUDIO_CACHE_MAX_BYTES = int(float(os.getenv("SENTENCE_AUDIO_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+
+def normalize_sentence(text: str) -> str:
+    """Collapse whitespace and unify quotes; case and punctuation stay because they change the delivery."""
+    text = (text or "").replace("’", "'").replace("‘", "'").replace("“", '"').replace("”", '"')
+    return " ".join(text.split())
+
+
+def sentence_cache_key(text: str, voice: str, emotion: str, exaggeration: float, cfg_weight: float, sample_rate: int) -> str:
+    """Hash of the sentence and all synthesis settings."""
+    payload = json.dumps({
+        "text": normalize_sentence(text),
+        "voice": voice,
+        "emotion": (emotion or "").lower(),
+        "exaggeration": round(float(exaggeration), 4),
+        "cfg_weight": round(float(cfg_weight), 4),
+        "sample_rate": sample_rate
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Temporary files left behind by a crashed writer are removed after this long
+STALE_TMP_SECONDS = 3600
+
+
+class SentenceAudioCache:
+    """LRU, size-capped directory of per-sentence waveforms."""
+
+    def __init__(self, root: str = SENTENCE_AUDIO_CACHE_DIR, max_bytes: int = SENTENCE_AUDIO_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path_for(self, key: str) -> Path:
+        return self.root / f"{key[:32]}.npy"
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """(mtime, size, path) of every cached sentence, oldest first, and their total size."""
+        files = []
+        now = time.time()
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # Evicted by another process mid-scan
+                    if entry.name.endswith(".npy"):
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                    elif entry.name.endswith(".tmp") and now - stat.st_mtime > STALE_TMP_SECONDS:
+                        try:
+                            os.remove(entry.path)
+                        except OSError:
+                            pass
+        except FileNotFoundError:
+            return [], 0
+        files.sort()
+        return files, sum(size for _, size, _ in files)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Cached samples for key, or None."""
+        path = self._path_for(key)
+        try:
+            samples = np.load(path, allow_pickle=False)
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            samples = None
+        except (OSError, ValueError):
+            # Truncated or corrupt file; drop it so the sentence is synthesized again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            samples = None
+
+        with self._lock:
+            if samples is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return samples
+
+    def put(self, key: str, samples: np.ndarray) -> None:
+        """Store a synthesized sentence and evict least recently used ones over the cap."""
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        path = self._path_for(key)
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            # Written under a unique name and renamed, so readers never see a partial file
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, samples, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write sentence audio {path.name}: {str(e)}")
+            return
+        self._evict(keep=str(path))
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        files, total_bytes = self._scan()
+        for _, size, file_path in files:
+            if total_bytes <= self.max_bytes:
+                break
+            if file_path == keep:
+                continue  # mtimes are coarse, so the file just written can tie with the oldest ones
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue  # Already evicted by another process
+            total_bytes -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        files, total_bytes = self._scan()
+        with self._lock:
+            return {
+                "entries": len(files),
+                "total_bytes": total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+# Process-wide cache shared by all voiceover synthesis
+sentence_audio_cache = SentenceAudioCache()
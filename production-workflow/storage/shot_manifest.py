@@ -0,0 +1,151 @@
+"""
+Per-shot artifact manifest for incremental regeneration.
+
+Every shot in `shot_breakdown` carries a content fingerprint. The manifest
+remembers, per script lineage (normally the article the script was written
+from), which prompt, image, b-roll and voice artifacts were produced for each
+fingerprint in the previous run. When a revised script is analysed, the
+stages diff the new shot list against the manifest and only regenerate the
+shots whose fingerprint is new; everything else is reused as-is.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+SHOT_MANIFEST_DIR = os.getenv(
+    "SHOT_MANIFEST_DIR",
+    str(Path(__file__).parent.parent / "assets" / "shot_manifests")
+)
+
+# Stages that keep per-shot artifacts in the manifest
+SHOT_STAGES = ("prompt", "image", "broll")
+
+
+def normalize_shot_text(text: str) -> str:
+    """Normalize shot text so whitespace, case and trailing punctuation edits don't count as changes."""
+    text = re.sub(r'\s+', ' ', (text or '').lower()).strip()
+    return text.strip(' .!?,;:"\'')
+
+
+def shot_fingerprint(shot: Dict[str, Any]) -> str:
+    """Content fingerprint of a shot: its normalized text, type and section."""
+    key = "|".join([
+        normalize_shot_text(shot.get("text", "")),
+        shot.get("type", ""),
+        re.sub(r'\s+', ' ', shot.get("section", "")).strip().lower()
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def text_fingerprint(*parts: Any) -> str:
+    """Fingerprint for whole-script artifacts such as the voiceover."""
+    key = "|".join(str(part) for part in parts)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class ShotManifest:
+    """Artifacts produced per shot fingerprint in the last run of one script lineage."""
+
+    def __init__(self, key: str, root: str = SHOT_MANIFEST_DIR):
+        self.key = key
+        self.path = Path(root) / f"{hashlib.md5(key.encode('utf-8')).hexdigest()}.json"
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("shots"), dict):
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Could not read shot manifest {self.path}: {str(e)}")
+        return {"key": self.key, "fingerprints": [], "shots": {}, "voice": {}}
+
+    def save(self) -> None:
+        """Write the manifest atomically so a crashed run never leaves it half-written."""
+        with self._lock:
+            self._data["updated_at"] = datetime.now().isoformat()
+            payload = json.dumps(self._data, indent=2, default=str)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def begin_run(self, shot_breakdown: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Diff a new shot list against the previous run and start a new run.
+
+        Artifacts of shots that no longer exist are dropped; artifacts of
+        unchanged shots are kept for the stages to reuse.
+
+        Returns:
+            Dictionary with unchanged, changed and removed fingerprints
+        """
+        current = [shot.get("fingerprint") or shot_fingerprint(shot) for shot in shot_breakdown]
+        current_set = set(current)
+
+        with self._lock:
+            previous = self._data.get("fingerprints", [])
+            previous_set = set(previous)
+            artifacts = self._data.get("shots", {})
+            unchanged = [fp for fp in current if fp in previous_set]
+            changed = [fp for fp in current if fp not in previous_set]
+            removed = [fp for fp in previous if fp not in current_set]
+
+            self._data["shots"] = {fp: artifacts[fp] for fp in current if fp in artifacts}
+            self._data["fingerprints"] = current
+
+        self.save()
+        return {
+            "previous_run": bool(previous),
+            "unchanged": unchanged,
+            "changed": changed,
+            "removed": removed
+        }
+
+    def get(self, fingerprint: Optional[str], stage: str) -> Optional[Any]:
+        """Return the artifact a stage stored for a shot, or None if it must be regenerated."""
+        if not fingerprint:
+            return None
+        with self._lock:
+            return self._data["shots"].get(fingerprint, {}).get(stage)
+
+    def put(self, fingerprint: Optional[str], stage: str, artifact: Any) -> None:
+        """Record the artifact a stage produced for a shot (call save() afterwards)."""
+        if not fingerprint:
+            return
+        with self._lock:
+            self._data["shots"].setdefault(fingerprint, {})[stage] = artifact
+
+    def get_voice(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the previous voiceover if it was generated from identical narration."""
+        with self._lock:
+            voice = self._data.get("voice") or {}
+        return voice if voice.get("fingerprint") == fingerprint else None
+
+    def put_voice(self, fingerprint: str, voice_files: List[str]) -> None:
+        """Record the voiceover generated for a narration fingerprint."""
+        with self._lock:
+            self._data["voice"] = {"fingerprint": fingerprint, "files": list(voice_files)}
+        self.save()
+
+
+_manifests: Dict[str, ShotManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_shot_manifest(key: str) -> ShotManifest:
+    """Process-wide manifest per lineage key, shared by the parallel workflow nodes."""
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = ShotManifest(key)
+        return _manifests[key]